@@ -0,0 +1,226 @@
+"""
+离线批量渲染: 视频/图片序列 -> 人物动画
+功能：
+  1. 输入视频文件或图片序列目录, 不开窗口做姿态推理和人物渲染 (numpy 合成器)
+  2. 输出视频文件, 或输出目录中的PNG序列(保留透明通道)
+  3. 长视频切成若干段交给进程池, 每个进程只创建一个 MediaPipe Pose, 处理多段
+  4. 视频分段输出后按顺序拼接 (有 ffmpeg 时直接拼接不重新编码); PNG 序列直接按全局帧号写入
+
+用法:
+  python batch_render.py input.mp4 -o output.mp4
+  python batch_render.py frames_dir -o out_frames --workers 8
+"""
+
+import argparse
+import multiprocessing.util
+import os
+import shutil
+import subprocess
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import cv2
+
+from units.frame_source import FileSource, probe
+
+DEFAULT_RESOURCE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                    "processed_character_parts", "character_parts")
+VIDEO_CODECS = {".mp4": "mp4v", ".avi": "MJPG", ".mkv": "XVID", ".mov": "mp4v"}
+
+
+def is_video_path(path):
+    return os.path.splitext(path)[1].lower() in VIDEO_CODECS
+
+
+class FrameWriter:
+    """
+    RGBA 帧写入视频或PNG序列
+    参数:
+        path: 视频文件路径, 或PNG序列输出目录
+        first_index: PNG序列中第一帧的全局帧号
+    """
+
+    def __init__(self, path, fps, size, fourcc=None, first_index=0):
+        self.path = path
+        self.first_index = first_index
+        self.frames = 0
+        self.video = None
+        if is_video_path(path):
+            fourcc = fourcc or VIDEO_CODECS[os.path.splitext(path)[1].lower()]
+            self.video = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*fourcc), fps, size)
+            if not self.video.isOpened():
+                raise IOError(f"无法创建视频: {path} ({fourcc})")
+        else:
+            os.makedirs(path, exist_ok=True)
+
+    def write(self, index, frame):
+        """frame_sink 接口, index 为本段内的帧序号"""
+        if self.video is not None:
+            self.video.write(cv2.cvtColor(frame, cv2.COLOR_RGBA2BGR))
+        else:
+            name = f"frame_{self.first_index + index:06d}.png"
+            cv2.imwrite(os.path.join(self.path, name), cv2.cvtColor(frame, cv2.COLOR_RGBA2BGRA))
+        self.frames += 1
+
+    def close(self):
+        if self.video is not None:
+            self.video.release()
+
+
+def plan_segments(total, workers, min_length=300):
+    """
+    把 [0, total) 切成若干段, 段数为进程数的几倍以便负载均衡,
+    但每段不短于 min_length (每段开头 Pose 需要重新检测)
+    返回: [(start, stop), ...]
+    """
+    if total <= 0:
+        return [(0, None)]
+    count = max(1, min(workers * 4, total // min_length))
+    bounds = [round(total * i / count) for i in range(count + 1)]
+    return [(bounds[i], bounds[i + 1]) for i in range(count)]
+
+
+# ---------------------------------------------------------------------- 进程池
+_driver = None      # 每个进程一个驱动(以及一个 Pose), 处理多个分段
+
+
+def _release_driver():
+    """进程退出时释放驱动 (关闭 Pose、输出统计), 每个进程只做一次"""
+    global _driver
+    if _driver is not None:
+        _driver.release()
+        _driver = None
+
+
+def _render_segment(job):
+    """
+    进程池任务: 渲染一个分段
+    返回: (分段序号, 帧数, 耗时)
+    """
+    global _driver
+    index, (start, stop), output, settings = job
+    source = FileSource(settings["input"], start, stop)
+    if _driver is None:
+        import mediapipe as mp
+
+        from my_v import AnimeCharacterDriver
+
+        cv2.setNumThreads(1)    # 进程间已经并行, 避免OpenCV再开线程抢核
+        pose = mp.solutions.pose.Pose(min_detection_confidence=0.5, min_tracking_confidence=0.5,
+                                      model_complexity=settings["complexity"])
+        _driver = AnimeCharacterDriver(settings["resource_dir"], window_size=settings["size"],
+                                       frame_source=source, pose_model=pose, backend="numpy",
+                                       mirror=settings["mirror"])
+        # 进程池的工作进程以 os._exit 结束, 不执行 atexit; multiprocessing 的退出回调会执行
+        multiprocessing.util.Finalize(None, _release_driver, exitpriority=10)
+
+    writer = FrameWriter(output, settings["fps"], settings["size"], settings["fourcc"], first_index=start)
+    t0 = time.perf_counter()
+    try:
+        # 每段只释放帧源并清空统计, 驱动留给下一段使用
+        frames = _driver.render_source(source, writer.write)
+    finally:
+        writer.close()
+    return index, frames, time.perf_counter() - t0
+
+
+def concat_videos(parts, output, fps, size, fourcc=None):
+    """按顺序拼接分段视频, 有 ffmpeg 时不重新编码"""
+    ffmpeg = shutil.which("ffmpeg")
+    if ffmpeg:
+        list_path = output + ".parts.txt"
+        with open(list_path, "w", encoding="utf-8") as f:
+            for part in parts:
+                f.write(f"file '{os.path.abspath(part)}'\n")
+        try:
+            subprocess.run([ffmpeg, "-y", "-loglevel", "error", "-f", "concat", "-safe", "0",
+                            "-i", list_path, "-c", "copy", output], check=True)
+            return
+        except subprocess.CalledProcessError as e:
+            print(f"ffmpeg 拼接失败({e}), 改为重新编码")
+        finally:
+            os.remove(list_path)
+
+    writer = FrameWriter(output, fps, size, fourcc)
+    for part in parts:
+        cap = cv2.VideoCapture(part)
+        while True:
+            ret, frame = cap.read()
+            if not ret:
+                break
+            writer.video.write(frame)
+        cap.release()
+    writer.close()
+
+
+def render(input_path, output, resource_dir=DEFAULT_RESOURCE_DIR, size=(1200, 800), workers=None,
+           complexity=2, fps=None, fourcc=None, mirror=False, min_segment=300):
+    """
+    离线渲染整个输入
+    参数:
+        workers: 进程数, 默认CPU核数; 1 表示在当前进程处理
+        fps: 输出帧率, 默认与输入视频相同, 图片序列为30
+        mirror: 与摄像头模式一样水平镜像
+    返回: 渲染的总帧数
+    """
+    total, input_fps, _ = probe(input_path)
+    fps = fps or input_fps or 30.0
+    workers = workers or os.cpu_count() or 1
+    segments = plan_segments(total, workers, min_segment)
+    settings = {"input": input_path, "resource_dir": resource_dir, "size": tuple(size), "fps": fps,
+                "fourcc": fourcc, "complexity": complexity, "mirror": mirror}
+    print(f"输入 {input_path}: {total} 帧, {fps:.2f} FPS, 分 {len(segments)} 段, {min(workers, len(segments))} 个进程")
+
+    video = is_video_path(output)
+    temp_dir = tempfile.mkdtemp(prefix="animev_", dir=os.path.dirname(os.path.abspath(output))) if video else None
+    ext = os.path.splitext(output)[1]
+    jobs = [(i, segment, os.path.join(temp_dir, f"part{i:04d}{ext}") if video else output, settings)
+            for i, segment in enumerate(segments)]
+
+    t0 = time.perf_counter()
+    try:
+        if workers == 1 or len(jobs) == 1:
+            try:
+                results = list(map(_render_segment, jobs))
+            finally:
+                _release_driver()
+        else:
+            with ProcessPoolExecutor(max_workers=min(workers, len(jobs))) as executor:
+                results = []
+                for index, frames, elapsed in executor.map(_render_segment, jobs):
+                    print(f"分段 {index + 1}/{len(jobs)} 完成: {frames} 帧, {frames / max(elapsed, 1e-9):.1f} FPS")
+                    results.append((index, frames, elapsed))
+        if video:
+            concat_videos([job[2] for job in jobs], output, fps, tuple(size), fourcc)
+    finally:
+        if temp_dir:
+            shutil.rmtree(temp_dir, ignore_errors=True)
+
+    frames = sum(r[1] for r in results)
+    elapsed = time.perf_counter() - t0
+    print(f"完成: {frames} 帧 -> {output}, 耗时 {elapsed:.1f} 秒, {frames / max(elapsed, 1e-9):.1f} FPS")
+    return frames
+
+
+def main():
+    parser = argparse.ArgumentParser(description="离线把视频/图片序列渲染成人物动画")
+    parser.add_argument("input", help="视频文件或图片序列目录")
+    parser.add_argument("-o", "--output", required=True,
+                        help=f"输出视频({'/'.join(VIDEO_CODECS)}), 其他路径视为PNG序列输出目录")
+    parser.add_argument("--resource-dir", default=DEFAULT_RESOURCE_DIR, help="部件图片目录")
+    parser.add_argument("--size", type=int, nargs=2, default=(1200, 800), help="输出分辨率 宽 高")
+    parser.add_argument("--workers", type=int, help="并行进程数, 默认CPU核数")
+    parser.add_argument("--complexity", type=int, choices=[0, 1, 2], default=2, help="MediaPipe model_complexity")
+    parser.add_argument("--fps", type=float, help="输出帧率, 默认与输入相同")
+    parser.add_argument("--fourcc", help="视频编码, 默认按扩展名选择")
+    parser.add_argument("--mirror", action="store_true", help="与摄像头模式一样水平镜像")
+    parser.add_argument("--min-segment", type=int, default=300, help="每段最少帧数")
+    args = parser.parse_args()
+
+    render(args.input, args.output, args.resource_dir, tuple(args.size), args.workers, args.complexity,
+           args.fps, args.fourcc, args.mirror, args.min_segment)
+
+
+if __name__ == "__main__":
+    main()
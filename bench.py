@@ -0,0 +1,270 @@
+"""
+每帧热点路径基准测试
+功能：
+  1. 分别测试 my_v.py 流水线各阶段:
+       process_frame (各 model_complexity), solve_bones, character_blits (各部件旋转缩放),
+       draw_character, 整帧合成, pygame.display.flip, 以及无窗口的 numpy 合成器
+  2. 输出 p50 / p95 / p99 延迟和帧率
+  3. 结果保存为JSON, 可与上一次结果对比
+  4. 使用 SDL dummy 视频驱动, 无窗口、无摄像头也能运行
+
+用法:
+  python bench.py                                  # 全部测试
+  python bench.py --landmarks session.avlm         # 使用录制的关键点
+  python bench.py --output new.json --compare old.json
+"""
+
+import os
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+import argparse
+import json
+import platform
+import time
+
+import numpy as np
+
+DEFAULT_RESOURCE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                    "processed_character_parts", "character_parts")
+
+# 站立姿势的归一化关键点 (x, y), 按MediaPipe的33个关键点顺序
+STAND_POSE = np.array([
+    (0.50, 0.20),                                              # 鼻子
+    (0.49, 0.19), (0.48, 0.19), (0.47, 0.19),                  # 左眼
+    (0.51, 0.19), (0.52, 0.19), (0.53, 0.19),                  # 右眼
+    (0.46, 0.20), (0.54, 0.20),                                # 耳朵
+    (0.49, 0.22), (0.51, 0.22),                                # 嘴
+    (0.42, 0.30), (0.58, 0.30),                                # 肩
+    (0.38, 0.42), (0.62, 0.42),                                # 肘
+    (0.36, 0.53), (0.64, 0.53),                                # 腕
+    (0.35, 0.56), (0.65, 0.56),                                # 小指
+    (0.36, 0.56), (0.64, 0.56),                                # 食指
+    (0.37, 0.55), (0.63, 0.55),                                # 拇指
+    (0.45, 0.55), (0.55, 0.55),                                # 髋
+    (0.45, 0.70), (0.55, 0.70),                                # 膝
+    (0.45, 0.85), (0.55, 0.85),                                # 踝
+    (0.44, 0.87), (0.56, 0.87),                                # 脚跟
+    (0.46, 0.89), (0.54, 0.89),                                # 脚尖
+], dtype=np.float32)
+
+
+def synthetic_landmarks(frames=300, seed=0):
+    """生成挥手+轻微晃动的关键点序列, 形状 (frames, 33, 4)"""
+    rng = np.random.default_rng(seed)
+    t = np.arange(frames, dtype=np.float32)[:, None] / 30.0
+    points = np.zeros((frames, 33, 4), dtype=np.float32)
+    points[:, :, :2] = STAND_POSE
+    points[:, :, 0] += 0.02 * np.sin(t * 1.3)                      # 身体左右晃动
+    for elbow, wrist, sign in ((13, 15, -1), (14, 16, 1)):
+        points[:, elbow, 1] -= 0.08 * np.sin(t[:, 0] * 2.0)
+        points[:, wrist, 0] += sign * 0.06 * np.cos(t[:, 0] * 3.0)
+        points[:, wrist, 1] -= 0.15 * np.sin(t[:, 0] * 3.0)
+    points[:, :, :2] += rng.normal(0, 0.002, size=(frames, 33, 2))  # 检测抖动
+    points[:, :, 3] = 0.95
+    return points
+
+
+def synthetic_frames(count=30, size=(480, 640), seed=0):
+    """生成合成摄像头帧(BGR), 画一个简单的人形"""
+    import cv2
+
+    rng = np.random.default_rng(seed)
+    h, w = size
+    frames = []
+    for i in range(count):
+        frame = rng.integers(90, 110, size=(h, w, 3), dtype=np.uint8)
+        pts = (STAND_POSE * (w, h)).astype(int)
+        cv2.circle(frame, tuple(pts[0]), 30, (180, 200, 230), -1)
+        for a, b in ((11, 12), (11, 13), (13, 15), (12, 14), (14, 16), (11, 23), (12, 24),
+                     (23, 24), (23, 25), (25, 27), (24, 26), (26, 28)):
+            cv2.line(frame, tuple(pts[a]), tuple(pts[b]), (60, 80, 160), 18)
+        frames.append(np.roll(frame, i * 2, axis=1))
+    return frames
+
+
+def load_landmarks(path):
+    """读取录制的关键点, 跳过未检测到人体的帧"""
+    from units.landmark_record import LandmarkRecording
+
+    points = [p for _, p in LandmarkRecording(path) if p is not None]
+    if not points:
+        raise ValueError(f"{path} 中没有检测到人体的帧")
+    return np.stack(points)
+
+
+# ---------------------------------------------------------------------- 计时
+def measure(func, iterations, warmup=5):
+    """调用func(i)若干次, 返回每次耗时(秒)数组"""
+    for i in range(warmup):
+        func(i)
+    samples = np.empty(iterations)
+    for i in range(iterations):
+        t0 = time.perf_counter()
+        func(i)
+        samples[i] = time.perf_counter() - t0
+    return samples
+
+
+def summarize(samples):
+    ms = samples * 1000
+    p50, p95, p99 = np.percentile(ms, (50, 95, 99))
+    mean = ms.mean()
+    return {
+        "iterations": int(len(ms)),
+        "mean_ms": float(mean),
+        "p50_ms": float(p50),
+        "p95_ms": float(p95),
+        "p99_ms": float(p99),
+        "fps": float(1000.0 / mean) if mean > 0 else 0.0,
+    }
+
+
+# ---------------------------------------------------------------------- 测试项
+class NullSource:
+    """基准测试不需要摄像头"""
+
+    def read(self):
+        return False, None
+
+    def release(self):
+        pass
+
+
+def make_driver(resource_dir, window_size, cache_budget_mb, backend="pygame"):
+    from my_v import AnimeCharacterDriver
+
+    return AnimeCharacterDriver(resource_dir, window_size=window_size,
+                                frame_source=NullSource(), pose_model=object(),
+                                cache_budget_mb=cache_budget_mb, backend=backend)
+
+
+def bench_process_frame(driver, complexities, iterations, video=None):
+    import cv2
+    import mediapipe as mp
+
+    if video:
+        cap = cv2.VideoCapture(video)
+        frames = []
+        while len(frames) < 120:
+            ret, frame = cap.read()
+            if not ret:
+                break
+            frames.append(frame)
+        cap.release()
+    else:
+        frames = synthetic_frames()
+
+    results = {}
+    for complexity in complexities:
+        driver.pose = mp.solutions.pose.Pose(min_detection_confidence=0.5,
+                                             min_tracking_confidence=0.5,
+                                             model_complexity=complexity)
+        samples = measure(lambda i: driver.process_frame(frames[i % len(frames)]), iterations)
+        driver.pose.close()
+        results[f"process_frame[complexity={complexity}]"] = summarize(samples)
+    driver.pose = None
+    return results
+
+
+def bench_render(driver, landmarks, iterations):
+    import pygame
+
+    from units.bone_transform import landmarks_to_array, solve_bones
+
+    results = {}
+    n = len(landmarks)
+    points = [landmarks_to_array(frame) for frame in landmarks]
+    bones = [solve_bones(driver.bone_table, p, driver.width, driver.height) for p in points]
+
+    def draw_character(i):
+        driver.renderer.draw_character(*driver.pose_bones(landmarks[i % n]))
+
+    results["solve_bones"] = summarize(measure(
+        lambda i: solve_bones(driver.bone_table, points[i % n], driver.width, driver.height), iterations))
+    results["character_blits"] = summarize(measure(lambda i: driver.renderer.character_blits(bones[i % n]),
+                                                   iterations))
+    results["draw_character"] = summarize(measure(draw_character, iterations))
+    results["compose_frame"] = summarize(measure(lambda i: driver.compose_frame(landmarks[i % n]), iterations))
+    results["display.flip"] = summarize(measure(lambda i: pygame.display.flip(), iterations))
+    results["render_frame"] = summarize(measure(lambda i: driver.render_frame(landmarks[i % n]), iterations))
+    return results
+
+
+def bench_compositor(resource_dir, window_size, landmarks, iterations):
+    driver = make_driver(resource_dir, window_size, 0, backend="numpy")
+    n = len(landmarks)
+    return {"numpy render_array": summarize(measure(lambda i: driver.compose_frame(landmarks[i % n]), iterations))}
+
+
+# ---------------------------------------------------------------------- 输出
+def print_results(results, baseline=None):
+    header = f"{'阶段':<36}{'p50':>9}{'p95':>9}{'p99':>9}{'FPS':>10}"
+    if baseline:
+        header += f"{'p50变化':>10}"
+    print(header)
+    for name, r in results.items():
+        line = f"{name:<38}{r['p50_ms']:>9.3f}{r['p95_ms']:>9.3f}{r['p99_ms']:>9.3f}{r['fps']:>10.1f}"
+        if baseline and name in baseline:
+            old = baseline[name]["p50_ms"]
+            line += f"{(r['p50_ms'] - old) / old * 100 if old else 0.0:>+9.1f}%"
+        print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="my_v.py 每帧热点路径基准测试")
+    parser.add_argument("--resource-dir", default=DEFAULT_RESOURCE_DIR, help="部件图片目录")
+    parser.add_argument("--landmarks", help="关键点录制文件(.avlm), 默认使用合成关键点")
+    parser.add_argument("--video", help="用于 process_frame 的视频文件, 默认使用合成帧")
+    parser.add_argument("--iterations", type=int, default=300, help="每项测试次数")
+    parser.add_argument("--complexity", type=int, nargs="*", default=[0, 1, 2], help="要测试的 model_complexity")
+    parser.add_argument("--skip-inference", action="store_true", help="跳过 process_frame 测试")
+    parser.add_argument("--cache-mb", type=float, default=64, help="旋转缓存预算, 0为关闭")
+    parser.add_argument("--window", type=int, nargs=2, default=(1200, 800), help="窗口尺寸")
+    parser.add_argument("--skip-numpy", action="store_true", help="跳过 numpy 合成器测试")
+    parser.add_argument("--output", help="把结果保存为JSON")
+    parser.add_argument("--compare", help="与之前保存的JSON结果对比")
+    args = parser.parse_args()
+
+    driver = make_driver(args.resource_dir, tuple(args.window), args.cache_mb)
+    landmarks = load_landmarks(args.landmarks) if args.landmarks else synthetic_landmarks()
+
+    results = {}
+    if not args.skip_inference:
+        results.update(bench_process_frame(driver, args.complexity, max(10, args.iterations // 5), args.video))
+    results.update(bench_render(driver, landmarks, args.iterations))
+    if not args.skip_numpy:
+        results.update(bench_compositor(args.resource_dir, tuple(args.window), landmarks, args.iterations))
+
+    baseline = None
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)["results"]
+    print_results(results, baseline)
+
+    if args.output:
+        report = {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "machine": {
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "processor": platform.processor(),
+                "cpu_count": os.cpu_count(),
+            },
+            "config": {
+                "landmarks": args.landmarks or "synthetic",
+                "video": args.video or "synthetic",
+                "iterations": args.iterations,
+                "cache_mb": args.cache_mb,
+                "window": list(args.window),
+            },
+            "results": results,
+        }
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+        print(f"结果已保存: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
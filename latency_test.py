@@ -0,0 +1,94 @@
+"""
+动作到画面延迟闭环测试
+功能：
+  1. 不需要摄像头和真人: 合成视频中白色方块周期性地左右跳变, 替身姿态模型让人物跟着方块换边
+  2. 每帧刷新后检查渲染结果, 记录人物换边的时刻, 与方块跳变的采集时刻相减得到端到端延迟
+  3. 同时输出驱动内部按时间戳统计的延迟分布, 两者应基本一致
+  4. --infer-ms 模拟模型推理耗时, 可以比较顺序/流水线/预测等运行方式
+
+用法:
+  python latency_test.py                              # 顺序运行 10 秒
+  python latency_test.py --pipelined --infer-ms 30
+  python latency_test.py --show --output latency.json # 打开真实窗口测试
+"""
+
+import argparse
+import json
+import os
+
+DEFAULT_RESOURCE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                    "processed_character_parts", "character_parts")
+
+
+def run(args):
+    import numpy as np
+    import pygame
+
+    from my_v import AnimeCharacterDriver
+    from units.compositor import NumpyCompositor
+    from units.latency import MarkerPose, MarkerSource, TransitionChecker
+
+    source = MarkerSource(duration=args.seconds, fps=args.fps, period=args.period)
+    driver = AnimeCharacterDriver(args.resource_dir, window_size=tuple(args.size), frame_source=source,
+                                  pose_model=MarkerPose(delay=args.infer_ms / 1000),
+                                  pipelined=args.pipelined, predict_mode=args.predict,
+                                  render_fps=args.render_fps, backend=args.backend, mirror=False,
+                                  latency_report=args.output)
+
+    renderer = driver.renderer
+    if isinstance(renderer, NumpyCompositor):
+        checker = TransitionChecker(source.events, np.array((*driver.BACKGROUND_COLOR, 255), dtype=np.uint8))
+        driver.frame_observer = lambda shown: checker.observe(renderer.frame, shown)
+    else:
+        checker = TransitionChecker(source.events, renderer.screen.map_rgb(driver.BACKGROUND_COLOR))
+
+        def observe(shown):
+            pixels = pygame.surfarray.pixels2d(renderer.screen)
+            try:
+                checker.observe(pixels.T, shown)
+            finally:
+                del pixels
+
+        driver.frame_observer = observe
+
+    # run() 结束时会打印并保存驱动内部的延迟分布
+    driver.run()
+    return checker.report(), driver.latency.summary()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="动作到画面延迟闭环测试")
+    parser.add_argument("--resource-dir", default=DEFAULT_RESOURCE_DIR, help="部件图片目录")
+    parser.add_argument("--seconds", type=float, default=10.0, help="测试时长")
+    parser.add_argument("--fps", type=float, default=30.0, help="合成视频帧率")
+    parser.add_argument("--period", type=float, default=1.0, help="方块左右往返一次的时间(秒)")
+    parser.add_argument("--infer-ms", type=float, default=0.0, help="模拟的推理耗时")
+    parser.add_argument("--pipelined", action="store_true", help="采集/推理/渲染分线程运行")
+    parser.add_argument("--predict", choices=["interpolate", "extrapolate"], help="关键点插值或外推")
+    parser.add_argument("--render-fps", type=int, help="渲染帧率上限")
+    parser.add_argument("--backend", choices=["pygame", "numpy"], default="pygame", help="渲染后端")
+    parser.add_argument("--size", type=int, nargs=2, default=(1200, 800), help="窗口尺寸")
+    parser.add_argument("--show", action="store_true", help="打开真实窗口, 默认使用 SDL dummy 驱动")
+    parser.add_argument("--output", help="把驱动内部的延迟分布保存为JSON")
+    args = parser.parse_args()
+
+    if not args.show:
+        os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+    measured, internal = run(args)
+    print(f"方块跳变 {measured['events']} 次, 画面换边 {measured['detections']} 次, 漏检 {measured['missed']}")
+    if measured["count"]:
+        print(f"闭环测量: 平均 {measured['mean_ms']:.1f} ms p50 {measured['p50_ms']:.1f} "
+              f"p95 {measured['p95_ms']:.1f} p99 {measured['p99_ms']:.1f} 最大 {measured['max_ms']:.1f} ms")
+    if args.output:
+        with open(args.output, encoding="utf-8") as f:
+            report = json.load(f)
+        report["loop_test"] = {"config": vars(args), "measured": measured}
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+    return measured, internal
+
+
+if __name__ == "__main__":
+    main()
@@ -1,213 +1,409 @@
+import time
+
+# 启动计时从导入模块开始; MediaPipe 在后台线程创建模型时才导入
+_IMPORT_START = time.perf_counter()
+
+import argparse
 import cv2
-import mediapipe as mp
+import json
 import pygame
 import numpy as np
-import math
 import os
-import sys
+import threading
+
+from units.pipeline import FramePipeline
+from units.bone_transform import BoneTable, PoseLandmark, VisibilityCuller, landmarks_to_array, solve_bones
+from units.landmark_record import LandmarkRecorder, LandmarkReplay
+from units.metrics import StageMetrics
+from units.adaptive_pose import AdaptivePose
+from units.roi_tracker import RoiTracker
+from units.landmark_predictor import create_predictor
+from units.compositor import NumpyCompositor, RenderBackend
+from units.pygame_backend import PygameBackend
+from units.pose_broadcast import PoseBroadcaster
+from units.frame_ring import FrameRingWriter
+from units.pose_worker import PoseWorker
+from units.camera_grabber import CameraGrabber
+from units.latency import LatencyLog
+from units.startup import BackgroundInit, StartupTimer, warm_up_pose
+from units.rig import RigFile, default_rig
+from units.asset_watcher import AssetWatcher
+from units.holistic import GatedHolistic
+
+_IMPORT_END = time.perf_counter()
 
 
 class AnimeCharacterDriver:
-    def __init__(self, resource_dir, camera_index=0, window_size=(1000, 700)):
+    def __init__(self, resource_dir, camera_index=0, window_size=(1000, 700),
+                 pipelined=False, frame_source=None, pose_model=None,
+                 cache_budget_mb=64, prewarm_cache=False, record_path=None,
+                 metrics_dir=None, inference_budget_ms=None, roi_tracking=False,
+                 inference_interval=1, predict_mode=None, render_fps=None, use_atlas=True,
+                 dirty_rects=False, backend="pygame", mirror=True, broadcast_port=None,
+                 frame_ring=None, inference_process=False, camera_fourcc=None, camera_fps=None,
+                 camera_buffer=1, latency_report=None, rig_path=None, watch_assets=False,
+                 holistic=False, cull_mode=None, cull_threshold=0.5):
 
         self.resource_dir = resource_dir        # 体块图片位置
         self.camera_index = camera_index        # 摄像头编号
         self.width, self.height = window_size   # 可视化窗口长宽
+        self.pipelined = pipelined              # 采集/推理/渲染分线程运行
+        self.mirror = mirror                    # 画面水平镜像, 摄像头自拍视角需要
 
-        # 初始化MediaPipe姿态检测模型
-        self.mp_pose = mp.solutions.pose
-        self.pose = self.mp_pose.Pose(
-            min_detection_confidence=0.5,
-            min_tracking_confidence=0.5,
-            model_complexity=2
-        )
-
-        # 初始化Pygame
-        pygame.init()
-        self.screen = pygame.display.set_mode((self.width, self.height))
-        pygame.display.set_caption("骨骼绑定二次元人物驱动 - 按ESC退出")
-        self.clock = pygame.time.Clock()
-
-        # 加载角色部件
-        self.character_parts = self.load_character_parts()
-
-        # 定义部件绑定关系
-        self.PART_BINDINGS = {
-            "head": (self.mp_pose.PoseLandmark.NOSE, None),
-            "body": (self.mp_pose.PoseLandmark.LEFT_SHOULDER, self.mp_pose.PoseLandmark.RIGHT_SHOULDER),
-            "left_upper_arm": (self.mp_pose.PoseLandmark.LEFT_SHOULDER, self.mp_pose.PoseLandmark.LEFT_ELBOW),
-            "left_lower_arm": (self.mp_pose.PoseLandmark.LEFT_ELBOW, self.mp_pose.PoseLandmark.LEFT_WRIST),
-            "left_hand": (self.mp_pose.PoseLandmark.LEFT_WRIST, self.mp_pose.PoseLandmark.LEFT_PINKY),
-            "right_upper_arm": (self.mp_pose.PoseLandmark.RIGHT_SHOULDER, self.mp_pose.PoseLandmark.RIGHT_ELBOW),
-            "right_lower_arm": (self.mp_pose.PoseLandmark.RIGHT_ELBOW, self.mp_pose.PoseLandmark.RIGHT_WRIST),
-            "right_hand": (self.mp_pose.PoseLandmark.RIGHT_WRIST, self.mp_pose.PoseLandmark.RIGHT_PINKY),
-            "left_upper_leg": (self.mp_pose.PoseLandmark.LEFT_HIP, self.mp_pose.PoseLandmark.LEFT_KNEE),
-            "left_lower_leg": (self.mp_pose.PoseLandmark.LEFT_KNEE, self.mp_pose.PoseLandmark.LEFT_ANKLE),
-            "left_foot": (self.mp_pose.PoseLandmark.LEFT_ANKLE, self.mp_pose.PoseLandmark.LEFT_HEEL),
-            "right_upper_leg": (self.mp_pose.PoseLandmark.RIGHT_HIP, self.mp_pose.PoseLandmark.RIGHT_KNEE),
-            "right_lower_leg": (self.mp_pose.PoseLandmark.RIGHT_KNEE, self.mp_pose.PoseLandmark.RIGHT_ANKLE),
-            "right_foot": (self.mp_pose.PoseLandmark.RIGHT_ANKLE, self.mp_pose.PoseLandmark.RIGHT_HEEL)
-        }
-
-        # 渲染顺序
-        self.RENDER_ORDER = [
-            "left_upper_leg", "right_upper_leg",
-            "left_lower_leg", "right_lower_leg",
-            "left_foot", "right_foot",
-            "body",
-            "left_upper_arm", "right_upper_arm",
-            "left_lower_arm", "right_lower_arm",
-            "left_hand", "right_hand",
-            "head"
-        ]
+        # 分阶段启动: 先显示窗口, 模型在后台创建预热, 同时打开摄像头、加载部件
+        self.startup = StartupTimer(_IMPORT_START)
+        self.startup.add("导入模块", _IMPORT_START, _IMPORT_END - _IMPORT_START)
 
         # 背景颜色
         self.BACKGROUND_COLOR = (240, 248, 255)
 
+        # 渲染后端: pygame 交互窗口, 或不需要窗口的 numpy 合成器, 也可以直接传入 RenderBackend 对象
+        # 加载期间显示占位画面
+        t0 = time.perf_counter()
+        self.renderer = self.create_renderer(backend, cache_budget_mb=cache_budget_mb, prewarm_cache=prewarm_cache,
+                                             use_atlas=use_atlas, dirty_rects=dirty_rects)
+        self.renderer.show_placeholder("正在加载...")
+        if self.renderer.interactive:
+            self.startup.add("显示窗口", t0, time.perf_counter() - t0)
+
+        # 回放源直接提供关键点, 不需要姿态模型
+        self.replay = getattr(frame_source, "provides_landmarks", False)
+
+        # MediaPipe姿态检测模型在后台线程创建并预热, 就绪前 process_frame 返回 None
+        # inference_process 时在单独的进程中推理
+        self.inference_process = inference_process and pose_model is None and not self.replay
+        factory = PoseWorker if self.inference_process else self.create_pose
+        # 手部/面部只在对应区域可见且足够大时隔帧检测, 模型与姿态模型一起在后台创建
+        self.holistic = GatedHolistic() if holistic and not self.replay else None
+        self.pose_loader = None
+        if pose_model is not None or self.replay:
+            self.pose = pose_model
+        else:
+            if inference_budget_ms:
+                # 按推理耗时预算在 complexity 0/1/2 之间自动切换
+                build = lambda: AdaptivePose(factory, budget_ms=inference_budget_ms)
+            else:
+                build = lambda: factory(2)
+            self.pose = None
+            self.pose_loader = BackgroundInit(lambda: self.load_models(build), name="pose-loader")
+
+        # 打开摄像头(可传入任何带 read()/release() 的帧源代替)
+        # 摄像头由后台线程打开和采集, read() 只返回最新一帧
+        if frame_source is not None:
+            self.cap = frame_source
+        else:
+            self.cap = CameraGrabber(self.camera_index, size=(640, 480), fps=camera_fps,
+                                     fourcc=camera_fourcc, buffer_size=camera_buffer)
+        self.capture_time = None    # 最近一帧的采集时刻
+        self._first_capture = True
+        self.pipeline = None
+
+        # 角色骨骼配置: 部件、锚点、绑定的关键点、绘制顺序和缩放
+        # 没有指定时使用图片目录中的 rig.json, 都没有则使用默认配置; 配置文件修改后自动重新加载
+        if rig_path is None and os.path.exists(os.path.join(self.resource_dir, "rig.json")):
+            rig_path = os.path.join(self.resource_dir, "rig.json")
+        self.rig_file = RigFile(rig_path, PoseLandmark) if rig_path else None
+        self.rig = self.rig_file.rig if self.rig_file else default_rig(PoseLandmark)
+        self._part_sources = {}     # 部件名 -> 从磁盘读取的原图, 重新加载配置时只读取变化的部件
+        self._asset_lock = threading.Lock()     # 渲染线程和图片监视线程不同时读取部件
+
+        # 两端关键点不可见的部件跳过或冻结 (cull_mode: hide/freeze), None 时全部绘制
+        self.culler = VisibilityCuller(cull_threshold, cull_mode) if cull_mode else None
+
+        # 按渲染后端的格式加载角色部件
+        with self.startup.phase("加载部件"):
+            self.character_parts = self.load_parts()
+
+        # 把骨骼配置编译成索引数组, 每帧直接使用
+        self.compile_rig()
+
+        # 部件图片修改后在后台重新加载, 渲染线程在两帧之间换上
+        self.asset_watcher = None
+        if watch_assets:
+            self.asset_watcher = AssetWatcher(self.resource_dir, self.reload_assets,
+                                              patterns=("*.png", "manifest.json"))
+        self._landmark_buffer = np.empty((33, 4), dtype=np.float32)
+
         # 人物位置偏移
         self.character_offset_x = self.width // 2
         self.character_offset_y = self.height // 2
 
-        # 打开摄像头
-        self.cap = cv2.VideoCapture(self.camera_index)
-        self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, 640)
-        self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, 480)
-
-        # 加载字体
-        try:
-            self.font = pygame.font.SysFont("microsoftyahei", 24)
-        except:
-            self.font = pygame.font.SysFont(None, 24)
-
-
-    def load_character_parts(self):
-        """加载角色部件资源"""
-        BODY_PARTS = {
-            "head": {"file": "head.png", "anchor": (0.5, 0.8)},
-            "body": {"file": "body.png", "anchor": (0.5, 0.2)},
-            "left_upper_arm": {"file": "left_upper_arm.png", "anchor": (0.2, 0.5)},
-            "left_lower_arm": {"file": "left_lower_arm.png", "anchor": (0.2, 0.8)},
-            "left_hand": {"file": "left_hand.png", "anchor": (0.5, 0.2)},
-            "right_upper_arm": {"file": "right_upper_arm.png", "anchor": (0.8, 0.5)},
-            "right_lower_arm": {"file": "right_lower_arm.png", "anchor": (0.8, 0.8)},
-            "right_hand": {"file": "right_hand.png", "anchor": (0.5, 0.2)},
-            "left_upper_leg": {"file": "left_upper_leg.png", "anchor": (0.3, 0.2)},
-            "left_lower_leg": {"file": "left_lower_leg.png", "anchor": (0.5, 0.2)},
-            "left_foot": {"file": "left_foot.png", "anchor": (0.5, 0.2)},
-            "right_upper_leg": {"file": "right_upper_leg.png", "anchor": (0.7, 0.2)},
-            "right_lower_leg": {"file": "right_lower_leg.png", "anchor": (0.5, 0.2)},
-            "right_foot": {"file": "right_foot.png", "anchor": (0.5, 0.2)}
+        # 只对人物所在区域做推理
+        self.roi_tracker = RoiTracker() if roi_tracking else None
+
+        # 每隔 inference_interval 帧推理一次, 中间帧用插值/外推补齐
+        self.inference_interval = max(1, inference_interval)
+        self.predictor = create_predictor(predict_mode)
+        if render_fps is None:
+            # 逐帧推理时与摄像头同步为30帧, 渲染与推理解耦后提高到60帧
+            decoupled = pipelined or self.inference_interval > 1 or self.predictor is not None
+            render_fps = 60 if decoupled else 30
+        self.render_fps = render_fps
+        if isinstance(self.cap, CameraGrabber) and self.renderer.interactive and not pipelined:
+            # 顺序模式在渲染线程里读取: 最多等一帧的时间, 摄像头未就绪或重连时照常渲染和处理事件
+            # 无窗口和流水线模式不在渲染线程读取, 保留较长的等待
+            self.cap.read_timeout = 1.0 / self.render_fps
+
+        # 关键点录制
+        self.recorder = LandmarkRecorder(record_path) if record_path else None
+
+        # 通过UDP把每次推理的关键点和部件角度广播给其他程序
+        self.broadcaster = None
+        if broadcast_port is not None:
+            self.broadcaster = PoseBroadcaster(self.bone_table.names, port=broadcast_port,
+                                               canvas_size=(self.width, self.height))
+            print(f"姿态广播: udp://{self.broadcaster.address[0]}:{self.broadcaster.address[1]}")
+
+        # 把每帧画面写入共享内存环形缓冲, 供OBS、录制等其他进程直接读取
+        self.frame_ring = None
+        if frame_ring:
+            self.frame_ring = FrameRingWriter((self.width, self.height), frame_ring, self.renderer.pixel_format())
+            print(f"共享内存画面: {self.frame_ring.name} {self.width}x{self.height} {self.frame_ring.format}")
+
+        # 分阶段耗时统计, F1显示/隐藏叠加层
+        self.metrics = StageMetrics(export_dir=metrics_dir)
+        self.show_metrics = False
+
+        # 动作到画面延迟: 每次新推理结果从采集时刻到画面刷新完成的时间, 保留完整分布
+        self.latency = LatencyLog()
+        self.latency_report = latency_report
+        self.frame_observer = None      # frame_observer(刷新完成时刻), 闭环延迟测试在这里检查画面
+
+
+    def create_renderer(self, backend, **options):
+        """按名称创建渲染后端, 已经是 RenderBackend 对象时直接使用"""
+        if isinstance(backend, RenderBackend):
+            return backend
+        size = (self.width, self.height)
+        factories = {
+            "pygame": lambda: PygameBackend(size, self.BACKGROUND_COLOR, **options),
+            "numpy": lambda: NumpyCompositor(size, self.BACKGROUND_COLOR),
         }
+        if backend not in factories:
+            raise ValueError(f"未知的渲染后端: {backend}")
+        return factories[backend]()
+
+    def loading_text(self):
+        """
+        模型还在加载时的提示文字, 渲染线程每帧调用
+        后台加载失败时在这里重新抛出异常: 流水线模式下推理线程只会把失败当作"还没加载好"
+        """
+        if self.pose is None and self.pose_loader is not None:
+            if self.pose_loader.error is not None:
+                self.pose_loader.get()
+            return "正在加载姿态模型..."
+        return None
+
+    def load_models(self, build):
+        """后台线程: 创建并预热姿态模型, 启用 holistic 时同时创建手部/面部模型"""
+        pose = warm_up_pose(build, self.startup)
+        if self.holistic is not None:
+            with self.startup.phase("手部/面部模型"):
+                self.holistic.prepare()
+        return pose
+
+    def create_pose(self, model_complexity):
+        """创建MediaPipe姿态检测模型"""
+        import mediapipe as mp
+
+        return mp.solutions.pose.Pose(
+            min_detection_confidence=0.5,
+            min_tracking_confidence=0.5,
+            model_complexity=model_complexity
+        )
 
-        character_parts = {}
-        for part, info in BODY_PARTS.items():
-            try:
-                img_path = os.path.join(self.resource_dir, info["file"])
-                img = pygame.image.load(img_path)
-                img = img.convert_alpha()
-                character_parts[part] = {
-                    "image": img,
-                    "anchor": info["anchor"],
-                    "rect": img.get_rect()
-                }
-                print(f"加载部件: {part} 尺寸: {img.get_size()}")
-            except Exception as e:
-                print(f"警告: 无法加载部件 {info['file']}: {e}, 将使用占位图形")
-                surf = pygame.Surface((50, 50), pygame.SRCALPHA)
-                pygame.draw.rect(surf, (255, 0, 0, 128), (0, 0, 50, 50))
-                character_parts[part] = {
-                    "image": surf,
-                    "anchor": (0.5, 0.5),
-                    "rect": surf.get_rect()
-                }
-        return character_parts
+    def part_specs(self):
+        """
+        部件图片文件和锚点
+        骨骼配置文件中写明的优先; 默认配置的值只是缺省值, manifest 中有时使用 manifest 的
+        """
+        manifest = {}
+        manifest_path = os.path.join(self.resource_dir, "manifest.json")
+        if os.path.exists(manifest_path):
+            with open(manifest_path, encoding="utf-8") as f:
+                manifest = json.load(f).get("parts", {})
+
+        specs = {}
+        explicit = self.rig.path is not None
+        for part, rig_part in self.rig.parts.items():
+            # 预处理脚本(units/img_tf.py)生成的manifest
+            info = manifest.get(part, {})
+            file = rig_part["file"] if explicit else info.get("file", rig_part["file"])
+            if explicit:
+                anchor = rig_part["anchor"] or info.get("anchor") or (0.5, 0.5)
+            else:
+                anchor = info.get("anchor") or rig_part["anchor"]
+            anchor = tuple(anchor)
+            trim_offset = (0, 0)
+            # 锚点都是相对统一画布的比例, 图片被裁掉透明边时按 trim_rect 换算
+            if info.get("trim_rect") and info.get("file", file) == file:
+                x, y, w, h = info["trim_rect"]
+                canvas_w, canvas_h = info["size"]
+                anchor = ((anchor[0] * canvas_w - x) / w, (anchor[1] * canvas_h - y) / h)
+                trim_offset = (x, y)
+            specs[part] = {"file": file, "anchor": anchor, "trim_offset": trim_offset}
+        return specs
+
+    def refresh_sources(self, specs, reload, load):
+        """读取新增部件和 reload 中部件的原图, 丢掉已删除的部件; reload 为 None 时全部重新读取"""
+        for part, info in specs.items():
+            if reload is None or part in reload or part not in self._part_sources:
+                try:
+                    self._part_sources[part] = load(os.path.join(self.resource_dir, info["file"]))
+                except Exception as e:
+                    print(f"警告: 无法加载部件 {info['file']}: {e}, 将使用占位图形")
+                    self._part_sources[part] = None
+        for part in set(self._part_sources) - set(specs):
+            del self._part_sources[part]
+
+    def load_parts(self, reload=None):
+        """
+        加载角色部件资源, 格式由渲染后端决定
+        reload: 只重新读取这些部件的图片, 其余沿用已读取的原图; None 表示全部读取
+        """
+        specs = self.part_specs()
+        self.refresh_sources(specs, reload, self.renderer.load_image)
+        return self.renderer.build_parts(specs, self._part_sources)
+
+    def compile_rig(self):
+        """把骨骼配置和已加载的部件编译成 BoneTable, 每帧按索引直接取部件"""
+        self.PART_BINDINGS = self.rig.bindings
+        self.RENDER_ORDER = self.rig.order
+        self.bone_table = BoneTable.compile(self.PART_BINDINGS, self.RENDER_ORDER, self.character_parts,
+                                            self.rig.scales)
+        self.draw_parts = [self.character_parts[name] for name in self.bone_table.names]
+        # 只绑定了起点的头部由面部跟踪给出倾斜角度
+        names = self.bone_table.names
+        self.head_index = names.index("head") if "head" in names else None
+        if self.head_index is not None and self.bone_table.has_end[self.head_index]:
+            self.head_index = None
+        if self.culler is not None:
+            self.culler.reset()
+        self.renderer.bind(self.draw_parts, self.bone_table.scale)
+
+    def apply_rig(self, rig):
+        """换用新的骨骼配置, 只重新读取换了图片文件的部件, 不重建姿态模型"""
+        t0 = time.perf_counter()
+        old, self.rig = self.rig, rig
+        reload = rig.changed_files(old)
+        with self._asset_lock:
+            self.character_parts = self.load_parts(reload)
+        self.renderer.invalidate(reload)
+        self.compile_rig()
+        if self.broadcaster is not None and self.broadcaster.part_names != list(self.bone_table.names):
+            # 增删部件或调整顺序后广播包的布局随之改变, 订阅者会收到新的部件描述
+            self.broadcaster.set_parts(self.bone_table.names)
+        order = ", 绘制顺序已变化" if rig.order != old.order else ""
+        print(f"骨骼配置已更新: 变化的部件 {sorted(rig.changed_parts(old))}{order}, 重新读取图片 {sorted(reload)}, "
+              f"耗时 {(time.perf_counter() - t0) * 1000:.1f} ms")
+
+    def reload_assets(self, files):
+        """
+        图片监视线程中调用: 重新读取变化的部件图片, 生成新的部件表 (pygame 后端同时重新打包图集)
+        返回 (骨骼配置, 变化的部件, 部件表, 耗时), 由 swap_assets 在两帧之间换上
+        """
+        t0 = time.perf_counter()
+        with self._asset_lock:
+            rig = self.rig
+            specs = self.part_specs()
+            parts = {part for part, info in specs.items() if info["file"] in files}
+            if not parts and "manifest.json" not in files:
+                return None
+            character_parts = self.load_parts(parts)
+        return rig, parts, character_parts, time.perf_counter() - t0
+
+    def swap_assets(self, rig, parts, character_parts, seconds):
+        """渲染线程中换上后台加载好的部件, 只清除这些部件的旋转缓存"""
+        self.renderer.invalidate(parts)
+        if rig is not self.rig:
+            # 加载期间骨骼配置换过了, 新图片已在换配置时读入
+            return
+        self.character_parts = character_parts
+        self.compile_rig()
+        print(f"部件图片已更新: {sorted(parts) or 'manifest.json'}, 后台加载耗时 {seconds * 1000:.1f} ms")
+
+    def poll_resources(self):
+        """渲染循环每帧调用: 骨骼配置或部件图片有变化时换上新的"""
+        if self.rig_file is not None:
+            rig = self.rig_file.poll()
+            if rig is not None:
+                self.apply_rig(rig)
+        if self.asset_watcher is not None:
+            for result in self.asset_watcher.take():
+                self.swap_assets(*result)
 
 # ----------------------------------------------------------------------------------------------------------------------
 
-    @staticmethod
-    def calculate_rotation(start_point, end_point):
-        """计算两点之间的旋转角度"""
-        dx = end_point[0] - start_point[0]
-        dy = end_point[1] - start_point[1]
-        angle = math.degrees(math.atan2(-dy, dx))
-        return angle
-
-    def transform_part(self, part, landmarks, binding, scale=1.0):
-        """变换身体部件"""
-        # 获取绑定的关键点
-        start_idx = binding[0].value
-        end_idx = binding[1].value if binding[1] else None
-
-        # 获取起始点位置
-        start_point = landmarks[start_idx]
-        start_x = int(start_point["x"] * self.width)
-        start_y = int(start_point["y"] * self.height)
-
-        # 计算旋转角度
-        angle = 0
-        if end_idx is not None and end_idx < len(landmarks):
-            end_point = landmarks[end_idx]
-            end_x = int(end_point["x"] * self.width)
-            end_y = int(end_point["y"] * self.height)
-            angle = self.calculate_rotation((start_x, start_y), (end_x, end_y))
-
-        # 获取原始图像并缩放
-        original_image = part["image"]
-        if scale != 1.0:
-            new_size = (int(original_image.get_width() * scale),
-                        int(original_image.get_height() * scale))
-            scaled_image = pygame.transform.scale(original_image, new_size)
-        else:
-            scaled_image = original_image
-
-        # 旋转图像
-        rotated_image = pygame.transform.rotate(scaled_image, -angle)
-
-        # 计算锚点偏移
-        anchor_x = int(part["anchor"][0] * scaled_image.get_width())
-        anchor_y = int(part["anchor"][1] * scaled_image.get_height())
-
-        # 计算旋转后的位置
-        rotated_rect = rotated_image.get_rect()
-        pos_x = start_x - rotated_rect.width // 2
-        pos_y = start_y - rotated_rect.height // 2
-
-        return rotated_image, (pos_x, pos_y)
-
-
-    def draw_character(self, landmarks):
-        """绘制骨骼绑定的人物"""
-        if not landmarks:
-            return
-
-        # 创建偏移关键点
-        offset_landmarks = []
-        for lm in landmarks:
-            offset_landmarks.append({
-                "x": lm.x,
-                "y": lm.y,
-                "visibility": lm.visibility
-            })
-
-        # 调整位置
-        for lm in offset_landmarks:
-            lm["x"] = lm["x"] * 0.7 + 0.15
-            lm["y"] = lm["y"] * 0.7 + 0.15
-
-        # 按顺序绘制部件
-        for part_name in self.RENDER_ORDER:
-            if part_name in self.character_parts and part_name in self.PART_BINDINGS:
-                part = self.character_parts[part_name]
-                binding = self.PART_BINDINGS[part_name]
-                img, pos = self.transform_part(part, offset_landmarks, binding)
-                self.screen.blit(img, pos)
+    def solve(self, points):
+        """计算所有部件的位置和角度, 启用 holistic 时加上面部跟踪的头部倾斜"""
+        bones = solve_bones(self.bone_table, points, self.width, self.height)
+        if self.holistic is not None and self.head_index is not None:
+            self.holistic.apply_head(bones, self.bone_table, self.head_index, self.width, self.height)
+        return bones
+
+    def cull(self, points, bones):
+        """按可见度剔除部件, 返回 (bones, 每个部件是否绘制), 未启用时为 (bones, None)"""
+        if self.culler is None:
+            return bones, None
+        bones, draw = self.culler.apply(self.bone_table, points, bones)
+        self.metrics.set_counter("culled", self.culler.culled)
+        if self.culler.mode == "freeze":
+            self.metrics.set_counter("frozen", self.culler.frozen)
+        return bones, draw
+
+    def pose_bones(self, landmarks):
+        """一次向量化计算所有部件的位置与角度, 返回 (bones, 每个部件是否绘制), 没有人物时为 (None, None)"""
+        if landmarks is None or len(landmarks) == 0:
+            return None, None
+        t0 = time.perf_counter()
+        points = landmarks_to_array(landmarks, self._landmark_buffer)
+        bones, draw = self.cull(points, self.solve(points))
+        self.metrics.record("transform", time.perf_counter() - t0)
+        return bones, draw
 
     def process_frame(self, frame):
         """处理摄像头帧并检测姿态关键点"""
-        image = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+        if self.replay:
+            # 回放源的"帧"就是关键点数组
+            return frame
+        if self.pose is None:
+            # 模型还在后台加载, 先显示空画面; 加载失败由渲染线程在 loading_text 中报告
+            if not self.pose_loader.ready() or self.pose_loader.error is not None:
+                return None
+            self.pose = self.pose_loader.get()
+        t0 = time.perf_counter()
+        image = frame
+        if self.roi_tracker is not None:
+            image, mapping = self.roi_tracker.crop(frame)
+        image = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
         image.flags.writeable = False
+        t1 = time.perf_counter()
         results = self.pose.process(image)
-        return results.pose_landmarks.landmark if results.pose_landmarks else None
+        self.metrics.record("color", t1 - t0)
+        self.metrics.record("inference", time.perf_counter() - t1)
+        if isinstance(self.pose, AdaptivePose):
+            self.metrics.set_counter("complexity", self.pose.level)
+        landmarks = results.pose_landmarks.landmark if results.pose_landmarks else None
+
+        if self.roi_tracker is not None:
+            # 映射回整帧坐标, 并用它决定下一帧的ROI
+            if landmarks is not None:
+                landmarks = RoiTracker.to_full_frame(landmarks_to_array(landmarks), mapping)
+            self.roi_tracker.update(landmarks, frame.shape)
+            self.metrics.set_counter("roi_pixels", self.roi_tracker.pixels)
+        if self.holistic is not None and landmarks is not None:
+            # 在整帧上裁剪手部/面部区域检测, 手部结果替换姿态中的手腕和指根
+            t0 = time.perf_counter()
+            landmarks = self.holistic.process(frame, landmarks_to_array(landmarks))
+            self.metrics.record("holistic", time.perf_counter() - t0)
+            self.metrics.set_counter("hands", self.holistic.active_hands)
+            self.metrics.set_counter("face", int(self.holistic.face_active))
+        if self.recorder is not None:
+            self.recorder.write(landmarks)
+        if self.pose_loader is not None and not self.startup.reported:
+            self.startup.mark("首次检测")
+            self.startup.print_report()
+        return landmarks
 
 
     def handle_events(self):
@@ -226,60 +422,335 @@ class AnimeCharacterDriver:
                     self.character_offset_x -= 10
                 elif event.key == pygame.K_RIGHT:
                     self.character_offset_x += 10
+                elif event.key == pygame.K_F1:
+                    self.show_metrics = not self.show_metrics
+            elif event.type in (pygame.VIDEOEXPOSE, pygame.WINDOWEXPOSED):
+                self.renderer.invalidate()
         return True
 
+    def read_frame(self):
+        """读取一帧, 默认水平镜像翻转"""
+        t0 = time.perf_counter()
+        ret, frame = self.cap.read()
+        self.metrics.record("capture", time.perf_counter() - t0)
+        if not ret:
+            self.metrics.count("read_failures")
+            return False, None
+        # 采集线程记录的时间戳更接近真实的曝光时刻, 其他帧源取读取完成的时间
+        self.capture_time = getattr(self.cap, "last_timestamp", None) or time.perf_counter()
+        if self._first_capture:
+            self._first_capture = False
+            self.startup.add("摄像头首帧", self.capture_time, 0.0)
+        if self.replay or not self.mirror:
+            # 录制的关键点来自已翻转的画面
+            return True, frame
+        return True, cv2.flip(frame, 1)
+
+    def render_frame(self, landmarks, status_text=None, capture_time=None):
+        """
+        绘制一帧画面并显示, 返回画面 (numpy 后端为 RGBA 数组, 下一帧会被覆盖)
+        capture_time: 本帧关键点第一次显示时传入它的采集时刻, 用于统计动作到画面延迟
+        """
+        frame = self.compose_frame(landmarks, status_text)
+        if self.frame_ring is not None:
+            self.export_frame()
+        t0 = time.perf_counter()
+        self.renderer.present()
+        shown = time.perf_counter()
+        self.metrics.record("flip", shown - t0)
+        self.frame_shown(shown, capture_time)
+        self.metrics.maybe_export()
+        return frame
+
+    def frame_shown(self, shown, capture_time):
+        """画面刷新完成后记录延迟, 模型加载期间的空画面不计入"""
+        if capture_time is not None and self.loading_text() is None:
+            self.latency.add(shown - capture_time)
+            self.metrics.record("motion_to_photon", shown - capture_time)
+        if self.frame_observer is not None:
+            self.frame_observer(shown)
+
+    def compose_frame(self, landmarks, status_text=None):
+        """用渲染后端画出一帧(不刷新显示), 返回画面"""
+        bones, draw = self.pose_bones(landmarks)
+        overlay = self.metrics.overlay_lines() if self.show_metrics else None
+        t0 = time.perf_counter()
+        frame = self.renderer.render(bones, draw, status_text, overlay)
+        self.metrics.record("blit", time.perf_counter() - t0)
+        for name, value in self.renderer.counters().items():
+            self.metrics.set_counter(name, value)
+        return frame
+
+    def export_frame(self):
+        """把画面写入共享内存"""
+        t0 = time.perf_counter()
+        self.renderer.export(self.frame_ring)
+        self.metrics.record("export", time.perf_counter() - t0)
+
     def run(self):
         """主运行循环"""
+        if not self.renderer.interactive:
+            self.run_headless()
+            return
+        if self.pipelined:
+            self.run_pipelined()
+            return
+
         running = True
+        frame_index = 0
+        landmarks = None
         while running:
             # 处理事件
             running = self.handle_events()
+            self.poll_resources()
+
+            shown_capture = None
+            if frame_index % self.inference_interval == 0:
+                # 读取摄像头帧(已水平镜像翻转)
+                ret, frame = self.read_frame()
+                if ret:
+                    # 处理帧并获取关键点
+                    landmarks = self.process_frame(frame)
+                    shown_capture = self.capture_time
+                    self.publish_pose(landmarks, self.capture_time)
+                    if self.predictor is not None:
+                        self.predictor.add(self.predictor_input(landmarks), self.capture_time)
+                elif getattr(self.cap, "finished", False):
+                    break
+                # 读取失败时照常渲染上一次的结果, 由 renderer.tick 控制节奏, 不空转
+            frame_index += 1
+
+            self.render_frame(self.predicted_landmarks(landmarks), self.loading_text(), shown_capture)
+            self.renderer.tick(self.render_fps)
 
-            # 读取摄像头帧
-            ret, frame = self.cap.read()
-            if not ret:
-                print("无法从摄像头获取帧")
-                continue
-
-            # 水平镜像翻转
-            frame = cv2.flip(frame, 1)
-
-            # 处理帧并获取关键点
-            landmarks = self.process_frame(frame)
-
-            # 清空屏幕
-            self.screen.fill(self.BACKGROUND_COLOR)
-
-            # 绘制人物
-            if landmarks:
-                self.draw_character(landmarks)
-
-            # 绘制UI元素
-            title = self.font.render("骨骼绑定二次元人物驱动系统", True, (0, 0, 0))
-            help_text = self.font.render("方向键移动人物位置 | ESC退出", True, (100, 100, 100))
-            fps_text = self.font.render(f"帧率: {int(self.clock.get_fps())} FPS", True, (0, 0, 0))
-
-            self.screen.blit(title, (20, 20))
-            self.screen.blit(help_text, (20, self.height - 40))
-            self.screen.blit(fps_text, (self.width - 150, self.height - 40))
+        # 清理资源
+        self.release()
+
+    def run_headless(self, frame_sink=None):
+        """
+        无窗口运行, 帧源读完为止, 结束后释放所有资源
+        frame_sink(帧序号, RGBA数组): 处理每帧画面, 例如写入视频
+        返回: 渲染的帧数
+        """
+        try:
+            return self.render_source(frame_sink=frame_sink)
+        finally:
+            self.release()
+
+    def render_source(self, source=None, frame_sink=None):
+        """
+        无窗口渲染一个帧源直到读完, 只释放帧源, 驱动可以继续渲染下一个帧源
+        source: 新的帧源, 传入时先清空上一段的延迟、耗时统计和跟踪状态; None 表示使用当前帧源
+        返回: 渲染的帧数
+        """
+        if source is not None:
+            self.cap = source
+            self.reset_run_state()
+        if self.pose is None and self.pose_loader is not None:
+            # 离线处理不能丢帧, 等模型加载完再开始读取
+            self.pose = self.pose_loader.wait()
+        frames = 0
+        t0 = time.perf_counter()
+        try:
+            while True:
+                self.poll_resources()
+                ret, frame = self.read_frame()
+                if not ret:
+                    break
+                landmarks = self.process_frame(frame)
+                self.publish_pose(landmarks, self.capture_time)
+                image = self.render_frame(landmarks, capture_time=self.capture_time)
+                if frame_sink is not None:
+                    frame_sink(frames, image)
+                frames += 1
+        finally:
+            elapsed = time.perf_counter() - t0
+            print(f"无窗口渲染 {frames} 帧, {frames / elapsed if elapsed > 0 else 0:.1f} FPS")
+            self.cap.release()
+        return frames
+
+    def reset_run_state(self):
+        """换帧源时清空与上一段画面相关的状态, 模型和已加载的部件保留"""
+        self.capture_time = None
+        self.latency = LatencyLog()
+        self.metrics = StageMetrics(export_dir=self.metrics.export_dir)
+        if self.roi_tracker is not None:
+            self.roi_tracker.reset()
+        if self.predictor is not None:
+            self.predictor.reset()
+        if self.culler is not None:
+            self.culler.reset()
+        if self.holistic is not None:
+            self.holistic.reset()
+
+    def publish_pose(self, landmarks, capture_time):
+        """广播一次推理结果, 不阻塞"""
+        if self.broadcaster is None:
+            return
+        if landmarks is None or len(landmarks) == 0:
+            self.broadcaster.publish(None, capture_time=capture_time)
+            return
+        points = landmarks_to_array(landmarks)
+        # 启用 holistic 时附带面部跟踪得到的张嘴、睁眼程度
+        expression = self.holistic.expression if self.holistic is not None else None
+        self.broadcaster.publish(points, self.solve(points), capture_time, expression)
+
+    def predictor_input(self, landmarks):
+        """转换为预测器使用的 (33, 4) 数组"""
+        return None if landmarks is None else landmarks_to_array(landmarks).copy()
+
+    def predicted_landmarks(self, landmarks):
+        """启用预测时返回插值/外推到当前时刻的关键点"""
+        if self.predictor is None:
+            return landmarks
+        return self.predictor.predict(time.perf_counter())
+
+    def release(self):
+        """释放摄像头、录制文件和渲染后端"""
+        self.cap.release()
+        if self.asset_watcher is not None:
+            self.asset_watcher.close()
+        if self.holistic is not None:
+            print(f"手部/面部检测: {self.holistic.stats()}")
+            self.holistic.close()
+        if isinstance(self.cap, CameraGrabber):
+            print(f"摄像头采集: {self.cap.stats()}")
+        if self.inference_process:
+            # 加载中途退出时等模型建好再关闭, 释放推理进程和共享内存
+            pose = self.pose
+            if pose is None and self.pose_loader.error is None:
+                pose = self.pose_loader.wait(10.0)
+            if pose is not None:
+                pose.close()
+        if self.metrics.export_dir:
+            self.metrics.export()
+        if len(self.latency):
+            print(f"动作到画面延迟: {self.latency.summary_text()}")
+        if self.latency_report:
+            self.latency.save(self.latency_report)
+            print(f"延迟分布已保存: {self.latency_report}")
+        if self.recorder is not None:
+            self.recorder.close()
+            print(f"已录制 {self.recorder.frames} 帧关键点: {self.recorder.path}")
+        if self.broadcaster is not None:
+            print(f"姿态广播: {self.broadcaster.stats()}")
+            self.broadcaster.close()
+            self.broadcaster = None
+        if self.frame_ring is not None:
+            self.frame_ring.close()
+            self.frame_ring = None
+        self.renderer.close()
+
+    def run_pipelined(self):
+        """流水线运行: 采集和推理在后台线程, 渲染只取最新结果, 不等待推理"""
+        self.pipeline = FramePipeline(self.read_frame, self.process_frame,
+                                      capture_time=lambda: self.capture_time)
+        self.pipeline.start()
 
-            # 更新显示
-            pygame.display.flip()
-            self.clock.tick(30)
+        running = True
+        try:
+            while running:
+                running = self.handle_events()
+                self.poll_resources()
+                if getattr(self.cap, "finished", False) and not self.pipeline.pending():
+                    break
+
+                t0 = time.perf_counter()
+                packet, is_new = self.pipeline.latest()
+                landmarks = packet.landmarks if packet is not None else None
+                if is_new:
+                    self.publish_pose(landmarks, packet.capture_time)
+                if is_new and self.predictor is not None:
+                    self.predictor.add(self.predictor_input(landmarks), packet.capture_time)
+                self.render_frame(self.predicted_landmarks(landmarks),
+                                  self.loading_text() or self.pipeline.summary_text(),
+                                  packet.capture_time if is_new else None)
+                self.pipeline.frame_rendered(packet, time.perf_counter() - t0, is_new)
+                self.metrics.set_counter("dropped", self.pipeline.frame_queue.dropped
+                                         + self.pipeline.result_queue.dropped)
+
+                self.renderer.tick(self.render_fps)
+        finally:
+            self.pipeline.stop()
+            for key, value in self.pipeline.report().items():
+                print(f"{key}: {value:.2f}" if isinstance(value, float) else f"{key}: {value}")
 
         # 清理资源
-        self.cap.release()
-        pygame.quit()
+        self.release()
 
 
 def main():
     # 获取资源路径
     # 创建并运行系统
+    parser = argparse.ArgumentParser(description="骨骼绑定二次元人物驱动")
+    parser.add_argument("--pipelined", action="store_true", help="采集/推理/渲染分线程运行")
+    parser.add_argument("--record", help="把关键点录制到该文件")
+    parser.add_argument("--replay", help="回放关键点录制文件, 代替摄像头")
+    parser.add_argument("--fast", action="store_true", help="回放时不按时间戳等待, 尽可能快")
+    parser.add_argument("--metrics-dir", help="定期把各阶段耗时导出到该目录(JSON/CSV)")
+    parser.add_argument("--inference-budget-ms", type=float,
+                        help="推理耗时预算, 设置后按实测耗时自动切换模型复杂度")
+    parser.add_argument("--roi", action="store_true", help="只裁剪人物所在区域做姿态推理")
+    parser.add_argument("--infer-every", type=int, default=1, help="每隔几帧做一次姿态推理")
+    parser.add_argument("--predict", choices=["interpolate", "extrapolate"],
+                        help="推理结果之间的关键点插值或外推")
+    parser.add_argument("--render-fps", type=int, help="渲染帧率上限")
+    parser.add_argument("--no-atlas", action="store_true", help="不打包纹理图集, 每个部件单独一张图")
+    parser.add_argument("--dirty-rects", action="store_true", help="只重画并刷新有变化的区域")
+    parser.add_argument("--broadcast", type=int, nargs="?", const=9870, metavar="PORT",
+                        help="通过UDP广播关键点和部件角度 (默认端口9870)")
+    parser.add_argument("--frame-ring", nargs="?", const="animev_frames", metavar="NAME",
+                        help="把每帧画面写入该名字的共享内存 (读端: python units/frame_ring.py -o out.mp4)")
+    parser.add_argument("--inference-process", action="store_true",
+                        help="在单独的进程中做姿态推理, 配合 --pipelined 时推理与渲染并行")
+    parser.add_argument("--camera-fourcc", help="摄像头像素格式, 例如 MJPG")
+    parser.add_argument("--camera-fps", type=int, help="请求的摄像头帧率")
+    parser.add_argument("--camera-buffer", type=int, default=1, help="摄像头驱动缓冲帧数")
+    parser.add_argument("--rig", metavar="PATH",
+                        help="角色骨骼配置文件(JSON/TOML), 修改后自动重新加载; 默认使用部件目录中的 rig.json")
+    parser.add_argument("--watch-assets", action="store_true",
+                        help="部件图片修改后在后台重新加载, 不需要重启")
+    parser.add_argument("--holistic", action="store_true",
+                        help="同时跟踪手部和面部 (只在区域可见且足够大时隔帧检测)")
+    parser.add_argument("--cull", choices=["hide", "freeze"],
+                        help="关键点不可见的部件不绘制(hide)或停在最后可见的姿态(freeze), 适合半身入镜")
+    parser.add_argument("--cull-threshold", type=float, default=0.5, help="部件两端关键点的最低可见度")
+    parser.add_argument("--latency-report", metavar="PATH",
+                        help="退出时把动作到画面延迟的完整分布保存为JSON")
+    parser.add_argument("--backend", choices=["pygame", "numpy"], default="pygame",
+                        help="渲染后端, numpy 为不开窗口的合成器")
+    args = parser.parse_args()
+
     resource_dir = "D:\\AnimeV\\processed_character_parts\\character_parts"
+    frame_source = LandmarkReplay(args.replay, realtime=not args.fast) if args.replay else None
     driver = AnimeCharacterDriver(
         resource_dir=resource_dir,
         camera_index=0,  # 默认摄像头
-        window_size=(1200, 800)  # 自定义窗口尺寸
+        window_size=(1200, 800),  # 自定义窗口尺寸
+        pipelined=args.pipelined,  # 采集/推理/渲染分线程
+        frame_source=frame_source,
+        record_path=args.record,
+        metrics_dir=args.metrics_dir,
+        inference_budget_ms=args.inference_budget_ms,
+        roi_tracking=args.roi,
+        inference_interval=args.infer_every,
+        predict_mode=args.predict,
+        render_fps=args.render_fps,
+        use_atlas=not args.no_atlas,
+        dirty_rects=args.dirty_rects,
+        backend=args.backend,
+        broadcast_port=args.broadcast,
+        frame_ring=args.frame_ring,
+        inference_process=args.inference_process,
+        camera_fourcc=args.camera_fourcc,
+        camera_fps=args.camera_fps,
+        camera_buffer=args.camera_buffer,
+        latency_report=args.latency_report,
+        rig_path=args.rig,
+        watch_assets=args.watch_assets,
+        holistic=args.holistic,
+        cull_mode=args.cull,
+        cull_threshold=args.cull_threshold
     )
     driver.run()
     # 创建并运行驱动系统
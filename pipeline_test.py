@@ -0,0 +1,95 @@
+"""
+流水线模式测试
+功能：
+  1. 用合成视频源和慢的替身姿态模型跑 AnimeCharacterDriver(pipelined=True), 不需要摄像头和MediaPipe
+  2. 检查推理慢时渲染照常进行: 渲染帧率明显高于推理帧率
+  3. 检查旧帧被丢弃: 推理处理的帧远少于采集的帧, 端到端延迟不随运行时间累积
+
+用法:
+  python pipeline_test.py                     # 默认 SDL dummy 驱动, 3 秒
+  python pipeline_test.py --infer-ms 80 --seconds 5
+"""
+
+import argparse
+import os
+
+DEFAULT_RESOURCE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                    "processed_character_parts", "character_parts")
+
+
+def run(args):
+    from my_v import AnimeCharacterDriver
+    from units.latency import MarkerPose, MarkerSource
+
+    class CountingSource(MarkerSource):
+        """记录采集帧数"""
+
+        def __init__(self, **kwargs):
+            super().__init__(**kwargs)
+            self.reads = 0
+
+        def read(self):
+            ret, frame = super().read()
+            self.reads += ret
+            return ret, frame
+
+    class CountingPose(MarkerPose):
+        """记录推理次数"""
+
+        def __init__(self, delay):
+            super().__init__(delay=delay)
+            self.calls = 0
+
+        def process(self, image):
+            self.calls += 1
+            return super().process(image)
+
+    source = CountingSource(duration=args.seconds, fps=args.fps)
+    pose = CountingPose(args.infer_ms / 1000)
+    driver = AnimeCharacterDriver(args.resource_dir, window_size=tuple(args.size), frame_source=source,
+                                  pose_model=pose, pipelined=True, render_fps=args.render_fps, mirror=False)
+    driver.run()
+
+    report = driver.pipeline.report()
+    report["captured"] = source.reads
+    report["inferred"] = pose.calls
+    report["rendered"] = driver.pipeline.render_stats.count
+    return report
+
+
+def check(report, args):
+    """渲染不被推理阻塞, 慢推理时旧帧被丢弃"""
+    assert report["inferred"] > 0, "推理没有运行"
+    assert report["render_fps"] > report["inference_fps"] * 2, "渲染被推理阻塞"
+    assert report["rendered"] > report["inferred"] * 2, "渲染帧数没有明显多于推理帧数"
+    assert report["dropped_frames"] > 0, "旧帧没有被丢弃"
+    assert report["inferred"] < report["captured"] * 0.8, "推理处理了几乎所有采集帧, 旧帧没有跳过"
+    # 只处理最新帧时延迟约为一次推理加一个采集间隔, 积压旧帧时会随时间增长
+    bound_ms = args.infer_ms * 2 + 1000 / args.fps + 50
+    assert report["latency_p95_ms"] < bound_ms, f"延迟 p95 {report['latency_p95_ms']:.1f} ms 超过 {bound_ms:.0f} ms"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="流水线模式测试")
+    parser.add_argument("--resource-dir", default=DEFAULT_RESOURCE_DIR, help="部件图片目录")
+    parser.add_argument("--seconds", type=float, default=3.0, help="测试时长")
+    parser.add_argument("--fps", type=float, default=60.0, help="合成视频帧率")
+    parser.add_argument("--infer-ms", type=float, default=40.0, help="模拟的推理耗时")
+    parser.add_argument("--render-fps", type=int, default=120, help="渲染帧率上限")
+    parser.add_argument("--size", type=int, nargs=2, default=(800, 600), help="窗口尺寸")
+    parser.add_argument("--show", action="store_true", help="打开真实窗口, 默认使用 SDL dummy 驱动")
+    args = parser.parse_args()
+
+    if not args.show:
+        os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+    report = run(args)
+    print(f"采集 {report['captured']} 帧, 推理 {report['inferred']} 帧, 渲染 {report['rendered']} 帧, "
+          f"丢弃 {report['dropped_frames']} 帧, 延迟 p95 {report['latency_p95_ms']:.1f} ms")
+    check(report, args)
+    print("测试通过")
+
+
+if __name__ == "__main__":
+    main()
@@ -16,6 +16,7 @@ scripts_dir = os.path.join("units")
 sys.path.append(scripts_dir)
 import argparse
 from units.argparses import file_path_get
+from units.rig import default_rig, load_rig
 
 #获取地址
 # path="D:\\AnimeV\\processed_character_parts\\character_parts"
@@ -43,23 +44,10 @@ if not os.path.exists(resource_dir):
     os.makedirs(resource_dir)
     print(f"请将人物部件图片放入 {resource_dir} 目录")
 
-# 身体部件定义（根据实际图片调整锚点位置）
-BODY_PARTS = {
-    "head": {"file": "head.png", "anchor": (0.5, 0.8)},  # 锚点位置 (比例x, 比例y)
-    "body": {"file": "body.png", "anchor": (0.5, 0.2)},
-    "left_upper_arm": {"file": "left_upper_arm.png", "anchor": (0.2, 0.5)},
-    "left_lower_arm": {"file": "left_lower_arm.png", "anchor": (0.2, 0.8)},
-    "left_hand": {"file": "left_hand.png", "anchor": (0.5, 0.2)},
-    "right_upper_arm": {"file": "right_upper_arm.png", "anchor": (0.8, 0.5)},
-    "right_lower_arm": {"file": "right_lower_arm.png", "anchor": (0.8, 0.8)},
-    "right_hand": {"file": "right_hand.png", "anchor": (0.5, 0.2)},
-    "left_upper_leg": {"file": "left_upper_leg.png", "anchor": (0.3, 0.2)},
-    "left_lower_leg": {"file": "left_lower_leg.png", "anchor": (0.5, 0.2)},
-    "left_foot": {"file": "left_foot.png", "anchor": (0.5, 0.2)},
-    "right_upper_leg": {"file": "right_upper_leg.png", "anchor": (0.7, 0.2)},
-    "right_lower_leg": {"file": "right_lower_leg.png", "anchor": (0.5, 0.2)},
-    "right_foot": {"file": "right_foot.png", "anchor": (0.5, 0.2)}
-}
+# 身体部件定义、绑定关系和渲染顺序来自骨骼配置 (units/rig.py), 部件目录中有 rig.json 时使用它
+rig_path = os.path.join(resource_dir, "rig.json")
+RIG = load_rig(rig_path, mp_pose.PoseLandmark) if os.path.exists(rig_path) else default_rig(mp_pose.PoseLandmark)
+BODY_PARTS = {name: {"file": part["file"], "anchor": part["anchor"] or (0.5, 0.5)} for name, part in RIG.parts.items()}
 
 # 加载身体部件图片
 character_parts = {}
@@ -85,34 +73,10 @@ for part, info in BODY_PARTS.items():
         }
 
 # 部件绑定关系（MediaPipe关键点索引）
-PART_BINDINGS = {
-    "head": (mp_pose.PoseLandmark.NOSE, None),  # 头部使用鼻子位置
-    "body": (mp_pose.PoseLandmark.LEFT_SHOULDER, mp_pose.PoseLandmark.RIGHT_SHOULDER),
-    "left_upper_arm": (mp_pose.PoseLandmark.LEFT_SHOULDER, mp_pose.PoseLandmark.LEFT_ELBOW),
-    "left_lower_arm": (mp_pose.PoseLandmark.LEFT_ELBOW, mp_pose.PoseLandmark.LEFT_WRIST),
-    "left_hand": (mp_pose.PoseLandmark.LEFT_WRIST, mp_pose.PoseLandmark.LEFT_PINKY),
-    "right_upper_arm": (mp_pose.PoseLandmark.RIGHT_SHOULDER, mp_pose.PoseLandmark.RIGHT_ELBOW),
-    "right_lower_arm": (mp_pose.PoseLandmark.RIGHT_ELBOW, mp_pose.PoseLandmark.RIGHT_WRIST),
-    "right_hand": (mp_pose.PoseLandmark.RIGHT_WRIST, mp_pose.PoseLandmark.RIGHT_PINKY),
-    "left_upper_leg": (mp_pose.PoseLandmark.LEFT_HIP, mp_pose.PoseLandmark.LEFT_KNEE),
-    "left_lower_leg": (mp_pose.PoseLandmark.LEFT_KNEE, mp_pose.PoseLandmark.LEFT_ANKLE),
-    "left_foot": (mp_pose.PoseLandmark.LEFT_ANKLE, mp_pose.PoseLandmark.LEFT_HEEL),
-    "right_upper_leg": (mp_pose.PoseLandmark.RIGHT_HIP, mp_pose.PoseLandmark.RIGHT_KNEE),
-    "right_lower_leg": (mp_pose.PoseLandmark.RIGHT_KNEE, mp_pose.PoseLandmark.RIGHT_ANKLE),
-    "right_foot": (mp_pose.PoseLandmark.RIGHT_ANKLE, mp_pose.PoseLandmark.RIGHT_HEEL)
-}
+PART_BINDINGS = RIG.bindings
 
 # 渲染顺序（从后到前）
-RENDER_ORDER = [
-    "left_upper_leg", "right_upper_leg",
-    "left_lower_leg", "right_lower_leg",
-    "left_foot", "right_foot",
-    "body",
-    "left_upper_arm", "right_upper_arm",
-    "left_lower_arm", "right_lower_arm",
-    "left_hand", "right_hand",
-    "head"
-]
+RENDER_ORDER = RIG.order
 
 # 背景颜色
 BACKGROUND_COLOR = (240, 248, 255)
@@ -145,8 +109,7 @@ def transform_part(part, landmarks, binding, scale=1.0):
         position: 位置 (x, y)
     """
     # 获取绑定的关键点
-    start_idx = binding[0].value
-    end_idx = binding[1].value if binding[1] else None
+    start_idx, end_idx = binding
 
     # 获取起始点位置
     start_point = landmarks[start_idx]
@@ -0,0 +1,107 @@
+"""
+自适应姿态模型复杂度
+功能：
+  1. 同时保留 model_complexity 0/1/2 三个 Pose 实例, warm_up() 在后台一次创建并预热,
+     切换复杂度时不需要在推理路径上创建模型
+  2. 按实测推理耗时与目标帧预算比较, 超时降级, 有余量时升级
+  3. 升降级带迟滞和最短停留帧数, 避免来回抖动
+"""
+
+import time
+
+
+class AdaptivePose:
+    """
+    接口与 mp.solutions.pose.Pose 相同 (process / close), 可直接替换 driver.pose
+    参数:
+        factory: 输入复杂度, 返回 Pose 实例的函数
+        budget_ms: 推理耗时预算(毫秒)
+        levels: 可用的复杂度, 从低到高
+        start_level: 初始复杂度, 默认最高
+        down_ratio: 平均耗时超过 budget * down_ratio 时降级
+        up_ratio: 预计上一级耗时低于 budget * up_ratio 时升级
+        min_frames: 每次切换后至少停留的帧数
+        warmup_frames: 切换后不计入平均的帧数(模型首次推理较慢)
+        smoothing: 耗时指数平均系数
+    """
+
+    def __init__(self, factory, budget_ms=33.0, levels=(0, 1, 2), start_level=None,
+                 down_ratio=1.0, up_ratio=0.6, min_frames=30, warmup_frames=3, smoothing=0.1):
+        self.factory = factory
+        self.budget = budget_ms / 1000.0
+        self.levels = tuple(levels)
+        self.down_ratio = down_ratio
+        self.up_ratio = up_ratio
+        self.min_frames = min_frames
+        self.warmup_frames = warmup_frames
+        self.smoothing = smoothing
+
+        self.models = {}
+        self.cost = None        # 当前复杂度的平均推理耗时(秒)
+        self.ratio = {}         # 某一级相对下一级的耗时倍数, 用于估计升级后的耗时
+        self.level = self.levels[-1] if start_level is None else start_level
+        self.previous = None    # (上一个复杂度, 切换时它的平均耗时)
+        self.frames_at_level = 0
+        self.switches = 0
+
+    def model(self, level):
+        if level not in self.models:
+            self.models[level] = self.factory(level)
+        return self.models[level]
+
+    def warm_up(self, image):
+        """创建所有复杂度的模型并各推理一次, 不计入耗时统计; 在后台加载时调用"""
+        for level in self.levels:
+            self.model(level).process(image)
+
+    def process(self, image):
+        t0 = time.perf_counter()
+        results = self.model(self.level).process(image)
+        self.update(time.perf_counter() - t0)
+        return results
+
+    def update(self, seconds):
+        """记录一次推理耗时并决定是否切换复杂度"""
+        self.frames_at_level += 1
+        # 刚切换时的几帧包含模型初始化, 不计入平均
+        if self.frames_at_level <= self.warmup_frames:
+            return
+        if self.cost is None:
+            self.cost = seconds
+        else:
+            self.cost += (seconds - self.cost) * self.smoothing
+        if self.frames_at_level < self.min_frames:
+            return
+
+        index = self.levels.index(self.level)
+        if self.previous is not None:
+            # 相邻两级都测过时, 记下它们的耗时倍数
+            level, cost = self.previous
+            if index + 1 < len(self.levels) and level == self.levels[index + 1]:
+                self.ratio[level] = cost / self.cost
+            elif index > 0 and level == self.levels[index - 1]:
+                self.ratio[self.level] = self.cost / cost
+            self.previous = None
+
+        if self.cost > self.budget * self.down_ratio and index > 0:
+            self.switch(self.levels[index - 1])
+        elif index + 1 < len(self.levels):
+            upper = self.levels[index + 1]
+            # 没测过上一级时按两倍估计
+            expected = self.cost * self.ratio.get(upper, 2.0)
+            if expected < self.budget * self.up_ratio:
+                self.switch(upper)
+
+    def switch(self, level):
+        print(f"姿态模型复杂度: {self.level} -> {level} "
+              f"(平均推理 {self.cost * 1000:.1f} ms, 预算 {self.budget * 1000:.1f} ms)")
+        self.previous = (self.level, self.cost)
+        self.level = level
+        self.cost = None
+        self.frames_at_level = 0
+        self.switches += 1
+
+    def close(self):
+        for model in self.models.values():
+            model.close()
+        self.models.clear()
@@ -0,0 +1,93 @@
+"""
+部件图片热加载
+功能：
+  1. 后台线程定期检查目录中文件的修改时间和大小 (只用标准库, 不依赖 watchdog)
+  2. 文件停止变化 settle 秒后才算修改完成, 避免读到编辑器写了一半的图片
+  3. 在后台线程中调用 on_change(变化的文件名集合) 完成读取/解码等耗时工作,
+     结果放入队列, 渲染线程在两帧之间用 take() 取走并换上, 不阻塞渲染
+"""
+
+import fnmatch
+import os
+import threading
+import time
+
+
+class AssetWatcher:
+    """
+    参数:
+        directory: 监视的目录 (不含子目录)
+        on_change: on_change(文件名集合), 在监视线程中调用, 返回值不为 None 时放入队列
+        patterns: 监视的文件名模式
+        interval: 检查间隔(秒)
+        settle: 文件保持不变多久后才处理(秒)
+    """
+
+    def __init__(self, directory, on_change, patterns=("*.png",), interval=0.5, settle=0.3):
+        self.directory = directory
+        self.on_change = on_change
+        self.patterns = patterns
+        self.interval = interval
+        self.settle = settle
+        self.reloads = 0
+        self.errors = 0
+        self._results = []
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._snapshot = self._scan()
+        self._thread = threading.Thread(target=self._loop, name="asset-watcher", daemon=True)
+        self._thread.start()
+
+    def _scan(self):
+        files = {}
+        try:
+            with os.scandir(self.directory) as entries:
+                for entry in entries:
+                    if not any(fnmatch.fnmatch(entry.name, pattern) for pattern in self.patterns):
+                        continue
+                    try:
+                        stat = entry.stat()
+                    except OSError:
+                        continue
+                    files[entry.name] = (stat.st_mtime_ns, stat.st_size)
+        except OSError:
+            pass
+        return files
+
+    def _loop(self):
+        pending = {}    # 文件名 -> 最近一次发现变化的时刻
+        while not self._stop.wait(self.interval):
+            now = time.monotonic()
+            current = self._scan()
+            for name in current.keys() | self._snapshot.keys():
+                if current.get(name) != self._snapshot.get(name):
+                    pending[name] = now
+            self._snapshot = current
+
+            ready = {name for name, changed in pending.items() if now - changed >= self.settle}
+            if not ready:
+                continue
+            for name in ready:
+                del pending[name]
+            try:
+                result = self.on_change(ready)
+            except Exception as e:
+                self.errors += 1
+                print(f"部件图片重新加载失败: {e!r}")
+                continue
+            if result is not None:
+                with self._lock:
+                    self._results.append(result)
+                    self.reloads += 1
+
+    def take(self):
+        """取走已完成的加载结果, 按完成顺序排列"""
+        if not self._results:
+            return []
+        with self._lock:
+            results, self._results = self._results, []
+        return results
+
+    def close(self):
+        self._stop.set()
+        self._thread.join(timeout=2.0)
@@ -0,0 +1,152 @@
+"""
+部件纹理图集
+功能：
+  1. 把所有部件(以及以后的其他皮肤)裁掉透明边后打包到一张大图
+  2. 记录每个部件在图集中的位置和裁剪偏移
+  3. 渲染时用 subsurface 从图集取部件, 所有部件共用同一块像素内存
+
+用法:
+  python units/atlas.py 部件目录 [部件目录 ...] -o 输出前缀   # 生成 前缀.png 和 前缀.json
+"""
+
+import json
+import os
+
+import pygame
+
+
+class Atlas:
+    """
+    属性:
+        surface: 图集大图
+        rects: {名称: pygame.Rect} 部件在图集中的区域
+        offsets: {名称: (x, y)} 裁剪区域在原图中的左上角
+        sizes: {名称: (w, h)} 原图尺寸
+    """
+
+    def __init__(self, surface, rects, offsets, sizes):
+        self.surface = surface
+        self.rects = rects
+        self.offsets = offsets
+        self.sizes = sizes
+
+    def sprite(self, name):
+        """取部件图片, 与图集共享像素内存"""
+        return self.surface.subsurface(self.rects[name])
+
+    def remap_anchor(self, name, anchor):
+        """把相对原图的锚点比例换算为相对裁剪后图片的比例"""
+        (ox, oy), (w, h) = self.offsets[name], self.sizes[name]
+        rect = self.rects[name]
+        return ((anchor[0] * w - ox) / rect.width, (anchor[1] * h - oy) / rect.height)
+
+    def save(self, prefix):
+        pygame.image.save(self.surface, prefix + ".png")
+        table = {name: {"rect": list(rect), "offset": list(self.offsets[name]), "size": list(self.sizes[name])}
+                 for name, rect in self.rects.items()}
+        with open(prefix + ".json", "w", encoding="utf-8") as f:
+            json.dump(table, f, indent=2, ensure_ascii=False)
+
+    def memory_bytes(self):
+        return self.surface.get_width() * self.surface.get_height() * self.surface.get_bytesize()
+
+
+def pack_shelves(sizes, padding=2, max_width=None):
+    """
+    简单的货架式装箱: 按高度从大到小排成若干行, 在几种行宽中选总面积最小的
+    参数:
+        sizes: {名称: (w, h)}
+    返回: ((图集宽, 图集高), {名称: (x, y)})
+    """
+    if not sizes:
+        return (1, 1), {}
+    area = sum((w + padding) * (h + padding) for w, h in sizes.values())
+    widest = max(w for w, _ in sizes.values()) + padding
+    if max_width:
+        widths = [max(widest, max_width)]
+    else:
+        widths = {max(widest, int(area ** 0.5 * f)) for f in (0.8, 1.0, 1.2, 1.5, 2.0)}
+
+    best = None
+    ordered = sorted(sizes.items(), key=lambda item: -item[1][1])
+    for width in sorted(widths):
+        positions = {}
+        x = y = shelf_height = 0
+        for name, (w, h) in ordered:
+            if x + w + padding > width:
+                x, y = 0, y + shelf_height
+                shelf_height = 0
+            positions[name] = (x, y)
+            x += w + padding
+            shelf_height = max(shelf_height, h + padding)
+        used_width = max(px + sizes[n][0] + padding for n, (px, _) in positions.items())
+        size = (used_width, y + shelf_height)
+        if best is None or size[0] * size[1] < best[0][0] * best[0][1]:
+            best = (size, positions)
+    return best
+
+
+def build_atlas(images, padding=2, trim=True):
+    """
+    参数:
+        images: {名称: Surface}, 名称可以带皮肤前缀, 如 "skin2/head"
+        trim: 是否裁掉透明边
+    """
+    crops, sizes = {}, {}
+    for name, image in images.items():
+        sizes[name] = image.get_size()
+        rect = image.get_bounding_rect() if trim else image.get_rect()
+        if rect.width == 0 or rect.height == 0:
+            rect = pygame.Rect(0, 0, 1, 1)
+        crops[name] = rect
+
+    (width, height), positions = pack_shelves({n: r.size for n, r in crops.items()}, padding)
+    surface = pygame.Surface((width, height), pygame.SRCALPHA)
+    if pygame.display.get_surface() is not None:
+        surface = surface.convert_alpha()
+    surface.fill((0, 0, 0, 0))
+
+    rects, offsets = {}, {}
+    for name, crop in crops.items():
+        x, y = positions[name]
+        # BLEND_RGBA_MAX 叠到全透明底图上等于原样拷贝, 不会做alpha混合
+        surface.blit(images[name], (x, y), crop, special_flags=pygame.BLEND_RGBA_MAX)
+        rects[name] = pygame.Rect(x, y, crop.width, crop.height)
+        offsets[name] = (crop.x, crop.y)
+    return Atlas(surface, rects, offsets, sizes)
+
+
+def load_atlas(prefix):
+    """读取 save() 生成的图集"""
+    surface = pygame.image.load(prefix + ".png")
+    if pygame.display.get_surface() is not None:
+        surface = surface.convert_alpha()
+    with open(prefix + ".json", encoding="utf-8") as f:
+        table = json.load(f)
+    rects = {name: pygame.Rect(info["rect"]) for name, info in table.items()}
+    offsets = {name: tuple(info["offset"]) for name, info in table.items()}
+    sizes = {name: tuple(info["size"]) for name, info in table.items()}
+    return Atlas(surface, rects, offsets, sizes)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="把部件图片打包成纹理图集")
+    parser.add_argument("dirs", nargs="+", help="部件图片目录, 每个目录视为一套皮肤")
+    parser.add_argument("-o", "--output", default="atlas", help="输出文件前缀")
+    parser.add_argument("--padding", type=int, default=2, help="部件间距(像素)")
+    args = parser.parse_args()
+
+    images = {}
+    for directory in args.dirs:
+        skin = os.path.relpath(directory).replace(os.sep, "/")
+        for filename in sorted(os.listdir(directory)):
+            if filename.lower().endswith(".png"):
+                images[f"{skin}/{os.path.splitext(filename)[0]}"] = pygame.image.load(os.path.join(directory, filename))
+
+    atlas = build_atlas(images, args.padding)
+    atlas.save(args.output)
+    original = sum(w * h * 4 for w, h in atlas.sizes.values())
+    print(f"打包 {len(images)} 个部件 -> {atlas.surface.get_size()}, "
+          f"内存 {original / 1024:.0f} KB -> {atlas.memory_bytes() / 1024:.0f} KB")
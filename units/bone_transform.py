@@ -0,0 +1,201 @@
+"""
+关键点 -> 骨骼变换 (NumPy向量化)
+功能：
+  1. 把部件绑定关系一次性编译成起点/终点索引数组
+  2. 每帧对 (33, 4) 的关键点数组做一次向量化计算,
+     得到所有部件的锚点位置、旋转角度和骨骼长度
+  3. 支持多个角色一起计算, 关键点数组形状为 (K, 33, 4)
+  4. 按关键点可见度剔除部件: 跳过或冻结在最后一次可见时的姿态
+"""
+
+from collections import namedtuple
+from enum import IntEnum
+
+import numpy as np
+
+
+class PoseLandmark(IntEnum):
+    """与 mp.solutions.pose.PoseLandmark 相同的关键点编号, 使用时不需要导入 MediaPipe"""
+    NOSE = 0
+    LEFT_EYE_INNER = 1
+    LEFT_EYE = 2
+    LEFT_EYE_OUTER = 3
+    RIGHT_EYE_INNER = 4
+    RIGHT_EYE = 5
+    RIGHT_EYE_OUTER = 6
+    LEFT_EAR = 7
+    RIGHT_EAR = 8
+    MOUTH_LEFT = 9
+    MOUTH_RIGHT = 10
+    LEFT_SHOULDER = 11
+    RIGHT_SHOULDER = 12
+    LEFT_ELBOW = 13
+    RIGHT_ELBOW = 14
+    LEFT_WRIST = 15
+    RIGHT_WRIST = 16
+    LEFT_PINKY = 17
+    RIGHT_PINKY = 18
+    LEFT_INDEX = 19
+    RIGHT_INDEX = 20
+    LEFT_THUMB = 21
+    RIGHT_THUMB = 22
+    LEFT_HIP = 23
+    RIGHT_HIP = 24
+    LEFT_KNEE = 25
+    RIGHT_KNEE = 26
+    LEFT_ANKLE = 27
+    RIGHT_ANKLE = 28
+    LEFT_HEEL = 29
+    RIGHT_HEEL = 30
+    LEFT_FOOT_INDEX = 31
+    RIGHT_FOOT_INDEX = 32
+
+
+# 每帧计算结果
+#   pivot:  锚点(关节)在屏幕上的位置 (N, 2)
+#   center: 旋转后图片中心应放置的位置 (N, 2), 保证锚点落在关节上
+#   angle:  旋转角度(度) (N,)
+#   length: 骨骼长度(像素) (N,)
+BonePose = namedtuple("BonePose", ["pivot", "center", "angle", "length"])
+
+
+def landmarks_to_array(landmarks, out=None):
+    """将MediaPipe关键点转换为 (33, 4) 的 [x, y, z, visibility] 数组"""
+    if isinstance(landmarks, np.ndarray):
+        return landmarks
+    if out is None:
+        out = np.empty((len(landmarks), 4), dtype=np.float32)
+    for i, lm in enumerate(landmarks):
+        out[i] = (lm.x, lm.y, lm.z, lm.visibility)
+    return out
+
+
+class BoneTable:
+    """
+    编译后的部件表, 按渲染顺序排列
+    属性:
+        names:  部件名列表
+        start:  起点关键点索引 (N,)
+        end:    终点关键点索引 (N,), 没有终点的部件指向起点
+        has_end: 是否有终点 (N,)
+        anchor_offset: 锚点相对图片中心的偏移(像素), 已乘以部件缩放 (N, 2)
+        scale:  部件图片缩放比例 (N,)
+    """
+
+    def __init__(self, names, start, end, has_end, anchor_offset, scale=None):
+        self.names = names
+        self.start = start
+        self.end = end
+        self.has_end = has_end
+        self.anchor_offset = anchor_offset
+        self.scale = np.ones(len(names), dtype=np.float32) if scale is None else scale
+
+    @classmethod
+    def compile(cls, part_bindings, render_order, character_parts, part_scales=None):
+        names, start, end, has_end, offsets, scales = [], [], [], [], [], []
+        for name in render_order:
+            if name not in part_bindings or name not in character_parts:
+                continue
+            begin, finish = part_bindings[name]
+            part = character_parts[name]
+            w, h = part["size"] if "size" in part else part["image"].get_size()
+            scale = part_scales.get(name, 1.0) if part_scales else 1.0
+            names.append(name)
+            start.append(int(begin))
+            end.append(int(finish) if finish is not None else int(begin))
+            has_end.append(finish is not None)
+            offsets.append(((part["anchor"][0] * w - w / 2) * scale, (part["anchor"][1] * h - h / 2) * scale))
+            scales.append(scale)
+        return cls(names,
+                   np.array(start, dtype=np.intp),
+                   np.array(end, dtype=np.intp),
+                   np.array(has_end, dtype=bool),
+                   np.array(offsets, dtype=np.float32).reshape(-1, 2),
+                   np.array(scales, dtype=np.float32))
+
+    def index(self, name):
+        return self.names.index(name)
+
+
+def solve_bones(table, points, width, height, scale=0.7, offset=0.15):
+    """
+    一次计算所有部件的位置和角度
+    参数:
+        table: BoneTable
+        points: (33, 4) 或 (K, 33, 4) 的关键点数组
+        width, height: 画布尺寸
+        scale, offset: 归一化坐标的缩放与偏移 (x * scale + offset)
+    部件缩放已在 BoneTable.compile 中乘进锚点偏移
+    """
+    xy = points[..., :2] * scale + offset
+    xy = xy * np.array((width, height), dtype=xy.dtype)
+
+    pivot = xy[..., table.start, :]
+    delta = xy[..., table.end, :] - pivot
+    angle = np.degrees(np.arctan2(-delta[..., 1], delta[..., 0]))
+    angle = np.where(table.has_end, angle, 0.0)
+    length = np.hypot(delta[..., 0], delta[..., 1])
+
+    # 图片以 -angle 旋转后, 锚点偏移向量也跟着旋转, 再从关节位置反推图片中心
+    rad = np.radians(angle)
+    cos, sin = np.cos(rad), np.sin(rad)
+    ox, oy = table.anchor_offset[:, 0], table.anchor_offset[:, 1]
+    center = np.stack((pivot[..., 0] - (ox * cos - oy * sin),
+                       pivot[..., 1] - (ox * sin + oy * cos)), axis=-1)
+    return BonePose(pivot, center, angle, length)
+
+
+def part_visibility(table, points):
+    """每个部件两端关键点可见度的较小值, 形状 (N,) 或 (K, N)"""
+    vis = points[..., 3]
+    return np.minimum(vis[..., table.start], vis[..., table.end])
+
+
+class VisibilityCuller:
+    """
+    按可见度剔除部件 (单个角色), 半身入镜时不再变换和绘制乱动的腿
+    参数:
+        threshold: 部件两端关键点的可见度都不低于该值时才算可见
+        mode: "hide" 跳过不可见的部件;
+              "freeze" 保持在最后一次可见时的位置和角度, 从未可见过的部件跳过
+    """
+
+    MODES = ("hide", "freeze")
+
+    def __init__(self, threshold=0.5, mode="hide"):
+        if mode not in self.MODES:
+            raise ValueError(f"未知的剔除方式: {mode}")
+        self.threshold = threshold
+        self.mode = mode
+        self.reset()
+
+    def reset(self):
+        """部件表重新编译后调用, 丢弃保存的姿态"""
+        self._last = None
+        self._seen = None
+        self.culled = 0     # 本帧跳过的部件数
+        self.frozen = 0     # 本帧冻结的部件数
+
+    def apply(self, table, points, bones):
+        """
+        返回 (bones, draw): draw 为 (N,) 布尔数组, False 的部件跳过变换和绘制
+        freeze 时被冻结部件的 pivot/center/angle/length 换成保存的值
+        """
+        visible = part_visibility(table, points) >= self.threshold
+        draw = visible
+        self.frozen = 0
+        if self.mode == "freeze":
+            if self._seen is None or len(self._seen) != len(visible):
+                self._last = BonePose(*(np.array(field, dtype=np.float64) for field in bones))
+                self._seen = np.zeros(len(visible), dtype=bool)
+            for last, current in zip(self._last, bones):
+                last[visible] = current[visible]
+            self._seen |= visible
+            frozen = self._seen & ~visible
+            if frozen.any():
+                bones = BonePose(*(np.where(frozen.reshape(-1, *([1] * (last.ndim - 1))), last, current)
+                                   for last, current in zip(self._last, bones)))
+            draw = self._seen.copy()
+            self.frozen = int(frozen.sum())
+        self.culled = int(len(draw) - draw.sum())
+        return bones, draw
@@ -0,0 +1,160 @@
+"""
+低延迟摄像头采集
+功能：
+  1. 后台线程不停地从摄像头取帧, 只保留最新一帧和它的采集时间戳,
+     避免 OpenCV/驱动内部缓冲把几帧之前的画面交给渲染
+  2. 可配置 FOURCC (例如 MJPG)、驱动缓冲帧数和帧率, 打开后打印实际协商结果
+  3. 连续读取失败或摄像头断开时按指数退避自动重连
+  4. 接口与 cv2.VideoCapture 相同 (read / release / isOpened / set), 可直接交给驱动
+"""
+
+import threading
+import time
+
+import cv2
+
+
+class CameraGrabber:
+    """
+    参数:
+        index: 摄像头编号
+        size: 请求的分辨率 (宽, 高)
+        fps: 请求的帧率, None 表示使用默认
+        fourcc: 像素格式, 如 "MJPG", None 表示使用默认
+        buffer_size: 驱动缓冲帧数 (CAP_PROP_BUFFERSIZE), 并非所有后端都支持
+        read_timeout: read() 等待新帧的最长时间(秒), 在渲染线程中读取时应不超过一帧的时间
+        max_failures: 连续读取失败多少次后重连
+        max_backoff: 重连间隔上限(秒)
+    """
+
+    def __init__(self, index=0, size=(640, 480), fps=None, fourcc=None, buffer_size=1,
+                 read_timeout=1.0, max_failures=10, max_backoff=5.0):
+        self.index = index
+        self.size = size
+        self.fps = fps
+        self.fourcc = fourcc
+        self.buffer_size = buffer_size
+        self.read_timeout = read_timeout
+        self.max_failures = max_failures
+        self.max_backoff = max_backoff
+
+        self.cap = None
+        self.connected = False
+        self.frames = 0             # 采集到的总帧数
+        self.delivered = 0          # read() 交出去的帧数, 其余的被新帧替换
+        self.failures = 0           # 读取失败次数
+        self.reconnects = 0
+        self.negotiated = None      # 打开后实际的 (宽, 高, 帧率, FOURCC)
+        self.last_timestamp = None  # 最近一次 read() 返回的帧的采集时刻 time.perf_counter()
+
+        self._frame = None
+        self._timestamp = None
+        self._sequence = 0
+        self._returned = 0
+        self._cond = threading.Condition()
+        self._running = True
+        self._thread = threading.Thread(target=self._loop, name="camera-grabber", daemon=True)
+        self._thread.start()
+
+    def _open(self):
+        cap = cv2.VideoCapture(self.index)
+        if not cap.isOpened():
+            cap.release()
+            return None
+        # FOURCC 要在分辨率之前设置, 部分驱动切换格式后才支持更高的分辨率/帧率
+        if self.fourcc:
+            cap.set(cv2.CAP_PROP_FOURCC, cv2.VideoWriter_fourcc(*self.fourcc))
+        cap.set(cv2.CAP_PROP_FRAME_WIDTH, self.size[0])
+        cap.set(cv2.CAP_PROP_FRAME_HEIGHT, self.size[1])
+        if self.fps:
+            cap.set(cv2.CAP_PROP_FPS, self.fps)
+        if self.buffer_size:
+            cap.set(cv2.CAP_PROP_BUFFERSIZE, self.buffer_size)
+
+        code = int(cap.get(cv2.CAP_PROP_FOURCC))
+        fourcc = "".join(chr((code >> (8 * i)) & 0xFF) for i in range(4)) if code > 0 else "?"
+        self.negotiated = (int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)), int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)),
+                           cap.get(cv2.CAP_PROP_FPS), fourcc)
+        print(f"摄像头 {self.index}: {self.negotiated[0]}x{self.negotiated[1]} "
+              f"{self.negotiated[2]:.0f} FPS {fourcc}")
+        return cap
+
+    def _loop(self):
+        backoff = 0.5
+        failures = 0
+        while self._running:
+            if self.cap is None:
+                self.cap = self._open()
+                if self.cap is None:
+                    print(f"无法打开摄像头 {self.index}, {backoff:.1f} 秒后重试")
+                    self._sleep(backoff)
+                    backoff = min(self.max_backoff, backoff * 2)
+                    continue
+                self.connected = True
+                failures = 0
+
+            ret, frame = self.cap.read()
+            timestamp = time.perf_counter()
+            if not ret:
+                self.failures += 1
+                failures += 1
+                if failures >= self.max_failures:
+                    # 多次失败视为断开, 释放后重连
+                    print(f"摄像头 {self.index} 连续 {failures} 次读取失败, 重新连接")
+                    self.connected = False
+                    self.cap.release()
+                    self.cap = None
+                    self.reconnects += 1
+                    self._sleep(backoff)
+                    backoff = min(self.max_backoff, backoff * 2)
+                else:
+                    self._sleep(0.01)
+                continue
+
+            failures = 0
+            backoff = 0.5
+            with self._cond:
+                self._frame = frame
+                self._timestamp = timestamp
+                self._sequence += 1
+                self.frames += 1
+                self._cond.notify_all()
+
+        if self.cap is not None:
+            self.cap.release()
+            self.cap = None
+
+    def _sleep(self, seconds):
+        """可被 release() 打断的等待"""
+        with self._cond:
+            self._cond.wait_for(lambda: not self._running, timeout=seconds)
+
+    def read(self):
+        """
+        返回还没交出过的最新一帧, 没有新帧时最多等待 read_timeout 秒
+        超时返回 (False, None)
+        """
+        with self._cond:
+            if not self._cond.wait_for(lambda: self._sequence > self._returned or not self._running,
+                                       timeout=self.read_timeout) or not self._running:
+                return False, None
+            self._returned = self._sequence
+            self.last_timestamp = self._timestamp
+            self.delivered += 1
+            return True, self._frame
+
+    def isOpened(self):
+        return self._running and self.connected
+
+    def set(self, prop, value):
+        return False
+
+    def stats(self):
+        return {"frames": self.frames, "delivered": self.delivered, "skipped": self.frames - self.delivered,
+                "failures": self.failures, "reconnects": self.reconnects}
+
+    def release(self):
+        with self._cond:
+            self._running = False
+            self._cond.notify_all()
+        self._thread.join(timeout=2.0)
@@ -0,0 +1,222 @@
+"""
+无窗口的 NumPy/OpenCV 合成器
+功能：
+  1. 部件图片以 RGBA 数组保存, 不需要 pygame 显示和 SDL
+  2. 根据 solve_bones 的结果一次算出所有部件的仿射矩阵和包围框
+  3. 每个部件只在自己的包围框内做 cv2.warpAffine, 再向量化alpha混合到预分配的画面上
+  4. 用于离线批处理、多进程渲染等不需要窗口的场景, 交互显示使用 pygame_backend.PygameBackend
+  5. RenderBackend: 渲染后端接口, 驱动通过它加载部件和出图, 不关心具体后端
+"""
+
+import cv2
+import numpy as np
+
+
+class RenderBackend:
+    """
+    渲染后端接口, 驱动只持有一个后端对象, 加载部件、出图、显示都通过它完成
+      load_image(path)              从磁盘读取一张部件图片, 返回后端自己的格式
+      build_parts(specs, images)    由部件配置 {名称: {file, anchor, trim_offset}} 和读到的图片
+                                    (读取失败为 None) 生成部件表 {名称: 部件}, 可在后台线程调用
+      bind(draw_parts, scales)      骨骼配置编译后调用, 部件按渲染顺序排列
+      render(bones, visible=None, status_text=None, overlay_lines=None)
+                                    把一帧骨骼姿态画成图像并返回, 没有人物时传 None 只画背景
+                                    visible 为每个部件是否绘制的布尔数组, None 表示全部绘制
+      present()                     显示画好的一帧
+    interactive 为 True 的后端有窗口, 由驱动处理事件并用 tick() 控制帧率
+    """
+
+    name = None
+    interactive = False
+
+    def show_placeholder(self, text):
+        """启动期间的占位画面"""
+
+    def load_image(self, path):
+        raise NotImplementedError
+
+    def build_parts(self, specs, images):
+        raise NotImplementedError
+
+    def bind(self, draw_parts, scales):
+        raise NotImplementedError
+
+    def invalidate(self, names=()):
+        """这些部件的图片换过了, 或画面需要整体重画"""
+
+    def render(self, bones, visible=None, status_text=None, overlay_lines=None):
+        raise NotImplementedError
+
+    def present(self):
+        pass
+
+    def tick(self, fps):
+        pass
+
+    def counters(self):
+        """要写入耗时统计的计数, {名称: 数值}"""
+        return {}
+
+    def pixel_format(self):
+        """export() 写出的画面通道顺序"""
+        return "RGBA"
+
+    def export(self, writer):
+        """把最近一帧画面交给 writer.write(数组), 例如共享内存环形缓冲"""
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+def load_rgba(path, trim=True):
+    """
+    读取带透明通道的部件图片
+    返回: (RGBA数组, 裁剪区域左上角 (x, y), 原图尺寸 (w, h))
+    """
+    image = cv2.imread(path, cv2.IMREAD_UNCHANGED)
+    if image is None:
+        raise FileNotFoundError(path)
+    if image.ndim == 2:
+        image = cv2.cvtColor(image, cv2.COLOR_GRAY2RGBA)
+    elif image.shape[2] == 3:
+        image = cv2.cvtColor(image, cv2.COLOR_BGR2RGBA)
+    else:
+        image = cv2.cvtColor(image, cv2.COLOR_BGRA2RGBA)
+
+    h, w = image.shape[:2]
+    offset = (0, 0)
+    if trim:
+        ys, xs = np.nonzero(image[:, :, 3])
+        if len(xs):
+            x0, y0 = int(xs.min()), int(ys.min())
+            image = image[y0:int(ys.max()) + 1, x0:int(xs.max()) + 1]
+            offset = (x0, y0)
+    return np.ascontiguousarray(image), offset, (w, h)
+
+
+class NumpyCompositor(RenderBackend):
+    """
+    参数:
+        size: 画面尺寸 (宽, 高)
+        background: 背景颜色 (R, G, B)
+        interpolation: cv2.warpAffine 的插值方式
+        sprites: 按渲染顺序排列的 RGBA 数组列表, 与 BoneTable.names 一一对应; 也可以之后由 bind() 设置
+        anchors: 每个部件的锚点比例 (x, y), 相对 sprites 中的图片
+        scales: 每个部件的缩放比例, 默认都为 1
+    """
+
+    name = "numpy"
+
+    def __init__(self, size, background=(240, 248, 255), interpolation=cv2.INTER_LINEAR,
+                 sprites=(), anchors=(), scales=None):
+        self.width, self.height = size
+        self.interpolation = interpolation
+        self.frame = np.empty((self.height, self.width, 4), dtype=np.uint8)
+        # 按 uint32 整体填充背景, 比逐通道广播快得多
+        self._fill_value = np.array((*background, 255), dtype=np.uint8).view(np.uint32)[0]
+        self.drawn = 0      # 最近一帧实际画出的部件数
+        self.set_sprites(sprites, anchors, scales)
+
+    def set_sprites(self, sprites, anchors, scales=None):
+        self.sprites = list(sprites)
+        # 锚点像素坐标和四个角相对锚点的位置, 每帧只需要乘旋转矩阵
+        sizes = np.array([(s.shape[1], s.shape[0]) for s in self.sprites], dtype=np.float64).reshape(-1, 2)
+        self.anchor_px = np.asarray(anchors, dtype=np.float64).reshape(-1, 2) * sizes
+        self.scales = np.ones(len(self.sprites)) if scales is None else np.asarray(scales, dtype=np.float64)
+        unit = np.array([(0, 0), (1, 0), (0, 1), (1, 1)], dtype=np.float64)
+        self.corners = unit[None, :, :] * sizes[:, None, :] - self.anchor_px[:, None, :]   # (N, 4, 2)
+
+    def load_image(self, path):
+        return load_rgba(path)
+
+    def build_parts(self, specs, images):
+        """部件读成裁掉透明边的 RGBA 数组, 锚点随之换算; 读取失败的部件用红色方块代替"""
+        character_parts = {}
+        for part, info in specs.items():
+            if images[part] is not None:
+                pixels, (x, y), (w, h) = images[part]
+                anchor = ((info["anchor"][0] * w - x) / pixels.shape[1],
+                          (info["anchor"][1] * h - y) / pixels.shape[0])
+            else:
+                pixels = np.zeros((50, 50, 4), dtype=np.uint8)
+                pixels[:] = (255, 0, 0, 128)
+                anchor = (0.5, 0.5)
+            character_parts[part] = {
+                "name": part,
+                "pixels": pixels,
+                "anchor": anchor,
+                "size": (pixels.shape[1], pixels.shape[0])
+            }
+        return character_parts
+
+    def bind(self, draw_parts, scales):
+        self.set_sprites([part["pixels"] for part in draw_parts], [part["anchor"] for part in draw_parts], scales)
+
+    def export(self, writer):
+        writer.write(self.frame)
+
+    @staticmethod
+    def affine_matrices(pivot, angle, anchor_px, scale=1.0):
+        """
+        部件图片坐标 -> 画面坐标的仿射矩阵 (N, 2, 3)
+        与 pygame.transform.rotate(img, -angle) 的方向一致, 并使锚点落在 pivot 上
+        """
+        rad = np.radians(np.asarray(angle, dtype=np.float64))
+        cos, sin = np.cos(rad) * scale, np.sin(rad) * scale
+        matrices = np.empty((len(rad), 2, 3), dtype=np.float64)
+        matrices[:, 0, 0], matrices[:, 0, 1] = cos, -sin
+        matrices[:, 1, 0], matrices[:, 1, 1] = sin, cos
+        matrices[:, 0, 2] = pivot[:, 0] - (cos * anchor_px[:, 0] - sin * anchor_px[:, 1])
+        matrices[:, 1, 2] = pivot[:, 1] - (sin * anchor_px[:, 0] + cos * anchor_px[:, 1])
+        return matrices
+
+    def clear(self):
+        self.frame.view(np.uint32).fill(self._fill_value)
+        return self.frame
+
+    def render(self, bones, visible=None, status_text=None, overlay_lines=None):
+        """
+        bones: solve_bones 对单个角色的计算结果, 返回画面 (高, 宽, 4) RGBA, 下一帧会被覆盖
+        visible: 每个部件是否绘制, 被剔除的部件不做 warpAffine
+        status_text, overlay_lines: 窗口中的提示文字, 离线画面不绘制
+        """
+        self.clear()
+        self.drawn = 0
+        if bones is None or not self.sprites:
+            return self.frame
+
+        pivot = np.asarray(bones.pivot, dtype=np.float64)
+        # warpAffine 以像素中心为整数坐标, 各减半个像素与 pygame 的像素格对齐
+        matrices = self.affine_matrices(pivot - 0.5, bones.angle, self.anchor_px - 0.5, self.scales)
+
+        # 所有部件旋转后的包围框, 裁剪到画面内
+        rotation = matrices[:, :, :2]
+        corners = np.einsum("nij,nkj->nki", rotation, self.corners) + pivot[:, None, :]
+        x0 = np.clip(np.floor(corners[:, :, 0].min(axis=1)), 0, self.width).astype(int)
+        y0 = np.clip(np.floor(corners[:, :, 1].min(axis=1)), 0, self.height).astype(int)
+        x1 = np.clip(np.ceil(corners[:, :, 0].max(axis=1)) + 1, 0, self.width).astype(int)
+        y1 = np.clip(np.ceil(corners[:, :, 1].max(axis=1)) + 1, 0, self.height).astype(int)
+
+        for i, sprite in enumerate(self.sprites):
+            if visible is not None and not visible[i]:
+                continue
+            if x1[i] <= x0[i] or y1[i] <= y0[i]:
+                continue
+            matrix = matrices[i].copy()
+            matrix[:, 2] -= (x0[i], y0[i])
+            warped = cv2.warpAffine(sprite, matrix, (int(x1[i] - x0[i]), int(y1[i] - y0[i])),
+                                    flags=self.interpolation, borderMode=cv2.BORDER_CONSTANT, borderValue=0)
+            self.blend(self.frame[y0[i]:y1[i], x0[i]:x1[i]], warped)
+            self.drawn += 1
+        return self.frame
+
+    @staticmethod
+    def blend(dst, src):
+        """src over dst, 原地写入 dst"""
+        weight = src[:, :, 3].astype(np.float32)
+        weight *= 1 / 255
+        out = cv2.blendLinear(src, dst, weight, 1 - weight)
+        # 透明度: 1 - (1 - a_src)(1 - a_dst)
+        out[:, :, 3] = 255 - cv2.multiply(255 - src[:, :, 3], 255 - dst[:, :, 3], scale=1 / 255)
+        dst[:] = out
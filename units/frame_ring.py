@@ -0,0 +1,263 @@
+"""
+共享内存帧环形缓冲
+功能：
+  1. 渲染进程把每帧画面写入 multiprocessing.shared_memory 中的环形缓冲 (默认4个槽位)
+  2. 其他进程(OBS插件、录制程序等)按名字打开同一块共享内存, 直接读取画面, 不经过截屏
+  3. 每个槽位有独立的头: 帧序号、时间戳、宽高; 写入前后各写一次序号, 读端据此判断画面是否被覆盖
+  4. 参考读端: 把新帧原样写入 ffmpeg 的标准输入
+
+内存布局 (小端):
+  总头 64字节 (HEADER_DTYPE) | 槽位0: 槽头 64字节 (SLOT_DTYPE) + 画面 | 槽位1 ... 每个槽位按64字节对齐
+  画面为 (高, 宽, 通道) uint8, 通道顺序见总头的 format, 例如 RGBA / BGRX (X 为无效字节)
+
+用法:
+  python units/frame_ring.py [--name animev_frames] -o out.mp4     # 读取画面并用 ffmpeg 编码
+"""
+
+import time
+from multiprocessing import shared_memory
+
+import numpy as np
+
+MAGIC = b"AVFR"
+VERSION = 1
+DEFAULT_NAME = "animev_frames"
+
+HEADER_DTYPE = np.dtype([
+    ("magic", "S4"),
+    ("version", "<u2"),
+    ("slots", "<u2"),
+    ("width", "<u4"),
+    ("height", "<u4"),
+    ("channels", "<u4"),
+    ("format", "S4"),
+    ("frame_bytes", "<u8"),
+    ("slot_stride", "<u8"),
+    ("written", "<u8"),         # 已写入的帧数, 最新一帧的序号为 written - 1
+    ("reserved", "u1", (16,)),
+])
+
+SLOT_DTYPE = np.dtype([
+    ("begin", "<u8"),           # 开始写入时设为 序号+1
+    ("end", "<u8"),             # 写完后设为 序号+1, 与 begin 相等说明画面完整
+    ("index", "<u8"),
+    ("timestamp", "<f8"),       # time.perf_counter()
+    ("width", "<u4"),
+    ("height", "<u4"),
+    ("reserved", "u1", (24,)),
+])
+
+# 通道顺序 -> ffmpeg 的 pix_fmt
+PIX_FMTS = {"RGBA": "rgba", "BGRA": "bgra", "RGBX": "rgb0", "BGRX": "bgr0"}
+
+
+def _layout(width, height, channels, slots):
+    frame_bytes = width * height * channels
+    slot_stride = (SLOT_DTYPE.itemsize + frame_bytes + 63) // 64 * 64
+    return frame_bytes, slot_stride, HEADER_DTYPE.itemsize + slot_stride * slots
+
+
+def _attach(name):
+    """打开已有的共享内存, 不让 resource_tracker 在本进程退出时删除它"""
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        # Python 3.13 之前没有 track 参数
+        shm = shared_memory.SharedMemory(name=name)
+        try:
+            from multiprocessing import resource_tracker
+            resource_tracker.unregister(shm._name, "shared_memory")
+        except Exception:
+            pass
+        return shm
+
+
+class _Ring:
+    def _map(self, shm):
+        self.shm = shm
+        self.header = np.ndarray((), dtype=HEADER_DTYPE, buffer=shm.buf)
+        h = self.header
+        self.slots = int(h["slots"])
+        self.width, self.height, self.channels = int(h["width"]), int(h["height"]), int(h["channels"])
+        self.format = h["format"].item().decode()
+        stride = int(h["slot_stride"])
+        self.slot_headers, self.frames = [], []
+        for i in range(self.slots):
+            offset = HEADER_DTYPE.itemsize + i * stride
+            self.slot_headers.append(np.ndarray((), dtype=SLOT_DTYPE, buffer=shm.buf, offset=offset))
+            self.frames.append(np.ndarray((self.height, self.width, self.channels), dtype=np.uint8,
+                                          buffer=shm.buf, offset=offset + SLOT_DTYPE.itemsize))
+
+
+class FrameRingWriter(_Ring):
+    """
+    参数:
+        size: 画面尺寸 (宽, 高)
+        pixel_format: 通道顺序, 4通道时为 RGBA / BGRA / RGBX / BGRX
+        slots: 槽位数, 读端最多可以落后 slots-1 帧
+    """
+
+    def __init__(self, size, name=DEFAULT_NAME, pixel_format="RGBA", slots=4):
+        width, height = size
+        channels = len(pixel_format)
+        frame_bytes, slot_stride, total = _layout(width, height, channels, slots)
+        try:
+            shm = shared_memory.SharedMemory(name=name, create=True, size=total)
+        except FileExistsError:
+            # 上次异常退出遗留的共享内存
+            stale = shared_memory.SharedMemory(name=name)
+            stale.close()
+            stale.unlink()
+            shm = shared_memory.SharedMemory(name=name, create=True, size=total)
+
+        header = np.ndarray((), dtype=HEADER_DTYPE, buffer=shm.buf)
+        header[()] = (MAGIC, VERSION, slots, width, height, channels, pixel_format.encode(),
+                      frame_bytes, slot_stride, 0, np.zeros(16, np.uint8))
+        np.ndarray((total - HEADER_DTYPE.itemsize,), dtype=np.uint8, buffer=shm.buf,
+                   offset=HEADER_DTYPE.itemsize)[:] = 0
+        self.name = shm.name
+        self._map(shm)
+        self.written = 0
+
+    def write(self, frame, timestamp=None):
+        """
+        写入一帧
+        参数:
+            frame: (高, 宽, 通道) uint8, 或每像素一个 uint32 的 (高, 宽) 数组 (例如 pygame 屏幕的像素视图)
+        返回: 帧序号
+        """
+        index = self.written
+        slot = index % self.slots
+        header = self.slot_headers[slot]
+        header["begin"] = index + 1
+        target = self.frames[slot]
+        if frame.ndim == 2:
+            target.view(np.uint32)[:, :, 0] = frame
+        else:
+            target[...] = frame
+        header["index"] = index
+        header["timestamp"] = time.perf_counter() if timestamp is None else timestamp
+        header["width"], header["height"] = self.width, self.height
+        header["end"] = index + 1
+        self.written = index + 1
+        self.header["written"] = self.written
+        return index
+
+    def __call__(self, index, frame):
+        """frame_sink 接口"""
+        self.write(frame)
+
+    def close(self):
+        self.slot_headers = self.frames = None
+        self.header = None
+        self.shm.close()
+        try:
+            self.shm.unlink()
+        except FileNotFoundError:
+            pass
+
+
+class FrameRingReader(_Ring):
+    """读端, 画面是共享内存上的视图, 不做拷贝"""
+
+    def __init__(self, name=DEFAULT_NAME):
+        shm = _attach(name)
+        header = np.ndarray((), dtype=HEADER_DTYPE, buffer=shm.buf)
+        if header["magic"].item() != MAGIC:
+            shm.close()
+            raise ValueError(f"{name} 不是帧环形缓冲")
+        self._map(shm)
+        self.next_index = 0
+        self.skipped = 0        # 读得太慢被覆盖、没有读到的帧
+        self.torn = 0           # 使用过程中被覆盖的帧
+
+    def written(self):
+        return int(self.header["written"])
+
+    def wait(self, timeout=1.0, poll=0.001):
+        """
+        等待下一帧, 落后超过 slots-1 帧时跳到最旧的可用帧
+        返回: (帧序号, 时间戳, 画面视图, 槽头), 超时返回 None
+        使用完画面后用 valid(槽头, 帧序号) 检查是否被覆盖
+        """
+        deadline = time.perf_counter() + timeout
+        while True:
+            written = self.written()
+            if written > self.next_index:
+                oldest = max(0, written - self.slots + 1)
+                if self.next_index < oldest:
+                    self.skipped += oldest - self.next_index
+                    self.next_index = oldest
+                index = self.next_index
+                slot = index % self.slots
+                header = self.slot_headers[slot]
+                end = int(header["end"])
+                if end == index + 1:
+                    self.next_index = index + 1
+                    return index, float(header["timestamp"]), self.frames[slot], header
+                if end > index + 1:
+                    # 读 written 之后槽又被写端覆盖, 按最新的 written 重新对齐
+                    oldest = max(index + 1, self.written() - self.slots + 1)
+                    self.skipped += oldest - index
+                    self.next_index = oldest
+                # 槽还没写完时不空转, 照常检查超时并等待
+            if time.perf_counter() >= deadline:
+                return None
+            time.sleep(poll)
+
+    def valid(self, header, index):
+        """画面在读取期间没有被写端覆盖"""
+        if int(header["begin"]) == index + 1:
+            return True
+        self.torn += 1
+        return False
+
+    def close(self):
+        self.slot_headers = self.frames = None
+        self.header = None
+        self.shm.close()
+
+
+def pipe_to_ffmpeg(name, output, fps=30, idle_timeout=5.0, extra_args=()):
+    """
+    参考读端: 把新帧写入 ffmpeg 标准输入编码成视频
+    写端停止超过 idle_timeout 秒后结束
+    """
+    import subprocess
+
+    reader = FrameRingReader(name)
+    command = ["ffmpeg", "-y", "-loglevel", "error",
+               "-f", "rawvideo", "-pix_fmt", PIX_FMTS[reader.format],
+               "-s", f"{reader.width}x{reader.height}", "-r", str(fps), "-i", "-",
+               *extra_args, output]
+    process = subprocess.Popen(command, stdin=subprocess.PIPE)
+    frames = 0
+    try:
+        while True:
+            item = reader.wait(timeout=idle_timeout)
+            if item is None:
+                break
+            index, _, frame, header = item
+            process.stdin.write(frame.data)     # 直接从共享内存写入管道
+            reader.valid(header, index)
+            frames += 1
+    except (BrokenPipeError, KeyboardInterrupt):
+        pass
+    finally:
+        process.stdin.close()
+        process.wait()
+        print(f"写入 ffmpeg {frames} 帧, 跳过 {reader.skipped}, 被覆盖 {reader.torn}")
+        reader.close()
+    return frames
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="从共享内存读取画面, 写入 ffmpeg")
+    parser.add_argument("--name", default=DEFAULT_NAME, help="共享内存名")
+    parser.add_argument("-o", "--output", required=True, help="ffmpeg 输出文件")
+    parser.add_argument("--fps", type=float, default=30, help="输出帧率")
+    parser.add_argument("--idle-timeout", type=float, default=5.0, help="写端停止多少秒后结束")
+    args, extra = parser.parse_known_args()
+    pipe_to_ffmpeg(args.name, args.output, args.fps, args.idle_timeout, extra)
@@ -0,0 +1,94 @@
+"""
+文件帧源
+功能：
+  1. 用视频文件或图片序列目录代替摄像头, 接口与 cv2.VideoCapture 相同 (read / release / isOpened / set)
+  2. 可以只读取其中一段 [start, stop), 用于多进程分段处理
+"""
+
+import os
+
+import cv2
+
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.bmp')
+
+
+def is_image_sequence(path):
+    return os.path.isdir(path)
+
+
+def list_images(directory):
+    """目录中按文件名排序的图片"""
+    return [os.path.join(directory, f) for f in sorted(os.listdir(directory))
+            if f.lower().endswith(IMAGE_EXTENSIONS)]
+
+
+def probe(path):
+    """
+    返回: (总帧数, 帧率, (宽, 高))
+    图片序列没有帧率, 返回 None
+    """
+    if is_image_sequence(path):
+        files = list_images(path)
+        if not files:
+            return 0, None, (0, 0)
+        image = cv2.imread(files[0])
+        return len(files), None, (image.shape[1], image.shape[0])
+    cap = cv2.VideoCapture(path)
+    if not cap.isOpened():
+        raise IOError(f"无法打开视频: {path}")
+    total = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    fps = cap.get(cv2.CAP_PROP_FPS) or None
+    size = (int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)), int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)))
+    cap.release()
+    return total, fps, size
+
+
+class FileSource:
+    """
+    参数:
+        path: 视频文件或图片序列目录
+        start, stop: 只读取 [start, stop) 范围内的帧, stop 为 None 表示读到结尾
+    """
+
+    def __init__(self, path, start=0, stop=None):
+        self.path = path
+        self.start = start
+        self.stop = stop
+        self.position = start       # 下一次 read() 返回的帧序号
+        self.finished = False
+        self.cap = None
+        self.files = None
+        if is_image_sequence(path):
+            self.files = list_images(path)
+        else:
+            self.cap = cv2.VideoCapture(path)
+            if not self.cap.isOpened():
+                raise IOError(f"无法打开视频: {path}")
+            if start:
+                self.cap.set(cv2.CAP_PROP_POS_FRAMES, start)
+
+    def read(self):
+        if self.finished or (self.stop is not None and self.position >= self.stop):
+            self.finished = True
+            return False, None
+        if self.files is not None:
+            frame = cv2.imread(self.files[self.position]) if self.position < len(self.files) else None
+            ret = frame is not None
+        else:
+            ret, frame = self.cap.read()
+        if not ret:
+            self.finished = True
+            return False, None
+        self.position += 1
+        return True, frame
+
+    def isOpened(self):
+        return not self.finished
+
+    def release(self):
+        self.finished = True
+        if self.cap is not None:
+            self.cap.release()
+
+    def set(self, prop, value):
+        return False
@@ -0,0 +1,286 @@
+"""
+按需运行的手部/面部跟踪 (门控的 holistic)
+功能：
+  1. 在身体姿态给出的区域内裁剪小图, 用 MediaPipe Hands / FaceMesh 检测手部21点和面部468点
+  2. 只有相关的姿态关键点足够可见、区域足够大时才运行, 并且比身体推理频率低 (每 N 帧一次)
+  3. 两次运行之间复用缓存结果, 随姿态中手腕/鼻子的位移平移, 超过 max_age 秒作废
+  4. 用手部关键点替换姿态的手腕/小指/食指/拇指位置, 手部部件朝向更准确;
+     用面部关键点得到头部倾斜角度, 以及张嘴、睁眼程度
+  坐标都是整帧的归一化坐标, 与姿态关键点一致
+"""
+
+import math
+import time
+
+import cv2
+import numpy as np
+
+# 姿态关键点 -> 手部关键点 (手腕, 小指根, 食指根, 拇指第二关节)
+HAND_TO_POSE = {
+    "left": {15: 0, 17: 17, 19: 5, 21: 2},
+    "right": {16: 0, 18: 17, 20: 5, 22: 2},
+}
+POSE_NOSE, POSE_LEFT_EYE, POSE_RIGHT_EYE, POSE_LEFT_EAR, POSE_RIGHT_EAR = 0, 2, 5, 7, 8
+
+# FaceMesh 关键点
+FACE_LEFT_EYE_OUTER, FACE_LEFT_EYE_INNER, FACE_LEFT_EYE_TOP, FACE_LEFT_EYE_BOTTOM = 263, 362, 386, 374
+FACE_RIGHT_EYE_OUTER, FACE_RIGHT_EYE_INNER, FACE_RIGHT_EYE_TOP, FACE_RIGHT_EYE_BOTTOM = 33, 133, 159, 145
+FACE_LIP_TOP, FACE_LIP_BOTTOM, FACE_FOREHEAD, FACE_CHIN = 13, 14, 10, 152
+
+
+class _Region:
+    """一只手或脸的缓存: 检测结果和检测时姿态锚点的位置"""
+
+    def __init__(self):
+        self.points = None      # (N, 3) 整帧归一化坐标
+        self.anchor = None      # 检测时姿态锚点 (x, y)
+        self.time = 0.0
+        self.frame = -1 << 30   # 最近一次运行子模型的帧号
+        self.runs = 0
+
+    def clear(self):
+        self.points = None
+        self.anchor = None
+
+    def current(self, anchor, now, max_age):
+        """按锚点位移平移后的缓存结果, 过期返回 None"""
+        if self.points is None or now - self.time > max_age:
+            return None
+        points = self.points.copy()
+        points[:, :2] += anchor - self.anchor
+        return points
+
+
+class GatedHolistic:
+    """
+    参数:
+        hands, face: 是否启用手部/面部
+        min_visibility: 相关姿态关键点的最低可见度
+        min_hand_px, min_face_px: 手掌/脸在画面中的最小尺寸(像素), 太小时检测不可靠, 不运行
+        hand_interval, face_interval: 每隔几帧运行一次子模型, 中间帧使用缓存
+        max_age: 缓存结果的最长使用时间(秒)
+    """
+
+    def __init__(self, hands=True, face=True, min_visibility=0.6, min_hand_px=40, min_face_px=60,
+                 hand_interval=2, face_interval=3, max_age=0.5):
+        self.use_hands = hands
+        self.use_face = face
+        self.min_visibility = min_visibility
+        self.min_hand_px = min_hand_px
+        self.min_face_px = min_face_px
+        self.hand_interval = hand_interval
+        self.face_interval = face_interval
+        self.max_age = max_age
+
+        self.hand_models = {}
+        self.face_model = None
+        self.hands = {"left": _Region(), "right": _Region()}
+        self.face = _Region()
+        self.frame_index = 0
+        self.pose_points = None
+        self.active_hands = 0       # 本帧有结果(新检测或缓存)的手数
+        self.face_active = False
+        self.expression = {}        # 张嘴、睁眼程度, 没有面部结果时为空; 随姿态广播发给订阅者
+
+    # ------------------------------------------------------------------ 模型
+    def prepare(self):
+        """创建子模型, 可以在后台线程中提前调用"""
+        if self.use_hands:
+            for side in self.hands:
+                self.hand_model(side)
+        if self.use_face:
+            self.face_mesh()
+
+    def hand_model(self, side):
+        # 每只手一个实例, 跟踪状态互不干扰
+        if side not in self.hand_models:
+            import mediapipe as mp
+
+            self.hand_models[side] = mp.solutions.hands.Hands(max_num_hands=1, model_complexity=0,
+                                                              min_detection_confidence=0.5,
+                                                              min_tracking_confidence=0.5)
+        return self.hand_models[side]
+
+    def face_mesh(self):
+        if self.face_model is None:
+            import mediapipe as mp
+
+            self.face_model = mp.solutions.face_mesh.FaceMesh(max_num_faces=1, refine_landmarks=False,
+                                                              min_detection_confidence=0.5,
+                                                              min_tracking_confidence=0.5)
+        return self.face_model
+
+    def close(self):
+        for model in self.hand_models.values():
+            model.close()
+        if self.face_model is not None:
+            self.face_model.close()
+        self.hand_models, self.face_model = {}, None
+
+    def reset(self):
+        """丢掉缓存的检测结果, 例如换了一段视频"""
+        for region in (*self.hands.values(), self.face):
+            region.clear()
+        self.pose_points = None
+        self.active_hands = 0
+        self.face_active = False
+        self.expression = {}
+
+    # ------------------------------------------------------------------ 每帧
+    def process(self, frame, points):
+        """
+        frame: 整帧 BGR 图像 (与姿态推理使用的同一帧)
+        points: (33, 4) 姿态关键点
+        返回: 用手部结果修正后的关键点副本
+        """
+        self.frame_index += 1
+        self.pose_points = points
+        now = time.perf_counter()
+        h, w = frame.shape[:2]
+        size = np.array((w, h), dtype=np.float32)
+
+        hands = {}
+        if self.use_hands:
+            for side, region in self.hands.items():
+                hands[side] = self._update_hand(side, region, frame, points, size, now)
+        self.active_hands = sum(hand is not None for hand in hands.values())
+        if self.use_face:
+            self.face_active = self._update_face(frame, points, size, now) is not None
+
+        refined = points.copy()
+        for side, hand in hands.items():
+            if hand is None:
+                continue
+            for pose_index, hand_index in HAND_TO_POSE[side].items():
+                refined[pose_index, :2] = hand[hand_index, :2]
+        return refined
+
+    def _update_hand(self, side, region, frame, points, size, now):
+        mapping = HAND_TO_POSE[side]
+        wrist, pinky, index, _ = mapping
+        joints = points[[wrist, pinky, index], :2]
+        if points[[wrist, pinky, index], 3].min() < self.min_visibility:
+            region.clear()
+            return None
+        # 手腕到指根的距离约为手掌长度的一半
+        span = np.linalg.norm((joints[1:] - joints[0]) * size, axis=1).max() * 2
+        if span < self.min_hand_px:
+            region.clear()
+            return None
+
+        anchor = joints[0]
+        if self.frame_index - region.frame < self.hand_interval:
+            return region.current(anchor, now, self.max_age)
+
+        # 裁剪区域: 从指根再向外延伸, 覆盖整个手掌和手指
+        knuckles = joints[1:].mean(axis=0)
+        center = knuckles + (knuckles - anchor) * 0.5
+        result = self._run(self.hand_model(side), frame, center, span * 1.6, size)
+        region.frame = self.frame_index
+        region.runs += 1
+        if result is None or not result.multi_hand_landmarks:
+            region.clear()
+            return None
+        region.points, region.anchor, region.time = self._to_frame(result.multi_hand_landmarks[0]), anchor, now
+        return region.points
+
+    def _update_face(self, frame, points, size, now):
+        region = self.face
+        if points[[POSE_NOSE, POSE_LEFT_EYE, POSE_RIGHT_EYE], 3].min() < self.min_visibility:
+            region.clear()
+            self.expression = {}
+            return None
+        ears = points[[POSE_LEFT_EAR, POSE_RIGHT_EAR], :2] * size
+        eyes = points[[POSE_LEFT_EYE, POSE_RIGHT_EYE], :2] * size
+        width = max(np.linalg.norm(ears[0] - ears[1]), np.linalg.norm(eyes[0] - eyes[1]) * 2.5)
+        if width < self.min_face_px:
+            region.clear()
+            self.expression = {}
+            return None
+
+        anchor = points[POSE_NOSE, :2]
+        if self.frame_index - region.frame < self.face_interval:
+            face = region.current(anchor, now, self.max_age)
+            if face is None:
+                self.expression = {}
+            return face
+
+        result = self._run(self.face_mesh(), frame, anchor, width * 1.8, size)
+        region.frame = self.frame_index
+        region.runs += 1
+        if result is None or not result.multi_face_landmarks:
+            region.clear()
+            self.expression = {}
+            return None
+        region.points, region.anchor, region.time = self._to_frame(result.multi_face_landmarks[0]), anchor, now
+        self.expression = self._expression(region.points, size)
+        return region.points
+
+    def _run(self, model, frame, center, box, size):
+        """在以 center (归一化) 为中心、边长 box (像素) 的正方形区域上运行子模型"""
+        cx, cy = center * size
+        half = box / 2
+        x0, y0 = max(0, int(cx - half)), max(0, int(cy - half))
+        x1, y1 = min(int(size[0]), int(cx + half)), min(int(size[1]), int(cy + half))
+        if x1 - x0 < 16 or y1 - y0 < 16:
+            return None
+        crop = cv2.cvtColor(frame[y0:y1, x0:x1], cv2.COLOR_BGR2RGB)
+        crop.flags.writeable = False
+        self._crop = (x0, y0, x1 - x0, y1 - y0, size)
+        return model.process(crop)
+
+    def _to_frame(self, landmarks):
+        """裁剪区域内的归一化坐标 -> 整帧归一化坐标"""
+        x0, y0, cw, ch, size = self._crop
+        points = np.array([(lm.x, lm.y, lm.z) for lm in landmarks.landmark], dtype=np.float32)
+        points[:, 0] = (x0 + points[:, 0] * cw) / size[0]
+        points[:, 1] = (y0 + points[:, 1] * ch) / size[1]
+        return points
+
+    @staticmethod
+    def _expression(face, size):
+        xy = face[:, :2] * size
+
+        def dist(a, b):
+            return float(np.linalg.norm(xy[a] - xy[b]))
+
+        height = dist(FACE_FOREHEAD, FACE_CHIN) or 1.0
+        return {
+            "mouth_open": dist(FACE_LIP_TOP, FACE_LIP_BOTTOM) / height,
+            "left_eye_open": dist(FACE_LEFT_EYE_TOP, FACE_LEFT_EYE_BOTTOM)
+                             / (dist(FACE_LEFT_EYE_OUTER, FACE_LEFT_EYE_INNER) or 1.0),
+            "right_eye_open": dist(FACE_RIGHT_EYE_TOP, FACE_RIGHT_EYE_BOTTOM)
+                              / (dist(FACE_RIGHT_EYE_OUTER, FACE_RIGHT_EYE_INNER) or 1.0),
+        }
+
+    # ------------------------------------------------------------------ 渲染
+    def head_angle(self, width, height):
+        """
+        头部倾斜角度(度), 与 solve_bones 的角度方向一致 (左眼 -> 右眼, 与肩膀连线相同)
+        有面部结果时用 FaceMesh 的眼角, 否则用姿态的双眼, 都没有时返回 None
+        """
+        face = self.face.points
+        if face is not None:
+            start, end = face[FACE_LEFT_EYE_OUTER], face[FACE_RIGHT_EYE_OUTER]
+        elif self.pose_points is not None and \
+                self.pose_points[[POSE_LEFT_EYE, POSE_RIGHT_EYE], 3].min() >= self.min_visibility:
+            start, end = self.pose_points[POSE_LEFT_EYE], self.pose_points[POSE_RIGHT_EYE]
+        else:
+            return None
+        return math.degrees(math.atan2(-(end[1] - start[1]) * height, (end[0] - start[0]) * width))
+
+    def apply_head(self, bones, table, index, width, height):
+        """把头部倾斜角度写入 solve_bones 的结果 (原地修改), 并按新角度重新计算图片中心"""
+        angle = self.head_angle(width, height)
+        if angle is None:
+            return
+        rad = math.radians(angle)
+        cos, sin = math.cos(rad), math.sin(rad)
+        ox, oy = table.anchor_offset[index]
+        pivot = bones.pivot[index]
+        bones.angle[index] = angle
+        bones.center[index] = (pivot[0] - (ox * cos - oy * sin), pivot[1] - (ox * sin + oy * cos))
+
+    def stats(self):
+        return {"hand_runs": sum(region.runs for region in self.hands.values()), "face_runs": self.face.runs,
+                "frames": self.frame_index}
@@ -5,86 +5,238 @@
   2. 将所有图片缩放到统一的分辨率
   3. 保持透明通道
   4. 保存到新目录
+  5. 多进程并行处理, 内容和参数都没变的部件直接跳过
+  6. 输出 manifest.json, 记录每个部件的尺寸、锚点和哈希, 供驱动程序读取
+     原图已删除的部件从 manifest 中去掉, 输出图片一并删除
+  7. 裁掉透明边(可关闭), 并记录裁剪区域, 驱动程序据此换算锚点, 渲染位置不变
+
+用法:
+  python units/img_tf.py 原始图片目录 [-o 输出目录] [--workers N] [--force] [--no-trim]
 """
 
+import hashlib
+import json
 import os
-import cv2
-import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+
 from PIL import Image
-from argparses import file_path_get
 
 # 配置参数
-INPUT_DIR = file_path_get()
-OUTPUT_DIR = "processed_character_parts"  # 处理后图片目录
-OUTPUT_DIR = os.path.join(OUTPUT_DIR,INPUT_DIR)
+OUTPUT_ROOT = "processed_character_parts"  # 处理后图片目录
 TARGET_SIZE = (200, 200)  # 目标分辨率 (宽, 高)
 BACKGROUND_COLOR = (0, 0, 0, 0)  # 透明背景 (RGBA)
+MANIFEST_NAME = "manifest.json"
+PIPELINE_VERSION = 1    # 处理逻辑变化时加一, 让旧的输出全部失效
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg')
+
+
+def file_hash(path):
+    """文件内容的sha256"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 16), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def settings_hash(settings):
+    return hashlib.sha256(json.dumps(settings, sort_keys=True).encode()).hexdigest()
+
+
+def load_manifest(output_dir):
+    """读取输出目录中的manifest, 不存在时返回空manifest"""
+    path = os.path.join(output_dir, MANIFEST_NAME)
+    if not os.path.exists(path):
+        return {"settings_hash": None, "parts": {}}
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_manifest(output_dir, manifest):
+    path = os.path.join(output_dir, MANIFEST_NAME)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+
+def process_image(input_path, output_path, target_size=TARGET_SIZE, background=BACKGROUND_COLOR, trim=False):
+    """
+    处理单张图片: 等比缩放后居中放到透明画布上, trim时再裁掉透明边
+    返回: 该部件的manifest信息(不含哈希和锚点)
+    """
+    # 使用PIL处理透明通道
+    img = Image.open(input_path)
+
+    # 转换为RGBA模式（确保有透明通道）
+    if img.mode != 'RGBA':
+        img = img.convert('RGBA')
+
+    # 创建新图像（透明背景）
+    new_img = Image.new('RGBA', target_size, tuple(background))
+
+    # 计算缩放比例并居中放置
+    width, height = img.size
+    scale = min(target_size[0] / width, target_size[1] / height)
+    new_width = int(width * scale)
+    new_height = int(height * scale)
+    img_resized = img.resize((new_width, new_height), Image.LANCZOS)
+
+    # 计算位置（居中）
+    position = (
+        (target_size[0] - new_width) // 2,
+        (target_size[1] - new_height) // 2
+    )
+
+    # 合并图像
+    new_img.paste(img_resized, position, img_resized)
+
+    info = {
+        "source_size": [width, height],
+        "size": list(target_size),
+        "content_rect": [position[0], position[1], new_width, new_height],
+    }
+
+    # 裁到alpha包围框, 记录裁剪区域在画布中的位置
+    if trim:
+        bbox = new_img.getchannel('A').getbbox() or (0, 0, 1, 1)
+        new_img = new_img.crop(bbox)
+        info["trim_rect"] = [bbox[0], bbox[1], bbox[2] - bbox[0], bbox[3] - bbox[1]]
+
+    # 保存处理后的图片
+    new_img.save(output_path)
+    return info
+
+
+def _process_job(job):
+    """进程池任务: 返回 (部件名, 部件信息, 错误信息)"""
+    filename, input_path, output_path, settings = job
+    try:
+        info = process_image(input_path, output_path, settings["target_size"], settings["background"],
+                             settings["trim"])
+        info["output_hash"] = file_hash(output_path)
+        return filename, info, None
+    except Exception as e:
+        return filename, None, str(e)
+
+
+def process_images(input_dir, output_dir=None, target_size=TARGET_SIZE, background=BACKGROUND_COLOR,
+                   workers=None, force=False, anchors=None, trim=True):
+    """
+    处理目录下所有图片
+    参数:
+        output_dir: 输出目录, 默认 processed_character_parts/<input_dir>
+        workers: 进程数, 默认CPU核数; 1 表示在当前进程处理
+        force: 忽略manifest, 全部重新处理
+        anchors: {部件名: (x比例, y比例)} 相对画布的锚点, 写入manifest; 未提供时保留manifest中原有的锚点
+        trim: 裁掉透明边, manifest中记录 trim_rect, 锚点仍相对统一画布, 由驱动程序换算
+    返回: manifest
+    """
+    if output_dir is None:
+        output_dir = os.path.join(OUTPUT_ROOT, input_dir)
 
-def process_images(INPUt_DIR):
-    """处理所有图片"""
     # 创建输出目录
-    if not os.path.exists(OUTPUT_DIR):
-        os.makedirs(OUTPUT_DIR)
-        print(f"创建输出目录: {OUTPUT_DIR}")
+    if not os.path.exists(output_dir):
+        os.makedirs(output_dir)
+        print(f"创建输出目录: {output_dir}")
 
     # 获取所有图片文件
-    image_files = [f for f in os.listdir(INPUT_DIR)
-                  if f.lower().endswith(('.png', '.jpg', '.jpeg'))]
-
+    image_files = sorted(f for f in os.listdir(input_dir) if f.lower().endswith(IMAGE_EXTENSIONS))
     if not image_files:
-        print(f"在 {INPUT_DIR} 目录中未找到图片文件")
-        return
-
-    print(f"找到 {len(image_files)} 个图片文件, 开始处理...")
-
-    # 处理每张图片
-    for i, filename in enumerate(image_files):
-        input_path = os.path.join(INPUT_DIR, filename)
-        output_path = os.path.join(OUTPUT_DIR, filename)
-
-        try:
-            # 使用PIL处理透明通道
-            img = Image.open(input_path)
-
-            # 转换为RGBA模式（确保有透明通道）
-            if img.mode != 'RGBA':
-                img = img.convert('RGBA')
-
-            # 创建新图像（透明背景）
-            new_img = Image.new('RGBA', TARGET_SIZE, BACKGROUND_COLOR)
-
-            # 计算缩放比例并居中放置
-            width, height = img.size
-            scale = min(TARGET_SIZE[0] / width, TARGET_SIZE[1] / height)
-            new_width = int(width * scale)
-            new_height = int(height * scale)
-            img_resized = img.resize((new_width, new_height), Image.LANCZOS)
-
-            # 计算位置（居中）
-            position = (
-                (TARGET_SIZE[0] - new_width) // 2,
-                (TARGET_SIZE[1] - new_height) // 2
-            )
-
-            # 合并图像
-            new_img.paste(img_resized, position, img_resized)
+        print(f"在 {input_dir} 目录中未找到图片文件")
+        return None
+
+    settings = {"target_size": list(target_size), "background": list(background), "trim": trim,
+                "version": PIPELINE_VERSION}
+    current_settings = settings_hash(settings)
+    manifest = load_manifest(output_dir)
+    old_parts = manifest["parts"] if manifest.get("settings_hash") == current_settings and not force else {}
+    anchors = anchors or {}
+
+    parts, jobs = {}, []
+    image_names = {os.path.splitext(f)[0] for f in image_files}
+    for filename in image_files:
+        name = os.path.splitext(filename)[0]
+        input_path = os.path.join(input_dir, filename)
+        output_path = os.path.join(output_dir, os.path.splitext(filename)[0] + ".png")
+        source_hash = file_hash(input_path)
+        old = old_parts.get(name)
+        if old and old["source_hash"] == source_hash and os.path.exists(output_path) \
+                and file_hash(output_path) == old["output_hash"]:
+            parts[name] = dict(old)
+        else:
+            parts[name] = {"file": os.path.basename(output_path), "source_hash": source_hash}
+            jobs.append((name, input_path, output_path, settings))
+        anchor = anchors.get(name, manifest["parts"].get(name, {}).get("anchor"))
+        parts[name]["anchor"] = list(anchor) if anchor is not None else None
+
+    skipped = len(image_files) - len(jobs)
+    print(f"找到 {len(image_files)} 个图片文件, {skipped} 个未变化跳过, 开始处理 {len(jobs)} 个...")
+
+    if workers == 1 or len(jobs) <= 1:
+        results = list(map(_process_job, jobs))
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(_process_job, jobs))
+
+    failed = 0
+    for i, (name, info, error) in enumerate(results):
+        if error is not None:
+            print(f"处理 {name} 时出错: {error}")
+            del parts[name]
+            failed += 1
+            continue
+        parts[name].update(info)
+        rect = info.get("trim_rect", info["content_rect"])
+        print(f"处理完成 ({i + 1}/{len(jobs)}): {name} => {rect[2]}x{rect[3]}")
+
+    for part in parts.values():
+        part.pop("trimmed_anchor", None)   # 旧版本写入的字段, 锚点换算只由驱动程序按 trim_rect 做
+
+    # 原图已删除的部件: 从manifest中去掉, 并删除其输出图片, 避免驱动程序继续加载
+    stale = sorted(set(manifest["parts"]) - set(image_names))
+    for name in stale:
+        output_path = os.path.join(output_dir, manifest["parts"][name].get("file", name + ".png"))
+        if os.path.exists(output_path):
+            os.remove(output_path)
+    if stale:
+        print(f"原图已不存在, 移除 {len(stale)} 个部件: {stale}")
+
+    manifest = {"settings": settings, "settings_hash": current_settings, "parts": parts}
+    save_manifest(output_dir, manifest)
+    print(f"所有图片处理完成! 失败 {failed} 个, manifest: {os.path.join(output_dir, MANIFEST_NAME)}")
+    return manifest
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="角色部件图片预处理")
+    parser.add_argument("input_dir", help="原始图片目录")
+    parser.add_argument("-o", "--output", help=f"输出目录, 默认 {OUTPUT_ROOT}/<输入目录>")
+    parser.add_argument("--size", type=int, nargs=2, default=TARGET_SIZE, help="目标分辨率 宽 高")
+    parser.add_argument("--workers", type=int, help="并行进程数, 默认CPU核数")
+    parser.add_argument("--force", action="store_true", help="忽略manifest, 全部重新处理")
+    parser.add_argument("--anchors", help="锚点JSON文件 {部件名: [x比例, y比例]}, 写入manifest")
+    parser.add_argument("--no-trim", action="store_true", help="不裁掉透明边, 保持统一画布尺寸")
+    args = parser.parse_args()
 
-            # 保存处理后的图片
-            new_img.save(output_path)
-            print(f"处理完成 ({i+1}/{len(image_files)}): {filename} => {new_width}x{new_height}")
+    # 检查输入目录
+    if not os.path.exists(args.input_dir):
+        print(f"错误: 输入目录 {args.input_dir} 不存在")
+        print("请创建目录并放入角色部件图片")
+        os.makedirs(args.input_dir)
+        print(f"已创建目录: {args.input_dir}")
+        return
 
-        except Exception as e:
-            print(f"处理 {filename} 时出错: {str(e)}")
+    anchors = None
+    if args.anchors:
+        with open(args.anchors, encoding="utf-8") as f:
+            anchors = json.load(f)
+    process_images(args.input_dir, args.output, tuple(args.size), workers=args.workers,
+                   force=args.force, anchors=anchors, trim=not args.no_trim)
+    print("退出")
 
-    print("所有图片处理完成!")
 
 if __name__ == "__main__":
-    # 检查输入目录
-    if not os.path.exists(INPUT_DIR):
-        print(f"错误: 输入目录 {INPUT_DIR} 不存在")
-        print("请创建目录并放入角色部件图片")
-        os.makedirs(INPUT_DIR)
-        print(f"已创建目录: {INPUT_DIR}")
-    else:
-        process_images(INPUT_DIR)
-        print("退出")
\ No newline at end of file
+    main()
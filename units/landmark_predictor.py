@@ -0,0 +1,119 @@
+"""
+关键点插值与外推
+功能：
+  推理结果之间的画面不再重复上一帧, 而是:
+  1. interpolate: 在最近两次结果之间插值 (画面平滑, 但晚一个推理间隔)
+  2. extrapolate: 匀速卡尔曼滤波, 从采集时刻外推到当前渲染时刻,
+     抵消采集到显示之间的延迟
+"""
+
+import numpy as np
+
+
+class LandmarkInterpolator:
+    """在最近两次推理结果之间线性插值"""
+
+    def __init__(self):
+        self.prev = None    # (时间戳, 关键点)
+        self.last = None
+
+    def add(self, points, timestamp):
+        if points is None:
+            self.reset()
+            return
+        self.prev, self.last = self.last, (timestamp, np.array(points, dtype=np.float32))
+
+    def predict(self, now):
+        if self.last is None:
+            return None
+        if self.prev is None:
+            return self.last[1]
+        (t0, p0), (t1, p1) = self.prev, self.last
+        interval = t1 - t0
+        alpha = min(1.0, max(0.0, (now - t1) / interval)) if interval > 0 else 1.0
+        points = p0 + (p1 - p0) * alpha
+        points[:, 3] = p1[:, 3]
+        return points
+
+    def reset(self):
+        self.prev = self.last = None
+
+
+class LandmarkExtrapolator:
+    """
+    每个坐标(x, y, z)一个匀速卡尔曼滤波器, 向量化计算
+    参数:
+        process_noise: 加速度方差(归一化坐标/秒²)², 越大越跟手
+        measurement_noise: 检测抖动方差(归一化坐标)²
+        max_horizon: 最多外推的时间(秒), 防止丢帧时人物飞出去
+        lead: 额外外推的时间(秒), 例如显示刷新的延迟
+    """
+
+    def __init__(self, process_noise=20.0, measurement_noise=2.5e-5, max_horizon=0.15, lead=0.0):
+        self.q = process_noise
+        self.r = measurement_noise
+        self.max_horizon = max_horizon
+        self.lead = lead
+        self.reset()
+
+    def reset(self):
+        self.t = None
+        self.pos = self.vel = None
+        self.p00 = self.p01 = self.p11 = None
+        self.visibility = None
+
+    def add(self, points, timestamp):
+        if points is None:
+            self.reset()
+            return
+        points = np.asarray(points, dtype=np.float32)
+        z = points[:, :3].astype(np.float64)
+        self.visibility = points[:, 3].copy()
+
+        if self.t is None:
+            self.t = timestamp
+            self.pos = z
+            self.vel = np.zeros_like(z)
+            self.p00 = np.full_like(z, self.r)
+            self.p01 = np.zeros_like(z)
+            self.p11 = np.full_like(z, 1.0)
+            return
+
+        # 预测
+        dt = max(1e-4, timestamp - self.t)
+        self.t = timestamp
+        q = self.q
+        self.pos += self.vel * dt
+        self.p00 += dt * (2 * self.p01 + dt * self.p11) + q * dt ** 4 / 4
+        self.p01 += dt * self.p11 + q * dt ** 3 / 2
+        self.p11 += q * dt ** 2
+
+        # 更新
+        s = self.p00 + self.r
+        k0, k1 = self.p00 / s, self.p01 / s
+        innovation = z - self.pos
+        self.pos += k0 * innovation
+        self.vel += k1 * innovation
+        self.p11 -= k1 * self.p01
+        self.p00 *= 1 - k0
+        self.p01 *= 1 - k0
+
+    def predict(self, now):
+        if self.t is None:
+            return None
+        horizon = min(self.max_horizon, max(0.0, now - self.t + self.lead))
+        points = np.empty((len(self.pos), 4), dtype=np.float32)
+        points[:, :3] = self.pos + self.vel * horizon
+        points[:, 3] = self.visibility
+        return points
+
+
+def create_predictor(mode, **kwargs):
+    """mode: "interpolate" / "extrapolate" / None"""
+    if not mode:
+        return None
+    if mode == "interpolate":
+        return LandmarkInterpolator()
+    if mode == "extrapolate":
+        return LandmarkExtrapolator(**kwargs)
+    raise ValueError(f"未知的关键点预测模式: {mode}")
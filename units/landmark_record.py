@@ -0,0 +1,231 @@
+"""
+关键点录制与回放
+功能：
+  1. 把每帧的 x, y, z, visibility 和时间戳量化成 int16 写入二进制文件
+  2. 帧间做差分编码, 每隔若干帧写一个关键帧, 方便随机访问
+  3. 文件可直接用 np.memmap 映射读取
+  4. 回放源可代替 cv2.VideoCapture 传给 AnimeCharacterDriver
+
+文件格式 (小端):
+  头部 32 字节: magic "AVLM", 版本, 关键点数, 坐标量化系数, 可见度量化系数, 关键帧间隔
+  之后每帧一条定长记录: 时间戳(微秒, int64), 标志位, 保留, int16[关键点数, 4]
+"""
+
+import struct
+import time
+
+import numpy as np
+
+MAGIC = b"AVLM"
+VERSION = 1
+HEADER = struct.Struct("<4sHHffI12x")
+
+FLAG_PRESENT = 1    # 该帧检测到人体
+FLAG_KEYFRAME = 2   # 该帧存的是绝对值而不是差分
+
+POS_SCALE = 8000.0      # 坐标量化: 精度 1/8000, 范围约 ±4
+VIS_SCALE = 32000.0     # 可见度量化
+INT16_MIN, INT16_MAX = -32768, 32767
+
+
+def record_dtype(num_landmarks=33):
+    return np.dtype([
+        ("t_us", "<i8"),
+        ("flags", "u1"),
+        ("reserved", "u1", 7),
+        ("data", "<i2", (num_landmarks, 4)),
+    ])
+
+
+class LandmarkRecorder:
+    """
+    录制关键点
+    参数:
+        path: 输出文件
+        keyframe_interval: 每隔多少帧写一个关键帧
+    """
+
+    def __init__(self, path, num_landmarks=33, keyframe_interval=30):
+        self.path = path
+        self.num_landmarks = num_landmarks
+        self.keyframe_interval = keyframe_interval
+        self.scale = np.array([POS_SCALE, POS_SCALE, POS_SCALE, VIS_SCALE], dtype=np.float32)
+        self._record = np.zeros(1, dtype=record_dtype(num_landmarks))
+        self._prev = None           # 上一帧的量化值
+        self._since_key = 0
+        self._t0 = None
+        self.frames = 0
+
+        self._file = open(path, "wb")
+        self._file.write(HEADER.pack(MAGIC, VERSION, num_landmarks, POS_SCALE, VIS_SCALE, keyframe_interval))
+
+    def quantize(self, points):
+        q = np.rint(points * self.scale)
+        return np.clip(q, INT16_MIN, INT16_MAX).astype(np.int32)
+
+    def write(self, landmarks, timestamp=None):
+        """
+        写入一帧
+        参数:
+            landmarks: MediaPipe关键点列表 / (N, 4) 数组 / None(未检测到人体)
+            timestamp: 秒, 默认使用 time.perf_counter()
+        """
+        if timestamp is None:
+            timestamp = time.perf_counter()
+        if self._t0 is None:
+            self._t0 = timestamp
+
+        rec = self._record[0]
+        rec["t_us"] = int(round((timestamp - self._t0) * 1e6))
+        rec["flags"] = 0
+        rec["data"] = 0
+
+        if landmarks is not None:
+            if not isinstance(landmarks, np.ndarray):
+                landmarks = [(lm.x, lm.y, lm.z, lm.visibility) for lm in landmarks]
+            q = self.quantize(np.asarray(landmarks, dtype=np.float32))
+            keyframe = self._prev is None or self._since_key >= self.keyframe_interval
+            if not keyframe:
+                delta = q - self._prev
+                keyframe = delta.min() < INT16_MIN or delta.max() > INT16_MAX
+            if keyframe:
+                rec["data"] = q
+                rec["flags"] = FLAG_PRESENT | FLAG_KEYFRAME
+                self._since_key = 0
+            else:
+                rec["data"] = delta
+                rec["flags"] = FLAG_PRESENT
+            self._since_key += 1
+            self._prev = q
+        else:
+            # 丢失跟踪后的下一帧必须是关键帧
+            self._prev = None
+
+        self._file.write(self._record.tobytes())
+        self.frames += 1
+
+    def close(self):
+        if not self._file.closed:
+            self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class LandmarkRecording:
+    """用 np.memmap 映射录制文件, 支持顺序和随机访问解码"""
+
+    def __init__(self, path):
+        with open(path, "rb") as f:
+            header = f.read(HEADER.size)
+        magic, version, num_landmarks, pos_scale, vis_scale, keyframe_interval = HEADER.unpack(header)
+        if magic != MAGIC:
+            raise ValueError(f"{path} 不是关键点录制文件")
+        if version != VERSION:
+            raise ValueError(f"不支持的录制文件版本: {version}")
+
+        self.path = path
+        self.num_landmarks = num_landmarks
+        self.keyframe_interval = keyframe_interval
+        self.inv_scale = 1.0 / np.array([pos_scale, pos_scale, pos_scale, vis_scale], dtype=np.float32)
+
+        dtype = record_dtype(num_landmarks)
+        size = np.memmap(path, dtype=np.uint8, mode="r").size - HEADER.size
+        count = size // dtype.itemsize     # 录制中断时忽略不完整的最后一帧
+        self.records = np.memmap(path, dtype=dtype, mode="r", offset=HEADER.size, shape=(count,))
+        self.timestamps = self.records["t_us"] / 1e6
+
+    def __len__(self):
+        return len(self.records)
+
+    def decode(self, index):
+        """解码第index帧, 返回 (N, 4) float32 数组, 未检测到人体返回None"""
+        flags = self.records["flags"]
+        if not flags[index] & FLAG_PRESENT:
+            return None
+        key = index
+        while not flags[key] & FLAG_KEYFRAME:
+            key -= 1
+        q = self.records["data"][key:index + 1].astype(np.int32).sum(axis=0)
+        return q.astype(np.float32) * self.inv_scale
+
+    def __iter__(self):
+        """顺序解码, 每帧只做一次累加"""
+        q = None
+        for rec in self.records:
+            if not rec["flags"] & FLAG_PRESENT:
+                q = None
+                yield rec["t_us"] / 1e6, None
+                continue
+            if rec["flags"] & FLAG_KEYFRAME:
+                q = rec["data"].astype(np.int32)
+            else:
+                q = q + rec["data"]
+            yield rec["t_us"] / 1e6, q.astype(np.float32) * self.inv_scale
+
+
+class LandmarkReplay:
+    """
+    回放源, 接口与 cv2.VideoCapture 相同 (read / release / isOpened)
+    read() 返回的"帧"直接是 (N, 4) 关键点数组, 驱动会跳过姿态推理
+    参数:
+        realtime: True按录制时间戳节奏回放, False尽可能快
+        loop: 回放结束后从头开始
+    """
+    provides_landmarks = True
+
+    def __init__(self, path, realtime=True, loop=False):
+        self.recording = LandmarkRecording(path)
+        self.realtime = realtime
+        self.loop = loop
+        self.finished = False
+        self._iter = None
+        self._start = None
+        self._restart()
+
+    def _restart(self):
+        self._iter = iter(self.recording)
+        self._start = time.perf_counter()
+
+    def read(self):
+        if self.finished:
+            return False, None
+        try:
+            timestamp, points = next(self._iter)
+        except StopIteration:
+            if not self.loop or len(self.recording) == 0:
+                self.finished = True
+                return False, None
+            self._restart()
+            timestamp, points = next(self._iter)
+
+        if self.realtime:
+            wait = self._start + timestamp - time.perf_counter()
+            if wait > 0:
+                time.sleep(wait)
+        return True, points
+
+    def isOpened(self):
+        return not self.finished
+
+    def release(self):
+        self.finished = True
+
+    def set(self, prop, value):
+        return False
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="查看关键点录制文件")
+    parser.add_argument("path", help="录制文件路径")
+    args = parser.parse_args()
+
+    recording = LandmarkRecording(args.path)
+    present = int(np.count_nonzero(recording.records["flags"] & FLAG_PRESENT))
+    duration = recording.timestamps[-1] if len(recording) else 0.0
+    print(f"帧数: {len(recording)} 检测到人体: {present} 时长: {duration:.1f} s")
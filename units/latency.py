@@ -0,0 +1,209 @@
+"""
+动作到画面(motion-to-photon)延迟测量
+功能：
+  1. LatencyLog: 记录每帧从采集到画面刷新的完整延迟分布, 输出分位数和直方图
+  2. 不需要摄像头的闭环测试:
+       MarkerSource      合成视频源, 白色方块按固定周期在左右两个位置之间跳变, 记录每次跳变的采集时刻
+       MarkerPose        代替姿态模型, 按方块位置生成关键点, 人物随之左右移动
+       TransitionChecker 在渲染结果上检测人物换边的时刻, 与方块跳变时刻配对得到延迟
+"""
+
+import json
+import time
+from array import array
+from types import SimpleNamespace
+
+import numpy as np
+
+
+class LatencyLog:
+    """完整保存每个延迟样本(秒), 不做滚动窗口"""
+
+    def __init__(self):
+        self.samples = array("d")
+
+    def add(self, seconds):
+        self.samples.append(seconds)
+
+    def __len__(self):
+        return len(self.samples)
+
+    def summary(self):
+        if not self.samples:
+            return {"count": 0}
+        ms = np.frombuffer(self.samples, dtype=np.float64) * 1000
+        p50, p90, p95, p99 = np.percentile(ms, (50, 90, 95, 99))
+        return {"count": len(ms), "mean_ms": float(ms.mean()), "p50_ms": float(p50), "p90_ms": float(p90),
+                "p95_ms": float(p95), "p99_ms": float(p99), "min_ms": float(ms.min()), "max_ms": float(ms.max())}
+
+    def histogram(self, bin_ms=5.0, max_ms=500.0):
+        """[(区间下限ms, 个数)], 最后一个区间包含所有更大的值"""
+        ms = np.frombuffer(self.samples, dtype=np.float64) * 1000
+        edges = np.arange(0.0, max_ms + bin_ms, bin_ms)
+        counts, _ = np.histogram(np.minimum(ms, max_ms), bins=edges)
+        return [(float(edge), int(count)) for edge, count in zip(edges[:-1], counts) if count]
+
+    def summary_text(self):
+        s = self.summary()
+        if not s["count"]:
+            return "无延迟样本"
+        return (f"{s['count']} 帧 平均 {s['mean_ms']:.1f} ms p50 {s['p50_ms']:.1f} p95 {s['p95_ms']:.1f} "
+                f"p99 {s['p99_ms']:.1f} 最大 {s['max_ms']:.1f} ms")
+
+    def save(self, path):
+        report = {"summary": self.summary(), "histogram_5ms": self.histogram(),
+                  "samples_ms": [round(s * 1000, 3) for s in self.samples]}
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+
+
+# ---------------------------------------------------------------------- 闭环测试
+class MarkerSource:
+    """
+    合成视频源, 接口与 cv2.VideoCapture 相同
+    参数:
+        duration: 总时长(秒), 之后 finished 置为 True
+        fps: 出帧速率, read() 按这个节奏等待, 模拟摄像头
+        period: 方块左右往返一次的时间(秒)
+        positions: 方块两个位置的横坐标(归一化)
+    属性:
+        events: [(采集时刻, 位置序号)] 每次跳变后第一帧的采集时刻
+        last_timestamp: 最近一帧的采集时刻 time.perf_counter()
+    """
+
+    def __init__(self, duration=10.0, fps=30.0, period=1.0, size=(640, 480), positions=(0.3, 0.7), marker=60):
+        self.duration = duration
+        self.interval = 1.0 / fps
+        self.half_period = period / 2
+        self.width, self.height = size
+        self.positions = positions
+        self.marker = marker
+        self.events = []
+        self.finished = False
+        self.last_timestamp = None
+        self._start = None
+        self._count = 0
+        self._state = None
+
+    def read(self):
+        if self.finished:
+            return False, None
+        if self._start is None:
+            self._start = time.perf_counter()
+        wait = self._start + self._count * self.interval - time.perf_counter()
+        if wait > 0:
+            time.sleep(wait)
+        now = time.perf_counter()
+        elapsed = now - self._start
+        if elapsed >= self.duration:
+            self.finished = True
+            return False, None
+
+        state = int(elapsed / self.half_period) % 2
+        if self._state is not None and state != self._state:
+            self.events.append((now, state))
+        self._state = state
+        self._count += 1
+        self.last_timestamp = now
+
+        frame = np.zeros((self.height, self.width, 3), dtype=np.uint8)
+        x = int(self.positions[state] * self.width) - self.marker // 2
+        y = self.height // 2 - self.marker // 2
+        frame[y:y + self.marker, x:x + self.marker] = 255
+        return True, frame
+
+    def isOpened(self):
+        return not self.finished
+
+    def release(self):
+        self.finished = True
+
+    def set(self, prop, value):
+        return False
+
+
+class MarkerPose:
+    """
+    代替 MediaPipe Pose: 找到画面中的白色方块, 生成以它为中心的竖直人形关键点
+    参数:
+        delay: 每次推理额外等待的时间(秒), 模拟模型耗时
+    """
+
+    def __init__(self, delay=0.0, step=4):
+        self.delay = delay
+        self.step = step
+        y = np.linspace(0.15, 0.85, 33, dtype=np.float32)
+        side = np.where(np.arange(33) % 2 == 1, -0.06, 0.06).astype(np.float32)
+        side[0] = 0.0
+        self.template = np.stack((side, y, np.zeros(33, np.float32), np.ones(33, np.float32)), axis=1)
+
+    def process(self, image):
+        if self.delay:
+            time.sleep(self.delay)
+        sub = image[::self.step, ::self.step, 0]
+        xs = np.nonzero(sub.max(axis=0) > 128)[0]
+        if len(xs) == 0:
+            return SimpleNamespace(pose_landmarks=None)
+        points = self.template.copy()
+        points[:, 0] += (xs.mean() + 0.5) * self.step / image.shape[1]
+        return SimpleNamespace(pose_landmarks=SimpleNamespace(landmark=points))
+
+    def close(self):
+        pass
+
+
+class TransitionChecker:
+    """
+    在渲染结果上检测人物换边
+    参数:
+        events: MarkerSource.events, 测试过程中会不断增加
+        background: 背景像素值, 与 observe() 传入的像素类型一致
+        band: 只统计这个纵向范围(相对高度)内的像素, 避开界面文字
+        step: 采样间隔(像素)
+    """
+
+    def __init__(self, events, background, band=(0.3, 0.7), step=8):
+        self.events = events
+        self.background = background
+        self.band = band
+        self.step = step
+        self.side = None
+        self.log = LatencyLog()
+        self.detections = 0
+        self._next_event = 0
+
+    def observe(self, pixels, display_time):
+        """
+        pixels: 画面, (高, 宽) 每像素一个整数 或 (高, 宽, 通道)
+        display_time: 画面刷新完成的时刻 time.perf_counter()
+        """
+        h, w = pixels.shape[:2]
+        rows = pixels[int(h * self.band[0]):int(h * self.band[1]):self.step, ::self.step]
+        differs = rows != self.background
+        if differs.ndim == 3:
+            differs = differs.any(axis=2)
+        xs = np.nonzero(differs.any(axis=0))[0]
+        if len(xs) == 0:
+            return
+        side = xs.mean() * self.step > w / 2
+        if self.side is None or side == self.side:
+            self.side = side
+            return
+        self.side = side
+        self.detections += 1
+
+        # 与显示之前最近的一次跳变配对, 中间没显示出来的跳变算作漏检
+        match = None
+        for i in range(self._next_event, len(self.events)):
+            if self.events[i][0] <= display_time:
+                match = i
+        if match is not None:
+            self.log.add(display_time - self.events[match][0])
+            self._next_event = match + 1
+
+    def report(self):
+        summary = self.log.summary()
+        summary["events"] = len(self.events)
+        summary["detections"] = self.detections
+        summary["missed"] = max(0, len(self.events) - len(self.log))
+        return summary
@@ -0,0 +1,141 @@
+"""
+分阶段耗时统计
+功能：
+  1. 每个阶段(采集、颜色转换、姿态推理、关键点变换、部件绘制、刷新显示)
+     保存最近若干次耗时, 计算分位数和直方图
+  2. 计数器(丢帧、读取失败等)
+  3. 定期把快照导出为 JSON Lines 和 CSV 文件
+"""
+
+import csv
+import json
+import os
+import threading
+import time
+
+import numpy as np
+
+# 直方图分桶边界(毫秒)
+HISTOGRAM_EDGES_MS = (0, 1, 2, 4, 8, 16, 33, 66, 133, float("inf"))
+
+
+class RollingHistogram:
+    """保存最近 window 次耗时(秒)的环形缓冲"""
+
+    def __init__(self, window=300):
+        self.samples = np.zeros(window)
+        self.index = 0
+        self.filled = 0
+        self.total = 0      # 累计次数
+
+    def add(self, seconds):
+        self.samples[self.index] = seconds
+        self.index = (self.index + 1) % len(self.samples)
+        self.filled = min(self.filled + 1, len(self.samples))
+        self.total += 1
+
+    def values_ms(self):
+        return self.samples[:self.filled] * 1000
+
+    def last_ms(self):
+        return self.samples[self.index - 1] * 1000 if self.filled else 0.0
+
+    def summary(self):
+        ms = self.values_ms()
+        if not len(ms):
+            return {"count": self.total, "mean_ms": 0.0, "p50_ms": 0.0, "p95_ms": 0.0,
+                    "p99_ms": 0.0, "max_ms": 0.0, "histogram": [0] * (len(HISTOGRAM_EDGES_MS) - 1)}
+        p50, p95, p99 = np.percentile(ms, (50, 95, 99))
+        hist, _ = np.histogram(ms, bins=HISTOGRAM_EDGES_MS)
+        return {"count": self.total, "mean_ms": float(ms.mean()), "p50_ms": float(p50),
+                "p95_ms": float(p95), "p99_ms": float(p99), "max_ms": float(ms.max()),
+                "histogram": hist.tolist()}
+
+
+class StageMetrics:
+    """
+    参数:
+        window: 每个阶段保留的样本数
+        export_dir: 快照导出目录, None则不导出
+        export_interval: 导出间隔(秒)
+    """
+
+    STAGES = ("capture", "color", "inference", "transform", "blit", "flip")
+
+    def __init__(self, window=300, export_dir=None, export_interval=5.0):
+        self.window = window
+        self.stages = {name: RollingHistogram(window) for name in self.STAGES}
+        self.counters = {}
+        self._lock = threading.Lock()
+
+        self.export_dir = export_dir
+        self.export_interval = export_interval
+        self._last_export = time.perf_counter()
+        if export_dir:
+            os.makedirs(export_dir, exist_ok=True)
+
+    def record(self, stage, seconds):
+        with self._lock:
+            hist = self.stages.get(stage)
+            if hist is None:
+                hist = self.stages[stage] = RollingHistogram(self.window)
+            hist.add(seconds)
+
+    def count(self, name, n=1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def set_counter(self, name, value):
+        with self._lock:
+            self.counters[name] = value
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                "time": time.time(),
+                "stages": {name: hist.summary() for name, hist in self.stages.items()},
+                "counters": dict(self.counters),
+            }
+
+    def overlay_lines(self):
+        """屏幕叠加层显示的文字"""
+        lines = []
+        with self._lock:
+            for name, hist in self.stages.items():
+                ms = hist.values_ms()
+                if not len(ms):
+                    continue
+                lines.append(f"{name:<10}{ms.mean():6.2f} ms  max {ms.max():6.2f}")
+            for name, value in self.counters.items():
+                lines.append(f"{name:<10}{value}")
+        return lines
+
+    # ------------------------------------------------------------------ 导出
+    def maybe_export(self):
+        """距上次导出超过 export_interval 时写一次快照"""
+        if not self.export_dir:
+            return False
+        now = time.perf_counter()
+        if now - self._last_export < self.export_interval:
+            return False
+        self._last_export = now
+        self.export()
+        return True
+
+    def export(self):
+        snap = self.snapshot()
+        with open(os.path.join(self.export_dir, "metrics.jsonl"), "a", encoding="utf-8") as f:
+            f.write(json.dumps(snap) + "\n")
+
+        csv_path = os.path.join(self.export_dir, "metrics.csv")
+        new_file = not os.path.exists(csv_path)
+        with open(csv_path, "a", newline="", encoding="utf-8") as f:
+            writer = csv.writer(f)
+            if new_file:
+                writer.writerow(["time", "stage", "count", "mean_ms", "p50_ms", "p95_ms", "p99_ms", "max_ms"])
+            for name, s in snap["stages"].items():
+                writer.writerow([f"{snap['time']:.3f}", name, s["count"], f"{s['mean_ms']:.3f}",
+                                 f"{s['p50_ms']:.3f}", f"{s['p95_ms']:.3f}", f"{s['p99_ms']:.3f}",
+                                 f"{s['max_ms']:.3f}"])
+            for name, value in snap["counters"].items():
+                writer.writerow([f"{snap['time']:.3f}", name, value, "", "", "", "", ""])
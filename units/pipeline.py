@@ -0,0 +1,238 @@
+"""
+流水线模式 - 采集 / 推理 / 渲染三段并行
+功能：
+  1. 采集线程不断读取摄像头帧
+  2. 推理线程只处理最新的一帧, 旧帧直接丢弃
+  3. 渲染端(主线程)每帧只取最新的关键点, 从不等待MediaPipe
+  4. 统计各阶段吞吐量与端到端延迟
+"""
+
+import threading
+import time
+from collections import deque
+
+
+class LatestQueue:
+    """有界的"最新值"队列, 满了就丢弃最旧的元素"""
+
+    def __init__(self, maxsize=1):
+        self.maxsize = maxsize
+        self._items = deque()
+        self._cond = threading.Condition()
+        self.dropped = 0    # 被新值挤掉的旧值数量
+
+    def put(self, item):
+        with self._cond:
+            while len(self._items) >= self.maxsize:
+                self._items.popleft()
+                self.dropped += 1
+            self._items.append(item)
+            self._cond.notify()
+
+    def get(self, timeout=None):
+        """取出最新值, 超时返回None"""
+        with self._cond:
+            if not self._items:
+                self._cond.wait(timeout)
+            if not self._items:
+                return None
+            item = self._items.pop()
+            self.dropped += len(self._items)
+            self._items.clear()
+            return item
+
+    def get_nowait(self):
+        return self.get(timeout=0)
+
+    def __len__(self):
+        with self._cond:
+            return len(self._items)
+
+
+class StageStats:
+    """单个阶段的计数与耗时统计"""
+
+    def __init__(self, name, window=120):
+        self.name = name
+        self.count = 0
+        self.busy = deque(maxlen=window)    # 最近若干次处理耗时(秒)
+        self.start_time = time.perf_counter()
+
+    def record(self, seconds):
+        self.count += 1
+        self.busy.append(seconds)
+
+    def throughput(self):
+        elapsed = time.perf_counter() - self.start_time
+        return self.count / elapsed if elapsed > 0 else 0.0
+
+    def mean_ms(self):
+        return sum(self.busy) / len(self.busy) * 1000 if self.busy else 0.0
+
+
+class FramePacket:
+    """在各阶段之间传递的数据, 携带采集时间戳"""
+    __slots__ = ("index", "capture_time", "frame", "landmarks")
+
+    def __init__(self, index, capture_time, frame, landmarks=None):
+        self.index = index
+        self.capture_time = capture_time
+        self.frame = frame
+        self.landmarks = landmarks
+
+
+class FramePipeline:
+    """
+    采集与推理各跑一个线程, 渲染由调用方在主线程完成(Pygame要求)
+    参数:
+        read_frame: 无参函数, 返回 (ret, frame), 与 cap.read() 一致
+        infer: 输入帧返回关键点(或None), 例如 driver.process_frame
+        queue_size: 阶段间队列长度, 默认只保留最新一帧
+        capture_time: 无参函数, 返回刚读到的帧的采集时刻; 默认取开始读取的时刻
+    """
+
+    def __init__(self, read_frame, infer, queue_size=1, latency_window=300, capture_time=None):
+        self.read_frame = read_frame
+        self.infer = infer
+        self.capture_time = capture_time
+        self.frame_queue = LatestQueue(queue_size)
+        self.result_queue = LatestQueue(queue_size)
+
+        self.capture_stats = StageStats("capture")
+        self.infer_stats = StageStats("inference")
+        self.render_stats = StageStats("render")
+        self.latencies = deque(maxlen=latency_window)   # 端到端延迟(秒)
+        self.read_failures = 0
+
+        self._stop = threading.Event()
+        self._threads = []
+        self._last_packet = None
+
+    # ------------------------------------------------------------------ 线程
+    def _capture_loop(self):
+        index = 0
+        while not self._stop.is_set():
+            t0 = time.perf_counter()
+            ret, frame = self.read_frame()
+            if not ret:
+                self.read_failures += 1
+                time.sleep(0.005)
+                continue
+            self.capture_stats.record(time.perf_counter() - t0)
+            captured = self.capture_time() if self.capture_time is not None else None
+            self.frame_queue.put(FramePacket(index, captured or t0, frame))
+            index += 1
+
+    def _infer_loop(self):
+        while not self._stop.is_set():
+            packet = self.frame_queue.get(timeout=0.05)
+            if packet is None:
+                continue
+            t0 = time.perf_counter()
+            packet.landmarks = self.infer(packet.frame)
+            self.infer_stats.record(time.perf_counter() - t0)
+            self.result_queue.put(packet)
+
+    def start(self):
+        self._stop.clear()
+        for target, name in ((self._capture_loop, "capture"), (self._infer_loop, "inference")):
+            t = threading.Thread(target=target, name=name, daemon=True)
+            t.start()
+            self._threads.append(t)
+
+    def stop(self):
+        self._stop.set()
+        for t in self._threads:
+            t.join(timeout=1.0)
+        self._threads = []
+
+    # ------------------------------------------------------------------ 渲染端
+    def latest(self):
+        """
+        渲染端调用, 不阻塞
+        返回: (packet, is_new) 没有新结果时返回上一次的结果
+        """
+        packet = self.result_queue.get_nowait()
+        if packet is None:
+            return self._last_packet, False
+        self._last_packet = packet
+        return packet, True
+
+    def pending(self):
+        """是否还有未渲染的帧"""
+        return len(self.frame_queue) > 0 or len(self.result_queue) > 0
+
+    def frame_rendered(self, packet, render_seconds, is_new=True):
+        """渲染完一帧后调用, 记录渲染耗时与端到端延迟"""
+        self.render_stats.record(render_seconds)
+        if packet is not None and is_new:
+            self.latencies.append(time.perf_counter() - packet.capture_time)
+
+    # ------------------------------------------------------------------ 统计
+    def report(self):
+        lat = sorted(self.latencies)
+        mean_ms = sum(lat) / len(lat) * 1000 if lat else 0.0
+        p95_ms = lat[min(len(lat) - 1, int(len(lat) * 0.95))] * 1000 if lat else 0.0
+        return {
+            "capture_fps": self.capture_stats.throughput(),
+            "inference_fps": self.infer_stats.throughput(),
+            "render_fps": self.render_stats.throughput(),
+            "capture_ms": self.capture_stats.mean_ms(),
+            "inference_ms": self.infer_stats.mean_ms(),
+            "render_ms": self.render_stats.mean_ms(),
+            "latency_mean_ms": mean_ms,
+            "latency_p95_ms": p95_ms,
+            "dropped_frames": self.frame_queue.dropped,
+            "dropped_results": self.result_queue.dropped,
+            "read_failures": self.read_failures,
+        }
+
+    def summary_text(self):
+        r = self.report()
+        return (f"采集 {r['capture_fps']:.0f} | 推理 {r['inference_fps']:.0f} | "
+                f"渲染 {r['render_fps']:.0f} FPS | 延迟 {r['latency_mean_ms']:.0f} ms")
+
+
+if __name__ == "__main__":
+    # 自检: 用假摄像头和假姿态模型跑一遍流水线, 不依赖摄像头和MediaPipe
+    class FakeCamera:
+        def __init__(self, fps=60):
+            self.interval = 1.0 / fps
+            self.n = 0
+
+        def read(self):
+            time.sleep(self.interval)
+            self.n += 1
+            return True, self.n
+
+    class FakePose:
+        def __init__(self, seconds=0.04):
+            self.seconds = seconds
+
+        def process(self, frame):
+            time.sleep(self.seconds)    # 模拟 model_complexity=2 的慢推理
+            return frame
+
+    cam, pose = FakeCamera(), FakePose()
+    pipeline = FramePipeline(cam.read, pose.process)
+    pipeline.start()
+    rendered, seen = 0, set()
+    end = time.perf_counter() + 1.0
+    while time.perf_counter() < end:
+        t0 = time.perf_counter()
+        packet, is_new = pipeline.latest()
+        if packet is not None:
+            seen.add(packet.landmarks)
+        time.sleep(1 / 120)
+        pipeline.frame_rendered(packet, time.perf_counter() - t0, is_new)
+        rendered += 1
+    pipeline.stop()
+
+    report = pipeline.report()
+    for key, value in report.items():
+        print(f"{key}: {value:.2f}" if isinstance(value, float) else f"{key}: {value}")
+    # 渲染不应被推理拖慢, 慢推理时旧帧应被丢弃
+    assert report["render_fps"] > report["inference_fps"] * 2, "渲染被推理阻塞"
+    assert report["dropped_frames"] > 0, "旧帧没有被丢弃"
+    assert len(seen) > 1, "推理结果没有送达渲染端"
+    print("自检通过")
@@ -0,0 +1,358 @@
+"""
+姿态数据广播 (UDP)
+功能：
+  1. 每次推理结果打包成固定布局的二进制包: 关键点、各部件关节位置和角度、表情(张嘴/睁眼)、
+     采集/发送时间戳、序号
+  2. 订阅者向广播端口发送订阅包即可接收, 支持多个订阅者, 订阅者需定期重发订阅包, 超时自动移除
+  3. 发送在后台线程进行, publish() 只把最新结果放进队列, 不会阻塞采集循环
+  4. 时间戳为 time.perf_counter() 的微秒数, 同一台机器上的进程可以直接比较
+
+包格式 (小端, 见 packet_dtype):
+  magic "AVPB" | version u2 | flags u2 | seq u4 | 关键点数 u1 | 部件数 u1 | 保留 2字节
+  capture_us i8 | send_us i8 | landmarks f4 (关键点数, 4) | pivot f4 (部件数, 2) | angle f4 (部件数,)
+  expression f4 (3,) 张嘴、左眼、右眼睁开程度, 只有 flags 含 FLAG_EXPRESSION 时有效 (--holistic 面部跟踪)
+订阅:
+  订阅者发送 "AVSB", 广播端回复 "AVPD" + JSON描述 (部件名、画布尺寸等); 发送 "AVUS" 取消订阅
+  部件列表变化时(骨骼配置重新加载)广播端主动向所有订阅者重发描述, 之后的包按新的部件顺序
+
+用法:
+  python units/pose_broadcast.py [--host 127.0.0.1] [--port 9870]    # 订阅并打印收到的数据
+  python units/pose_broadcast.py --selftest                          # 本机回环测试
+"""
+
+import json
+import socket
+import threading
+import time
+
+import numpy as np
+
+MAGIC = b"AVPB"
+VERSION = 2
+SUBSCRIBE = b"AVSB"
+UNSUBSCRIBE = b"AVUS"
+DESCRIBE = b"AVPD"
+DEFAULT_PORT = 9870
+FLAG_PRESENT = 1    # 本帧检测到人体
+FLAG_EXPRESSION = 2     # expression 有效
+EXPRESSION_FIELDS = ("mouth_open", "left_eye_open", "right_eye_open")
+
+
+def packet_dtype(num_landmarks=33, num_parts=14):
+    """一个数据包的 numpy 结构化类型, 可直接 np.frombuffer 解析"""
+    return np.dtype([
+        ("magic", "S4"),
+        ("version", "<u2"),
+        ("flags", "<u2"),
+        ("seq", "<u4"),
+        ("num_landmarks", "u1"),
+        ("num_parts", "u1"),
+        ("reserved", "u1", (2,)),
+        ("capture_us", "<i8"),
+        ("send_us", "<i8"),
+        ("landmarks", "<f4", (num_landmarks, 4)),
+        ("pivot", "<f4", (num_parts, 2)),
+        ("angle", "<f4", (num_parts,)),
+        ("expression", "<f4", (len(EXPRESSION_FIELDS),)),
+    ])
+
+
+def parse_packet(data):
+    """解析数据包, 格式不对时返回 None"""
+    if len(data) < 32 or data[:4] != MAGIC:
+        return None
+    num_landmarks, num_parts = data[12], data[13]
+    dtype = packet_dtype(num_landmarks, num_parts)
+    if len(data) != dtype.itemsize:
+        return None
+    return np.frombuffer(data, dtype=dtype)[0]
+
+
+def now_us():
+    return int(time.perf_counter() * 1e6)
+
+
+class PoseBroadcaster:
+    """
+    参数:
+        part_names: 部件名, 与 publish() 中 bones 的顺序一致
+        host, port: 监听订阅请求的地址, 默认只对本机开放
+        canvas_size: pivot 所在画布的尺寸, 写入描述信息
+        subscriber_timeout: 订阅者超过该时间(秒)没有重发订阅包则移除
+    """
+
+    def __init__(self, part_names, host="127.0.0.1", port=DEFAULT_PORT, canvas_size=None,
+                 num_landmarks=33, subscriber_timeout=5.0):
+        self.num_landmarks = num_landmarks
+        self.canvas_size = list(canvas_size) if canvas_size else None
+        self.subscriber_timeout = subscriber_timeout
+        self._describe_all = False      # 部件列表换过, 发送线程要向所有订阅者重发描述
+        self._use_parts(part_names)
+
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sock.bind((host, port))
+        self.sock.setblocking(False)    # 发送缓冲满时直接丢包, 不等待
+        self.address = self.sock.getsockname()
+
+        self.subscribers = {}       # 地址 -> 最近一次订阅时间
+        self.seq = 0
+        self.sent = 0
+        self.dropped = 0            # 发送线程来不及发出就被新结果替换的包
+        self.send_errors = 0
+        self._pending = None
+        self._cond = threading.Condition()
+        self._running = True
+        self._thread = threading.Thread(target=self._loop, name="pose-broadcast", daemon=True)
+        self._thread.start()
+
+    def _use_parts(self, part_names):
+        self.part_names = list(part_names)
+        self.dtype = packet_dtype(self.num_landmarks, len(self.part_names))
+        self.description = json.dumps({
+            "version": VERSION,
+            "num_landmarks": self.num_landmarks,
+            "parts": self.part_names,
+            "expression": list(EXPRESSION_FIELDS),
+            "canvas_size": self.canvas_size,
+            "packet_size": self.dtype.itemsize,
+        }).encode("utf-8")
+
+    def set_parts(self, part_names):
+        """
+        换用新的部件列表, 例如骨骼配置增删部件或调整了顺序
+        与 publish() 在同一线程调用; 还没发出的旧布局数据包丢弃, 当前订阅者会收到新的描述
+        """
+        with self._cond:
+            self._use_parts(part_names)
+            self._pending = None
+            self._describe_all = True
+            self._cond.notify()
+
+    def publish(self, points, bones=None, capture_time=None, expression=None):
+        """
+        放入一帧结果, 立即返回
+        参数:
+            points: (N, 4) 关键点数组, None 表示没有检测到人体
+            bones: solve_bones 的结果(可选)
+            capture_time: 采集时刻 time.perf_counter(), 默认为当前时刻
+            expression: {EXPRESSION_FIELDS 中的名称: 数值}, 没有面部结果时为 None 或空
+        """
+        packet = np.zeros((), dtype=self.dtype)
+        packet["magic"] = MAGIC
+        packet["version"] = VERSION
+        packet["seq"] = self.seq
+        packet["num_landmarks"] = self.num_landmarks
+        packet["num_parts"] = len(self.part_names)
+        packet["capture_us"] = int((capture_time if capture_time is not None else time.perf_counter()) * 1e6)
+        if points is not None:
+            packet["flags"] = FLAG_PRESENT
+            packet["landmarks"] = points[:self.num_landmarks]
+            if bones is not None:
+                packet["pivot"] = bones.pivot
+                packet["angle"] = bones.angle
+            if expression:
+                packet["flags"] |= FLAG_EXPRESSION
+                packet["expression"] = [expression[name] for name in EXPRESSION_FIELDS]
+        self.seq = (self.seq + 1) & 0xFFFFFFFF
+        with self._cond:
+            if self._pending is not None:
+                self.dropped += 1
+            self._pending = packet
+            self._cond.notify()
+
+    def _loop(self):
+        while self._running:
+            with self._cond:
+                if self._pending is None:
+                    self._cond.wait(0.02)
+                packet, self._pending = self._pending, None
+                describe, self._describe_all = self._describe_all, False
+                description = self.description
+            self._poll_subscribers()
+            if describe:
+                # 先发新描述再发新布局的数据包, 订阅者据此更新部件名
+                for address in list(self.subscribers):
+                    try:
+                        self.sock.sendto(DESCRIBE + description, address)
+                    except OSError:
+                        self.send_errors += 1
+            if packet is None or not self.subscribers:
+                continue
+            packet["send_us"] = now_us()
+            data = packet.tobytes()
+            for address in list(self.subscribers):
+                try:
+                    self.sock.sendto(data, address)
+                    self.sent += 1
+                except OSError:
+                    self.send_errors += 1
+
+    def _poll_subscribers(self):
+        """处理订阅/取消订阅请求, 移除超时的订阅者"""
+        while True:
+            try:
+                data, address = self.sock.recvfrom(64)
+            except (BlockingIOError, InterruptedError):
+                break
+            except OSError:
+                # Windows 上对方端口关闭时 recvfrom 会报错, 忽略
+                continue
+            if data[:4] == SUBSCRIBE:
+                if address not in self.subscribers:
+                    print(f"姿态广播: 新订阅者 {address[0]}:{address[1]}")
+                self.subscribers[address] = time.monotonic()
+                try:
+                    self.sock.sendto(DESCRIBE + self.description, address)
+                except OSError:
+                    self.send_errors += 1
+            elif data[:4] == UNSUBSCRIBE:
+                self.subscribers.pop(address, None)
+        deadline = time.monotonic() - self.subscriber_timeout
+        for address, last_seen in list(self.subscribers.items()):
+            if last_seen < deadline:
+                del self.subscribers[address]
+
+    def stats(self):
+        return {"seq": self.seq, "sent": self.sent, "dropped": self.dropped,
+                "subscribers": len(self.subscribers), "send_errors": self.send_errors}
+
+    def close(self):
+        self._running = False
+        with self._cond:
+            self._cond.notify()
+        self._thread.join(timeout=1.0)
+        self.sock.close()
+
+
+class PoseSubscriber:
+    """
+    订阅端, 用于测试和参考实现
+    参数:
+        heartbeat: 重发订阅包的间隔(秒), 须小于广播端的 subscriber_timeout
+    """
+
+    def __init__(self, host="127.0.0.1", port=DEFAULT_PORT, heartbeat=1.0):
+        self.server = (host, port)
+        self.heartbeat = heartbeat
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sock.bind(("127.0.0.1" if host in ("127.0.0.1", "localhost") else "0.0.0.0", 0))
+        self.description = None
+        self.received = 0
+        self.lost = 0
+        self._last_seq = None
+        self._last_subscribe = 0.0
+
+    def subscribe(self):
+        self.sock.sendto(SUBSCRIBE, self.server)
+        self._last_subscribe = time.monotonic()
+
+    def recv(self, timeout=1.0):
+        """接收下一个数据包, 超时返回 None; 根据序号统计丢包"""
+        deadline = time.monotonic() + timeout
+        while True:
+            if time.monotonic() - self._last_subscribe >= self.heartbeat:
+                self.subscribe()
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return None
+            self.sock.settimeout(min(remaining, self.heartbeat))
+            try:
+                data, _ = self.sock.recvfrom(65536)
+            except socket.timeout:
+                continue
+            except OSError:
+                continue
+            if data[:4] == DESCRIBE:
+                self.description = json.loads(data[4:].decode("utf-8"))
+                continue
+            packet = parse_packet(data)
+            if packet is None:
+                continue
+            seq = int(packet["seq"])
+            if self._last_seq is not None:
+                gap = (seq - self._last_seq - 1) & 0xFFFFFFFF
+                if gap < 0x80000000:
+                    self.lost += gap
+            self._last_seq = seq
+            self.received += 1
+            return packet
+
+    def close(self):
+        try:
+            self.sock.sendto(UNSUBSCRIBE, self.server)
+        finally:
+            self.sock.close()
+
+
+def selftest(frames=300, fps=60):
+    """本机回环: 发送合成关键点, 检查数据一致性、序号和延迟"""
+    from collections import namedtuple
+
+    Bones = namedtuple("Bones", ["pivot", "angle"])
+    names = [f"part{i}" for i in range(14)]
+    broadcaster = PoseBroadcaster(names, port=0, canvas_size=(1200, 800))
+    subscribers = [PoseSubscriber(*broadcaster.address) for _ in range(2)]
+    for subscriber in subscribers:
+        subscriber.subscribe()
+    time.sleep(0.2)
+
+    rng = np.random.default_rng(0)
+    latencies, mismatches = [], 0
+    for i in range(frames):
+        points = rng.random((33, 4), dtype=np.float32)
+        bones = Bones(rng.random((14, 2), dtype=np.float32) * 800, rng.random(14, dtype=np.float32) * 360)
+        expression = dict(zip(EXPRESSION_FIELDS, rng.random(len(EXPRESSION_FIELDS)).tolist()))
+        t0 = time.perf_counter()
+        broadcaster.publish(points, bones, t0, expression)
+        publish_ms = (time.perf_counter() - t0) * 1000
+        for subscriber in subscribers:
+            packet = subscriber.recv(timeout=0.5)
+            if packet is None:
+                continue
+            latencies.append(now_us() - int(packet["capture_us"]))
+            if int(packet["seq"]) == broadcaster.seq - 1 and not np.array_equal(packet["landmarks"], points):
+                mismatches += 1
+        time.sleep(1 / fps)
+
+    print(f"描述信息: {subscribers[0].description}")
+    for i, subscriber in enumerate(subscribers):
+        print(f"订阅者{i}: 收到 {subscriber.received} 丢失 {subscriber.lost}")
+        subscriber.close()
+    latencies = np.array(latencies) / 1000
+    print(f"包大小 {broadcaster.dtype.itemsize} 字节, publish耗时(最后一帧) {publish_ms:.3f} ms, "
+          f"延迟 p50 {np.percentile(latencies, 50):.3f} ms p99 {np.percentile(latencies, 99):.3f} ms, "
+          f"数据不一致 {mismatches}")
+    print(broadcaster.stats())
+    broadcaster.close()
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="订阅姿态广播并打印")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--selftest", action="store_true", help="本机回环测试")
+    args = parser.parse_args()
+
+    if args.selftest:
+        selftest()
+    else:
+        client = PoseSubscriber(args.host, args.port)
+        client.subscribe()
+        try:
+            while True:
+                packet = client.recv(timeout=2.0)
+                if packet is None:
+                    print("等待数据...")
+                    continue
+                latency = (now_us() - int(packet["capture_us"])) / 1000
+                nose = packet["landmarks"][0]
+                expression = f" 表情 {np.round(packet['expression'], 2)}" \
+                    if packet["flags"] & FLAG_EXPRESSION else ""
+                print(f"#{int(packet['seq'])} 延迟 {latency:.1f} ms 丢包 {client.lost} "
+                      f"鼻子 ({nose[0]:.3f}, {nose[1]:.3f}) 角度 {np.round(packet['angle'][:4], 1)}{expression}")
+        except KeyboardInterrupt:
+            pass
+        finally:
+            client.close()
@@ -0,0 +1,183 @@
+"""
+独立进程中的姿态推理
+功能：
+  1. MediaPipe Pose 运行在单独的进程里, 不再和 Pygame 渲染争抢 GIL
+  2. 帧通过共享内存传给推理进程, 不做 pickle; 只有帧形状和 (33, 4) 关键点数组走 Pipe
+  3. 推理进程崩溃或卡住时在后台线程中自动重启, 不阻塞调用方, 期间的帧返回"未检测到人体"
+  4. process() 接口与 mp.solutions.pose.Pose 相同, 可以直接替换, 也可以交给 AdaptivePose 管理
+  配合 --pipelined 使用时, 推理线程在等待结果期间释放 GIL, 推理和渲染真正并行
+"""
+
+import multiprocessing
+import threading
+import time
+from collections import namedtuple
+from multiprocessing import shared_memory
+
+import numpy as np
+
+# 与 MediaPipe 结果相同的访问方式: results.pose_landmarks.landmark, 这里 landmark 是 (33, 4) 数组
+PoseLandmarks = namedtuple("PoseLandmarks", ["landmark"])
+WorkerResults = namedtuple("WorkerResults", ["pose_landmarks"])
+
+
+def _worker_main(conn, shm_name, pose_options):
+    """推理进程入口"""
+    import mediapipe as mp
+
+    shm = shared_memory.SharedMemory(name=shm_name)
+    pose = mp.solutions.pose.Pose(**pose_options)
+    conn.send(("ready", None))
+    points = np.empty((33, 4), dtype=np.float32)
+    try:
+        while True:
+            try:
+                message = conn.recv()
+            except EOFError:
+                break
+            kind, payload = message
+            if kind == "frame":
+                image = np.ndarray(payload, dtype=np.uint8, buffer=shm.buf)
+                results = pose.process(image)
+                del image
+                if results.pose_landmarks is None:
+                    conn.send(("result", None))
+                    continue
+                for i, lm in enumerate(results.pose_landmarks.landmark):
+                    points[i] = (lm.x, lm.y, lm.z, lm.visibility)
+                conn.send(("result", points))
+            elif kind == "remap":
+                shm.close()
+                shm = shared_memory.SharedMemory(name=payload)
+            elif kind == "close":
+                break
+    finally:
+        pose.close()
+        shm.close()
+
+
+class PoseWorker:
+    """
+    参数:
+        model_complexity: 传给 MediaPipe Pose
+        frame_shape: 预分配的共享内存能放下的帧形状, 更大的帧会自动扩容
+        timeout: 单帧推理超时(秒), 超时视为卡死, 重启推理进程
+        startup_timeout: 等待推理进程加载模型的时间(秒)
+        max_backoff: 连续崩溃时重启间隔的上限(秒)
+    """
+
+    def __init__(self, model_complexity=2, frame_shape=(480, 640, 3), timeout=5.0, startup_timeout=60.0,
+                 max_backoff=5.0, min_detection_confidence=0.5, min_tracking_confidence=0.5):
+        self.pose_options = {"model_complexity": model_complexity,
+                             "min_detection_confidence": min_detection_confidence,
+                             "min_tracking_confidence": min_tracking_confidence}
+        self.timeout = timeout
+        self.startup_timeout = startup_timeout
+        self.max_backoff = max_backoff
+        self.context = multiprocessing.get_context("spawn")
+        self.shm = shared_memory.SharedMemory(create=True, size=int(np.prod(frame_shape)))
+        self.process_handle = None
+        self.conn = None
+        self.restarts = 0
+        self._failures = 0          # 连续启动次数(期间没有成功推理过), 决定重启间隔
+        self._next_start = 0.0
+        self._starter = None        # 正在启动新进程的后台线程
+        try:
+            self._start()
+        except BaseException:
+            self.close()
+            raise
+
+    def _start(self):
+        parent_conn, child_conn = self.context.Pipe()
+        self.process_handle = self.context.Process(target=_worker_main, name="pose-worker",
+                                                   args=(child_conn, self.shm.name, self.pose_options),
+                                                   daemon=True)
+        self.process_handle.start()
+        child_conn.close()
+        self.conn = parent_conn
+        if not self.conn.poll(self.startup_timeout):
+            raise TimeoutError("推理进程启动超时")
+        self.conn.recv()
+
+    def _kill(self):
+        if self.conn is not None:
+            self.conn.close()
+            self.conn = None
+        if self.process_handle is not None:
+            if self.process_handle.is_alive():
+                self.process_handle.terminate()
+            self.process_handle.join(timeout=1.0)
+            self.process_handle = None
+
+    def _restart(self, reason):
+        """结束旧进程, 到了重启时间就在后台线程中启动新进程; 连续失败时按指数退避"""
+        self._kill()
+        if time.perf_counter() < self._next_start:
+            return
+        self._failures += 1
+        print(f"推理进程异常({reason}), 正在重启 (第 {self.restarts + 1} 次)")
+        self._starter = threading.Thread(target=self._start_in_background, name="pose-worker-restart", daemon=True)
+        self._starter.start()
+
+    def _start_in_background(self):
+        try:
+            self._start()
+            self.restarts += 1
+        except (OSError, EOFError, TimeoutError) as e:
+            self._kill()
+            print(f"推理进程重启失败: {e!r}")
+        self._next_start = time.perf_counter() + min(self.max_backoff, 0.5 * 2 ** (self._failures - 1))
+
+    def _starting(self):
+        return self._starter is not None and self._starter.is_alive()
+
+    def _ensure_capacity(self, nbytes):
+        if nbytes <= self.shm.size:
+            return
+        shm = shared_memory.SharedMemory(create=True, size=nbytes)
+        if self.conn is not None:
+            self.conn.send(("remap", shm.name))
+        self.shm.close()
+        self.shm.unlink()
+        self.shm = shm
+
+    def process(self, image):
+        """image: RGB uint8 图像, 返回 WorkerResults, 推理进程异常或正在重启时按未检测到人体处理"""
+        if self._starting():
+            return WorkerResults(None)
+        if self.conn is None or not self.process_handle.is_alive():
+            self._restart("进程已退出")
+            return WorkerResults(None)
+
+        image = np.ascontiguousarray(image, dtype=np.uint8)
+        try:
+            self._ensure_capacity(image.nbytes)
+            np.ndarray(image.shape, dtype=np.uint8, buffer=self.shm.buf)[...] = image
+            self.conn.send(("frame", image.shape))
+            # 等待结果期间不持有GIL, 渲染线程可以继续运行
+            if not self.conn.poll(self.timeout):
+                raise TimeoutError(f"推理超过 {self.timeout} 秒")
+            _, points = self.conn.recv()
+        except (EOFError, OSError, TimeoutError) as e:
+            self._restart(repr(e))
+            return WorkerResults(None)
+
+        self._failures = 0
+        return WorkerResults(PoseLandmarks(points) if points is not None else None)
+
+    def close(self):
+        if self._starter is not None:
+            self._starter.join(self.startup_timeout)
+        if self.conn is not None:
+            try:
+                self.conn.send(("close", None))
+            except OSError:
+                pass
+        if self.process_handle is not None:
+            self.process_handle.join(timeout=2.0)
+        self._kill()
+        if self.shm is not None:
+            self.shm.close()
+            self.shm.unlink()
+            self.shm = None
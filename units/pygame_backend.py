@@ -0,0 +1,275 @@
+"""
+Pygame 窗口渲染后端
+功能：
+  1. 打开窗口, 部件读成 pygame Surface, 并打包进同一张纹理图集
+  2. 部件旋转/缩放优先走 SpriteCache, 按渲染顺序一次 blits 到屏幕
+  3. 帧率、状态文字和耗时叠加层与人物一起绘制, 不变的UI文字只渲染一次
+  4. 脏矩形模式下只重画并刷新有变化的区域
+  接口见 compositor.RenderBackend, 与 NumpyCompositor 可互相替换
+"""
+
+import os
+import sys
+
+import pygame
+
+from units.atlas import build_atlas
+from units.compositor import RenderBackend
+from units.sprite_cache import SpriteCache
+
+
+class PygameBackend(RenderBackend):
+    """
+    参数:
+        size: 窗口尺寸 (宽, 高)
+        background: 背景颜色 (R, G, B)
+        cache_budget_mb: 旋转缓存预算, 0 为关闭
+        prewarm_cache: 第一次绑定部件时预热旋转缓存
+        use_atlas: 部件打包进纹理图集
+        dirty_rects: 只重画并刷新有变化的区域
+    """
+
+    name = "pygame"
+    interactive = True
+
+    def __init__(self, size, background=(240, 248, 255), cache_budget_mb=64, prewarm_cache=False,
+                 use_atlas=True, dirty_rects=False):
+        self.width, self.height = size
+        self.background = background
+        self.use_atlas = use_atlas
+        self.prewarm_cache = prewarm_cache
+
+        pygame.init()
+        self.screen = pygame.display.set_mode((self.width, self.height))
+        pygame.display.set_caption("骨骼绑定二次元人物驱动 - 按ESC退出")
+        self.clock = pygame.time.Clock()
+        try:
+            self.font = pygame.font.SysFont("microsoftyahei", 24)
+        except:
+            self.font = pygame.font.SysFont(None, 24)
+
+        # 旋转/缩放缓存, 预算为0时关闭
+        self.sprite_cache = SpriteCache(cache_budget_mb) if cache_budget_mb else None
+        self.draw_parts = []        # 按渲染顺序排列的部件
+        self.scales = None
+
+        # 不变的UI文字只渲染一次
+        self.static_blits = [
+            (self.font.render("骨骼绑定二次元人物驱动系统", True, (0, 0, 0)), (20, 20)),
+            (self.font.render("方向键移动人物位置 | F1耗时统计 | ESC退出", True, (100, 100, 100)),
+             (20, self.height - 40)),
+        ]
+        self._fps_value = None
+        self._fps_text = None
+
+        # 脏矩形模式: 只重画并刷新有变化的区域
+        self.dirty_rects = dirty_rects
+        self._full_redraw = True
+        self._previous_rects = []
+        self._update_rects = None
+        self.dirty_pct = None       # 最近一帧重画区域占画面的百分比
+
+    def show_placeholder(self, text):
+        """启动期间的占位画面"""
+        self.screen.fill(self.background)
+        self.screen.blit(self.font.render("骨骼绑定二次元人物驱动系统", True, (0, 0, 0)), (20, 20))
+        label = self.font.render(text, True, (100, 100, 100))
+        self.screen.blit(label, label.get_rect(center=(self.width // 2, self.height // 2)))
+        pygame.display.flip()
+        pygame.event.pump()
+
+    # ------------------------------------------------------------------ 部件
+    def load_image(self, path):
+        img = pygame.image.load(path).convert_alpha()
+        print(f"加载部件: {os.path.basename(path)} 尺寸: {img.get_size()}")
+        return img
+
+    def build_parts(self, specs, images):
+        """加载失败的部件用红色方块代替; 启用图集时打包进同一张纹理"""
+        character_parts = {}
+        for part, info in specs.items():
+            img = images[part]
+            anchor = info["anchor"]
+            if img is None:
+                img = pygame.Surface((50, 50), pygame.SRCALPHA)
+                pygame.draw.rect(img, (255, 0, 0, 128), (0, 0, 50, 50))
+                anchor = (0.5, 0.5)
+            character_parts[part] = {
+                "name": part,
+                "image": img,
+                "anchor": anchor,
+                "trim_offset": info["trim_offset"],     # 裁剪区域在原画布中的位置
+                "rect": img.get_rect()
+            }
+        if self.use_atlas:
+            self.pack_atlas(character_parts)
+        return character_parts
+
+    @staticmethod
+    def pack_atlas(character_parts):
+        """裁掉部件透明边并打包进图集, 部件图片改为图集的子图, 锚点随之换算"""
+        atlas = build_atlas({name: part["image"] for name, part in character_parts.items()})
+        for name, part in character_parts.items():
+            part["anchor"] = atlas.remap_anchor(name, part["anchor"])
+            part["image"] = atlas.sprite(name)
+            part["rect"] = part["image"].get_rect()
+        original = sum(w * h * 4 for w, h in atlas.sizes.values())
+        print(f"纹理图集: {atlas.surface.get_size()} 内存 {original / 1024:.0f} KB -> {atlas.memory_bytes() / 1024:.0f} KB")
+        return atlas
+
+    def bind(self, draw_parts, scales):
+        self.draw_parts = list(draw_parts)
+        self.scales = scales
+        self._full_redraw = True
+        if self.sprite_cache is not None and self.prewarm_cache:
+            self.prewarm_cache = False
+            count = self.sprite_cache.prewarm({part["name"]: part["image"] for part in self.draw_parts})
+            print(f"缓存预热: {count} 张图片, {self.sprite_cache.used_bytes / 1024 / 1024:.1f} MB")
+
+    def invalidate(self, names=()):
+        if self.sprite_cache is not None:
+            for name in names:
+                self.sprite_cache.invalidate(name)
+        self._full_redraw = True
+
+    # ------------------------------------------------------------------ 部件变换
+    def rotate_part(self, part, angle, scale=1.0):
+        """缩放并旋转部件图片(优先走缓存)"""
+        original_image = part["image"]
+        if self.sprite_cache is not None:
+            return self.sprite_cache.get(part["name"], original_image, angle, scale)
+        if scale != 1.0:
+            new_size = (int(original_image.get_width() * scale),
+                        int(original_image.get_height() * scale))
+            original_image = pygame.transform.scale(original_image, new_size)
+        return pygame.transform.rotate(original_image, -angle)
+
+    def character_blits(self, bones, visible=None):
+        """计算人物各部件的 (图片, 位置) 列表, 按渲染顺序排列"""
+        if bones is None:
+            return []
+        blits = []
+        for i, part in enumerate(self.draw_parts):
+            if visible is not None and not visible[i]:
+                continue
+            img = self.rotate_part(part, bones.angle[i], self.scales[i])
+            center_x, center_y = bones.center[i]
+            blits.append((img, (int(center_x) - img.get_width() // 2,
+                                int(center_y) - img.get_height() // 2)))
+        return blits
+
+    def draw_character(self, bones, visible=None):
+        """只把人物画到屏幕上, 不清屏"""
+        self.screen.blits(self.character_blits(bones, visible), doreturn=False)
+
+    # ------------------------------------------------------------------ 绘制
+    def render(self, bones, visible=None, status_text=None, overlay_lines=None):
+        """在屏幕缓冲上绘制一帧画面(不刷新显示), 返回屏幕 Surface"""
+        # 人物部件和会变化的UI元素
+        dynamic = self.character_blits(bones, visible)
+        dynamic.append((self.fps_surface(), (self.width - 150, self.height - 40)))
+        if status_text:
+            dynamic.append((self.font.render(status_text, True, (100, 100, 100)), (20, 60)))
+        if overlay_lines:
+            panel = self.metrics_overlay(overlay_lines)
+            dynamic.append((panel, (self.width - panel.get_width() - 20, 20)))
+
+        if not self.dirty_rects or self._full_redraw:
+            # 清空屏幕后全部重画
+            self.screen.fill(self.background)
+            self.screen.blits(dynamic, doreturn=False)
+            self.screen.blits(self.static_blits, doreturn=False)
+            self._full_redraw = False
+            self._update_rects = None
+        else:
+            # 只重画上一帧和这一帧覆盖到的区域, 每个区域内按完整顺序绘制
+            current = [pygame.Rect(pos, img.get_size()) for img, pos in dynamic]
+            regions = self.merge_rects(self._previous_rects + current)
+            for region in regions:
+                self.screen.set_clip(region)
+                self.screen.fill(self.background)
+                self.screen.blits(dynamic, doreturn=False)
+                self.screen.blits(self.static_blits, doreturn=False)
+            self.screen.set_clip(None)
+            self._update_rects = regions
+            area = sum(r.width * r.height for r in regions)
+            self.dirty_pct = round(area * 100 / (self.width * self.height))
+        self._previous_rects = [pygame.Rect(pos, img.get_size()) for img, pos in dynamic]
+        return self.screen
+
+    def present(self):
+        if self._update_rects is None:
+            pygame.display.flip()
+        else:
+            pygame.display.update(self._update_rects)
+
+    def tick(self, fps):
+        self.clock.tick(fps)
+
+    def counters(self):
+        return {} if self.dirty_pct is None else {"dirty_pct": self.dirty_pct}
+
+    def fps_surface(self):
+        """帧率文字, 数值变化时才重新渲染"""
+        fps = int(self.clock.get_fps())
+        if fps != self._fps_value:
+            self._fps_value = fps
+            self._fps_text = self.font.render(f"帧率: {fps} FPS", True, (0, 0, 0))
+        return self._fps_text
+
+    def merge_rects(self, rects, max_regions=8):
+        """合并相交的矩形, 区域太多时合并成一个"""
+        screen_rect = self.screen.get_rect()
+        merged = []
+        for rect in rects:
+            rect = rect.clip(screen_rect)
+            if rect.width == 0 or rect.height == 0:
+                continue
+            index = rect.collidelist(merged)
+            while index != -1:
+                rect = rect.union(merged.pop(index))
+                index = rect.collidelist(merged)
+            merged.append(rect)
+        if len(merged) > max_regions:
+            merged = [merged[0].unionall(merged[1:])]
+        return merged
+
+    def metrics_overlay(self, lines):
+        """各阶段耗时叠加层图片"""
+        line_height = self.font.get_linesize()
+        panel = pygame.Surface((360, line_height * len(lines) + 10), pygame.SRCALPHA)
+        panel.fill((0, 0, 0, 160))
+        for i, line in enumerate(lines):
+            panel.blit(self.font.render(line, True, (255, 255, 255)), (8, 5 + i * line_height))
+        return panel
+
+    # ------------------------------------------------------------------ 输出
+    def pixel_format(self):
+        """输出画面的通道顺序, 与屏幕像素的内存布局一致, 写入时不需要转换"""
+        masks = self.screen.get_masks()
+        if self.screen.get_bytesize() == 4 and sys.byteorder == "little":
+            if masks[:3] == (0xFF0000, 0xFF00, 0xFF):
+                return "BGRA" if masks[3] else "BGRX"
+            if masks[:3] == (0xFF, 0xFF00, 0xFF0000):
+                return "RGBA" if masks[3] else "RGBX"
+        raise ValueError(f"不支持的屏幕像素格式: {[hex(m) for m in masks]}")
+
+    def export(self, writer):
+        """把屏幕缓冲写入共享内存"""
+        pixels = pygame.surfarray.pixels2d(self.screen)
+        try:
+            writer.write(pixels.T)
+        finally:
+            del pixels      # 释放对屏幕的锁定
+
+    def print_cache_stats(self):
+        """输出旋转缓存命中统计"""
+        if self.sprite_cache is None:
+            return
+        stats = self.sprite_cache.stats()
+        print(f"旋转缓存: 命中 {stats['hits']} 未命中 {stats['misses']} "
+              f"命中率 {stats['hit_rate']:.1%} 淘汰 {stats['evictions']} 占用 {stats['used_mb']:.1f} MB")
+
+    def close(self):
+        self.print_cache_stats()
+        pygame.quit()
@@ -0,0 +1,280 @@
+"""
+角色骨骼配置文件 (rig)
+功能：
+  1. 用 JSON (或 TOML) 声明部件图片、锚点、绑定的关键点、绘制顺序和每个部件的缩放
+  2. 加载时检查并规范化: 关键点名转为索引, 锚点/缩放转为数值, 驱动直接编译成 BoneTable
+  3. RigFile 按修改时间检测文件变化, 重新加载后给出变化的部件, 驱动只重新读取这些部件的图片
+  4. 没有配置文件时使用内置的默认配置 (与原来写死在 my_v.py 中的相同)
+
+文件格式:
+  {
+    "version": 1,
+    "parts": {
+      "head": {"file": "head.png", "anchor": [0.5, 0.8], "bind": ["NOSE"], "scale": 1.0},
+      "body": {"file": "body.png", "anchor": [0.5, 0.2], "bind": ["LEFT_SHOULDER", "RIGHT_SHOULDER"]},
+      ...
+    },
+    "draw_order": ["body", "head", ...]
+  }
+  bind 为 [起点] 或 [起点, 终点], 可以写关键点名或索引; 只有起点的部件不旋转
+  anchor 为相对原图的比例, 省略时使用图片目录 manifest.json 中的锚点
+  scale 省略时为 1.0; draw_order 省略时按 parts 的书写顺序
+
+用法:
+  python units/rig.py --dump rig.json      # 导出默认配置作为模板
+  python units/rig.py rig.json             # 检查配置文件
+  python units/rig.py --selftest           # 检查格式错误的配置都被拒绝
+"""
+
+import json
+import os
+import time
+
+# 默认配置, 与文件格式相同
+DEFAULT_RIG = {
+    "version": 1,
+    "parts": {
+        "head": {"file": "head.png", "anchor": [0.5, 0.8], "bind": ["NOSE"]},
+        "body": {"file": "body.png", "anchor": [0.5, 0.2], "bind": ["LEFT_SHOULDER", "RIGHT_SHOULDER"]},
+        "left_upper_arm": {"file": "left_upper_arm.png", "anchor": [0.2, 0.5], "bind": ["LEFT_SHOULDER", "LEFT_ELBOW"]},
+        "left_lower_arm": {"file": "left_lower_arm.png", "anchor": [0.2, 0.8], "bind": ["LEFT_ELBOW", "LEFT_WRIST"]},
+        "left_hand": {"file": "left_hand.png", "anchor": [0.5, 0.2], "bind": ["LEFT_WRIST", "LEFT_PINKY"]},
+        "right_upper_arm": {"file": "right_upper_arm.png", "anchor": [0.8, 0.5], "bind": ["RIGHT_SHOULDER", "RIGHT_ELBOW"]},
+        "right_lower_arm": {"file": "right_lower_arm.png", "anchor": [0.8, 0.8], "bind": ["RIGHT_ELBOW", "RIGHT_WRIST"]},
+        "right_hand": {"file": "right_hand.png", "anchor": [0.5, 0.2], "bind": ["RIGHT_WRIST", "RIGHT_PINKY"]},
+        "left_upper_leg": {"file": "left_upper_leg.png", "anchor": [0.3, 0.2], "bind": ["LEFT_HIP", "LEFT_KNEE"]},
+        "left_lower_leg": {"file": "left_lower_leg.png", "anchor": [0.5, 0.2], "bind": ["LEFT_KNEE", "LEFT_ANKLE"]},
+        "left_foot": {"file": "left_foot.png", "anchor": [0.5, 0.2], "bind": ["LEFT_ANKLE", "LEFT_HEEL"]},
+        "right_upper_leg": {"file": "right_upper_leg.png", "anchor": [0.7, 0.2], "bind": ["RIGHT_HIP", "RIGHT_KNEE"]},
+        "right_lower_leg": {"file": "right_lower_leg.png", "anchor": [0.5, 0.2], "bind": ["RIGHT_KNEE", "RIGHT_ANKLE"]},
+        "right_foot": {"file": "right_foot.png", "anchor": [0.5, 0.2], "bind": ["RIGHT_ANKLE", "RIGHT_HEEL"]},
+    },
+    # 从后往前
+    "draw_order": [
+        "left_upper_leg", "right_upper_leg",
+        "left_lower_leg", "right_lower_leg",
+        "left_foot", "right_foot",
+        "body",
+        "left_upper_arm", "right_upper_arm",
+        "left_lower_arm", "right_lower_arm",
+        "left_hand", "right_hand",
+        "head",
+    ],
+}
+
+
+class Rig:
+    """
+    规范化后的配置
+    属性:
+        parts: {部件名: {"file", "anchor" (None 表示使用 manifest), "bind": (起点, 终点或None), "scale"}}
+        order: 绘制顺序
+        path: 配置文件路径, 默认配置为 None
+    """
+
+    def __init__(self, parts, order, path=None):
+        self.parts = parts
+        self.order = order
+        self.path = path
+
+    @property
+    def bindings(self):
+        """{部件名: (起点索引, 终点索引或None)}, 与 BoneTable.compile 的 part_bindings 相同"""
+        return {name: part["bind"] for name, part in self.parts.items()}
+
+    @property
+    def scales(self):
+        return {name: part["scale"] for name, part in self.parts.items()}
+
+    def changed_files(self, old):
+        """与旧配置相比需要重新读取图片的部件 (新增或换了文件)"""
+        return {name for name, part in self.parts.items()
+                if name not in old.parts or old.parts[name]["file"] != part["file"]}
+
+    def changed_parts(self, old):
+        """与旧配置相比有任何变化的部件, 包括被删除的"""
+        names = {name for name, part in self.parts.items() if old.parts.get(name) != part}
+        return names | (set(old.parts) - set(self.parts))
+
+
+def _landmark_index(value, landmarks, where):
+    if isinstance(value, bool):
+        raise ValueError(f"{where}: 关键点必须是名称或索引")
+    if isinstance(value, int):
+        index = value
+    elif isinstance(value, str) and value.upper() in landmarks.__members__:
+        index = int(landmarks[value.upper()])
+    else:
+        raise ValueError(f"{where}: 未知的关键点 {value!r}")
+    if not 0 <= index < len(landmarks):
+        raise ValueError(f"{where}: 关键点索引 {index} 超出范围")
+    return index
+
+
+def _number(value, where, field):
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        raise ValueError(f"{where}: {field} 应为数值, 实际为 {value!r}")
+    return float(value)
+
+
+def parse_rig(data, landmarks, path=None):
+    """
+    检查并规范化配置
+    参数:
+        data: 文件内容 (dict)
+        landmarks: 关键点枚举 (如 PoseLandmark), 用于把名称转为索引
+    出错时抛出 ValueError
+    """
+    if not isinstance(data, dict) or not isinstance(data.get("parts"), dict) or not data["parts"]:
+        raise ValueError("配置中缺少 parts")
+    parts = {}
+    for name, spec in data["parts"].items():
+        where = f"parts.{name}"
+        if not isinstance(spec, dict) or "file" not in spec:
+            raise ValueError(f"{where}: 缺少 file")
+        bind = spec.get("bind")
+        if not isinstance(bind, (list, tuple)) or not 1 <= len(bind) <= 2:
+            raise ValueError(f"{where}: bind 应为 [起点] 或 [起点, 终点]")
+        start = _landmark_index(bind[0], landmarks, where)
+        end = _landmark_index(bind[1], landmarks, where) if len(bind) == 2 and bind[1] is not None else None
+
+        anchor = spec.get("anchor")
+        if anchor is not None:
+            if not isinstance(anchor, (list, tuple)) or len(anchor) != 2:
+                raise ValueError(f"{where}: anchor 应为 [x, y]")
+            anchor = (_number(anchor[0], where, "anchor"), _number(anchor[1], where, "anchor"))
+        scale = _number(spec.get("scale", 1.0), where, "scale")
+        if scale <= 0:
+            raise ValueError(f"{where}: scale 必须大于0")
+        parts[name] = {"file": str(spec["file"]), "anchor": anchor, "bind": (start, end), "scale": scale}
+
+    order = data.get("draw_order") or list(parts)
+    if not isinstance(order, list) or not all(isinstance(name, str) for name in order):
+        raise ValueError(f"draw_order 应为部件名列表, 实际为 {order!r}")
+    unknown = [name for name in order if name not in parts]
+    if unknown:
+        raise ValueError(f"draw_order 中有未定义的部件: {unknown}")
+    if len(set(order)) != len(order):
+        raise ValueError("draw_order 中有重复的部件")
+    missing = [name for name in parts if name not in order]
+    if missing:
+        print(f"骨骼配置: 部件 {missing} 不在 draw_order 中, 不会绘制")
+    return Rig(parts, order, path)
+
+
+def load_rig(path, landmarks):
+    """读取 .json 或 .toml 配置文件"""
+    if path.endswith(".toml"):
+        import tomllib      # Python 3.11+
+
+        with open(path, "rb") as f:
+            data = tomllib.load(f)
+    else:
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+    return parse_rig(data, landmarks, path)
+
+
+def default_rig(landmarks):
+    return parse_rig(DEFAULT_RIG, landmarks)
+
+
+class RigFile:
+    """
+    监视配置文件, poll() 发现修改后重新加载
+    参数:
+        interval: 两次检查文件修改时间的最小间隔(秒)
+    """
+
+    def __init__(self, path, landmarks, interval=0.5):
+        self.path = path
+        self.landmarks = landmarks
+        self.interval = interval
+        self._mtime = os.stat(path).st_mtime_ns
+        self._next_check = time.perf_counter() + interval
+        self.rig = load_rig(path, landmarks)
+
+    def poll(self):
+        """文件有变化且能正确加载时返回新的 Rig, 否则返回 None; 加载出错时保留旧配置"""
+        now = time.perf_counter()
+        if now < self._next_check:
+            return None
+        self._next_check = now + self.interval
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+        except OSError:
+            return None
+        if mtime == self._mtime:
+            return None
+        self._mtime = mtime
+        try:
+            rig = load_rig(self.path, self.landmarks)
+        except (OSError, ValueError, TypeError) as e:
+            # 编辑器保存到一半或格式错误, 等下一次修改
+            print(f"骨骼配置加载失败, 继续使用旧配置: {e}")
+            return None
+        self.rig = rig
+        return rig
+
+
+if __name__ == "__main__":
+    import argparse
+    import sys
+
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    from units.bone_transform import PoseLandmark
+
+    parser = argparse.ArgumentParser(description="导出或检查角色骨骼配置")
+    parser.add_argument("path", nargs="?", help="要检查的配置文件")
+    parser.add_argument("--dump", metavar="PATH", help="把默认配置写入该文件")
+    parser.add_argument("--selftest", action="store_true", help="检查格式错误的配置都被拒绝, 热重载时保留旧配置")
+    args = parser.parse_args()
+
+    if args.selftest:
+        import copy
+        import tempfile
+
+        def broken(edit):
+            data = copy.deepcopy(DEFAULT_RIG)
+            edit(data)
+            return data
+
+        cases = {
+            "scale 为 null": broken(lambda d: d["parts"]["head"].update(scale=None)),
+            "scale 为字符串": broken(lambda d: d["parts"]["head"].update(scale="1")),
+            "anchor 含 null": broken(lambda d: d["parts"]["head"].update(anchor=[None, 0.5])),
+            "draw_order 为数字": broken(lambda d: d.update(draw_order=5)),
+            "draw_order 嵌套列表": broken(lambda d: d.update(draw_order=[["head"]])),
+        }
+        for label, data in cases.items():
+            try:
+                parse_rig(data, PoseLandmark)
+            except ValueError as e:
+                print(f"{label}: {e}")
+            else:
+                raise AssertionError(f"{label}: 没有被拒绝")
+
+        # 热重载: 改成错误的配置后 poll() 返回 None 并保留旧配置
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "rig.json")
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump(DEFAULT_RIG, f)
+            watcher = RigFile(path, PoseLandmark, interval=0)
+            old = watcher.rig
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump(cases["scale 为 null"], f)
+            os.utime(path, ns=(watcher._mtime + 10 ** 9, watcher._mtime + 10 ** 9))
+            assert watcher.poll() is None and watcher.rig is old, "错误的配置替换了旧配置"
+        print("自检通过")
+
+    if args.dump:
+        with open(args.dump, "w", encoding="utf-8") as f:
+            json.dump(DEFAULT_RIG, f, indent=2, ensure_ascii=False)
+        print(f"已导出默认配置: {args.dump}")
+    if args.path:
+        rig = load_rig(args.path, PoseLandmark)
+        for name in rig.order:
+            part = rig.parts[name]
+            start, end = part["bind"]
+            bind = PoseLandmark(start).name + (f" -> {PoseLandmark(end).name}" if end is not None else "")
+            print(f"{name:<16} {part['file']:<22} 锚点 {part['anchor']} 缩放 {part['scale']} {bind}")
@@ -0,0 +1,104 @@
+"""
+姿态推理的感兴趣区域(ROI)跟踪
+功能：
+  1. 根据上一帧的关键点计算带边距的包围框
+  2. 只裁剪并缩小该区域送去推理
+  3. 把裁剪区域内的关键点映射回整帧坐标
+  4. 跟踪丢失时退回整帧检测
+"""
+
+import cv2
+
+
+class RoiTracker:
+    """
+    参数:
+        padding: 包围框向外扩展的比例(相对包围框边长)
+        max_side: 裁剪区域缩放后的最长边(像素)
+        min_visibility: 参与计算包围框的关键点可见度阈值
+        min_points: 可见关键点少于该数量视为跟踪丢失
+        refit_ratio: ROI面积超过所需面积的这个倍数时才收缩, 避免每帧抖动
+        slack: 重新设定ROI时额外留出的边距比例, 小幅移动不必再改ROI
+    """
+
+    def __init__(self, padding=0.3, max_side=320, min_visibility=0.5, min_points=6,
+                 refit_ratio=2.0, slack=0.1):
+        self.padding = padding
+        self.max_side = max_side
+        self.min_visibility = min_visibility
+        self.min_points = min_points
+        self.refit_ratio = refit_ratio
+        self.slack = slack
+        self.roi = None         # (x0, y0, x1, y1) 像素坐标, None 表示整帧
+        self.lost = 0           # 跟踪丢失次数
+        self.pixels = 0         # 最近一次送入推理的像素数
+
+    def crop(self, frame):
+        """
+        裁剪并缩小当前ROI
+        返回: (图像, 映射参数), 映射参数交给 to_full_frame 使用
+        """
+        h, w = frame.shape[:2]
+        x0, y0, x1, y1 = self.roi if self.roi is not None else (0, 0, w, h)
+        image = frame[y0:y1, x0:x1]
+        cw, ch = x1 - x0, y1 - y0
+        # 整帧检测时保持原分辨率, 只缩小裁剪区域
+        scale = min(1.0, self.max_side / max(cw, ch)) if self.roi is not None else 1.0
+        if scale < 1.0:
+            image = cv2.resize(image, (max(1, int(cw * scale)), max(1, int(ch * scale))),
+                               interpolation=cv2.INTER_AREA)
+        self.pixels = image.shape[0] * image.shape[1]
+        return image, (x0, y0, cw, ch, w, h)
+
+    @staticmethod
+    def to_full_frame(points, mapping):
+        """把裁剪区域内的归一化关键点 (N, 4) 映射回整帧归一化坐标"""
+        x0, y0, cw, ch, w, h = mapping
+        full = points.copy()
+        full[:, 0] = (x0 + points[:, 0] * cw) / w
+        full[:, 1] = (y0 + points[:, 1] * ch) / h
+        full[:, 2] = points[:, 2] * cw / w      # z 与 x 使用相同的尺度
+        return full
+
+    def update(self, points, frame_shape):
+        """用整帧坐标的关键点更新ROI, points为None表示没有检测到人体"""
+        h, w = frame_shape[:2]
+        if points is None:
+            self.reset()
+            return
+
+        visible = points[points[:, 3] >= self.min_visibility, :2]
+        if len(visible) < self.min_points:
+            self.reset()
+            return
+
+        (bx0, by0), (bx1, by1) = visible.min(axis=0) * (w, h), visible.max(axis=0) * (w, h)
+        size = max(bx1 - bx0, by1 - by0)
+        center = ((bx0 + bx1) / 2, (by0 + by1) / 2)
+        needed = self.square_box(center, size * (1 + 2 * self.padding), w, h)
+        if needed[2] - needed[0] < 16 or needed[3] - needed[1] < 16:
+            self.reset()
+            return
+
+        # 仍在当前ROI内且ROI不过大时保持不动, 让MediaPipe的内部跟踪更稳定
+        if self.roi is not None:
+            rx0, ry0, rx1, ry1 = self.roi
+            inside = (needed[0] >= rx0 and needed[1] >= ry0 and needed[2] <= rx1 and needed[3] <= ry1)
+            area = (rx1 - rx0) * (ry1 - ry0)
+            needed_area = (needed[2] - needed[0]) * (needed[3] - needed[1])
+            if inside and area <= needed_area * self.refit_ratio:
+                return
+        self.roi = self.square_box(center, size * (1 + 2 * (self.padding + self.slack)), w, h)
+
+    @staticmethod
+    def square_box(center, side, w, h):
+        """以center为中心、边长为side的正方形, 裁剪到画面范围内"""
+        cx, cy = center
+        return (max(0, int(cx - side / 2)), max(0, int(cy - side / 2)),
+                min(w, int(cx + side / 2)), min(h, int(cy + side / 2)))
+
+    def reset(self):
+        """退回整帧检测"""
+        if self.roi is not None:
+            self.lost += 1
+        self.roi = None
@@ -0,0 +1,122 @@
+"""
+部件旋转/缩放缓存
+功能：
+  1. 按 (部件, 角度档位, 缩放档位) 缓存变换后的图片
+  2. 按内存预算做LRU淘汰
+  3. 可在启动时预热
+  4. 统计命中/未命中次数
+"""
+
+from collections import OrderedDict
+
+import pygame
+
+
+class SpriteCache:
+    """
+    参数:
+        budget_mb: 内存预算(MB), 超出后淘汰最久未使用的图片
+        angle_step: 角度量化步长(度)
+        scale_step: 缩放量化步长
+    """
+
+    def __init__(self, budget_mb=64, angle_step=1.0, scale_step=0.05):
+        self.budget_bytes = int(budget_mb * 1024 * 1024)
+        self.angle_step = angle_step
+        self.scale_step = scale_step
+        self._entries = OrderedDict()   # key -> surface
+        self.used_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    # ------------------------------------------------------------------ 量化
+    def quantize_angle(self, angle):
+        return int(round((angle % 360.0) / self.angle_step)) % int(round(360.0 / self.angle_step))
+
+    def quantize_scale(self, scale):
+        return int(round(scale / self.scale_step))
+
+    @staticmethod
+    def surface_bytes(surface):
+        return surface.get_width() * surface.get_height() * surface.get_bytesize()
+
+    # ------------------------------------------------------------------ 读写
+    def _render(self, image, angle_bucket, scale_bucket):
+        scale = scale_bucket * self.scale_step
+        if scale_bucket != self.quantize_scale(1.0):
+            new_size = (max(1, int(image.get_width() * scale)),
+                        max(1, int(image.get_height() * scale)))
+            image = pygame.transform.scale(image, new_size)
+        return pygame.transform.rotate(image, -angle_bucket * self.angle_step)
+
+    def _store(self, key, surface):
+        size = self.surface_bytes(surface)
+        if size > self.budget_bytes:
+            return
+        self._entries[key] = surface
+        self.used_bytes += size
+        while self.used_bytes > self.budget_bytes:
+            _, old = self._entries.popitem(last=False)
+            self.used_bytes -= self.surface_bytes(old)
+            self.evictions += 1
+
+    def get(self, name, image, angle, scale=1.0):
+        """取得旋转(及缩放)后的图片, 未缓存时生成并存入"""
+        key = (name, self.quantize_angle(angle), self.quantize_scale(scale))
+        surface = self._entries.get(key)
+        if surface is not None:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return surface
+
+        self.misses += 1
+        surface = self._render(image, key[1], key[2])
+        self._store(key, surface)
+        return surface
+
+    def prewarm(self, parts, scales=(1.0,), angle_step=None):
+        """
+        预先生成各部件的旋转图片, 直到占满内存预算为止
+        参数:
+            parts: {部件名: 图片}
+            scales: 需要预热的缩放比例
+            angle_step: 预热的角度间隔, 默认与量化步长一致
+        返回: 预热的图片数量
+        """
+        step = angle_step or self.angle_step
+        count = 0
+        angle = 0.0
+        while angle < 360.0:
+            for scale in scales:
+                for name, image in parts.items():
+                    key = (name, self.quantize_angle(angle), self.quantize_scale(scale))
+                    if key in self._entries:
+                        continue
+                    surface = self._render(image, key[1], key[2])
+                    if self.used_bytes + self.surface_bytes(surface) > self.budget_bytes:
+                        return count
+                    self._store(key, surface)
+                    count += 1
+            angle += step
+        return count
+
+    def invalidate(self, name=None):
+        """清除某个部件(或全部)的缓存"""
+        if name is None:
+            self._entries.clear()
+            self.used_bytes = 0
+            return
+        for key in [k for k in self._entries if k[0] == name]:
+            self.used_bytes -= self.surface_bytes(self._entries.pop(key))
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "evictions": self.evictions,
+            "entries": len(self._entries),
+            "used_mb": self.used_bytes / (1024 * 1024),
+        }
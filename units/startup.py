@@ -0,0 +1,125 @@
+"""
+分阶段启动
+功能：
+  1. StartupTimer: 记录每个启动阶段的开始时刻和耗时 (包括后台线程中的阶段), 启动完成后打印
+  2. BackgroundInit: 在后台线程中创建耗时的对象 (姿态模型), 主线程先显示窗口、打开摄像头,
+     对象就绪前 get() 返回 None
+  3. warm_up_pose: 创建模型后用空白帧推理一次, 把首次推理的初始化耗时挪到后台
+"""
+
+import threading
+import time
+from contextlib import contextmanager
+
+import numpy as np
+
+
+class StartupTimer:
+    """
+    参数:
+        origin: 计时起点 time.perf_counter(), 默认为创建时刻
+    """
+
+    def __init__(self, origin=None):
+        self.origin = time.perf_counter() if origin is None else origin
+        self.phases = []        # (名称, 开始时刻, 耗时, 是否在后台线程)
+        self.reported = False
+        self._lock = threading.Lock()
+
+    def add(self, name, start, seconds):
+        background = threading.current_thread() is not threading.main_thread()
+        with self._lock:
+            self.phases.append((name, start, seconds, background))
+
+    @contextmanager
+    def phase(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, start, time.perf_counter() - start)
+
+    def mark(self, name):
+        """记录一个时间点 (耗时为0), 例如摄像头第一帧"""
+        self.add(name, time.perf_counter(), 0.0)
+
+    def has(self, name):
+        with self._lock:
+            return any(phase[0] == name for phase in self.phases)
+
+    def report_lines(self):
+        with self._lock:
+            phases = sorted(self.phases, key=lambda phase: phase[1] + phase[2])
+        lines = []
+        for name, start, seconds, background in phases:
+            begin = start - self.origin
+            if seconds:
+                lines.append(f"  {name:<14}{begin:7.2f} s 起 耗时 {seconds:5.2f} s{' (后台)' if background else ''}")
+            else:
+                lines.append(f"  {name:<14}{begin:7.2f} s")
+        return lines
+
+    def print_report(self):
+        self.reported = True
+        print("启动耗时:")
+        for line in self.report_lines():
+            print(line)
+
+
+class BackgroundInit:
+    """
+    在后台线程中调用 build(), 结果通过 get() 取得
+    build 抛出的异常在 get() 时重新抛出
+    """
+
+    def __init__(self, build, name="background-init"):
+        self._build = build
+        self._value = None
+        self._error = None
+        self._done = threading.Event()
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        try:
+            self._value = self._build()
+        except BaseException as e:
+            self._error = e
+        finally:
+            self._done.set()
+
+    def ready(self):
+        return self._done.is_set()
+
+    @property
+    def error(self):
+        """build 抛出的异常, 还没完成或成功时为 None"""
+        return self._error if self._done.is_set() else None
+
+    def get(self):
+        """就绪后返回结果, 否则返回 None"""
+        if not self._done.is_set():
+            return None
+        if self._error is not None:
+            raise self._error
+        return self._value
+
+    def wait(self, timeout=None):
+        """等待完成, 超时返回 None"""
+        self._done.wait(timeout)
+        return self.get()
+
+
+def warm_up_pose(factory, timer=None, frame_shape=(480, 640, 3)):
+    """
+    创建姿态模型并用空白帧推理一次
+    factory: 无参数, 返回带 process() 的模型; 模型有 warm_up() 时 (例如 AdaptivePose) 改为调用它,
+    由模型自己预热所有需要的子模型
+    """
+    timer = timer or StartupTimer()
+    with timer.phase("模型创建"):
+        pose = factory()
+    with timer.phase("预热推理"):
+        warm_up = getattr(pose, "warm_up", pose.process)
+        warm_up(np.zeros(frame_shape, dtype=np.uint8))
+    return pose